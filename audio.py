@@ -1,3 +1,5 @@
 from music import MusicManager
+from sfx import SoundBank
 
-music = MusicManager()
\ No newline at end of file
+music = MusicManager()
+sfx = SoundBank()  # звуки грузятся в load() при входе в игру
@@ -0,0 +1,385 @@
+"""Бенчмарки: время кадра update/draw и генерации уровня по сценариям.
+
+    python bench.py                      # только логика, без окна
+    python bench.py --draw               # ещё и отрисовка (нужен OpenGL)
+    python bench.py --out new.json --compare old.json
+
+Результат — JSON с p50/p95/p99 в миллисекундах, чтобы сравнивать версии.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from simulation import LevelPlan, Simulation, Enemy, TILE
+from profiler import Profiler
+
+# сетки под разрешения экрана (тайл 48 px)
+GRID_DEFAULT = (1024 // TILE, 640 // TILE)
+GRID_1080P = (1920 // TILE, 1080 // TILE)
+GRID_4K = (3840 // TILE, 2160 // TILE)
+GRID_BIG = (120, 120)  # прокручиваемый мир, больше экрана
+
+
+def percentiles(samples):
+    """p50/p95/p99, среднее и максимум в миллисекундах."""
+    if not samples:
+        return {}
+    data = sorted(s * 1000 for s in samples)
+
+    def pick(q):
+        return round(data[min(len(data) - 1, int(math.ceil(q * len(data))) - 1)], 4)
+
+    return {
+        "n": len(data),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": round(sum(data) / len(data), 4),
+        "max": round(data[-1], 4),
+    }
+
+
+# ---------------- Сценарии
+# Каждый возвращает готовую симуляцию и функцию, которая вызывается перед каждым кадром.
+
+def make_sim(grid, seed, level=1):
+    # PVS строим сразу: фоновый поток мешал бы замерам кадров
+    sim = Simulation(grid[0], grid[1], level=level, autosave=False, seed=seed, async_pvs=False)
+    sim.god_mode = True
+    sim.setup()
+    return sim
+
+
+def scenario_empty(grid, seed):
+    sim = make_sim(grid, seed)
+    sim.enemies.clear()
+    sim.enemy_index.clear()
+    sim.perception.clear()
+    sim.level_cleared = True  # не переходить на следующий уровень
+    sim.level_cleared_time = math.inf
+    return sim, None
+
+
+def spawn_chasers(sim, count):
+    """Доводит число врагов до count на свободных клетках; все знают, где игрок."""
+    cells = list(sim.visibility.cells)
+    sim.spawn_rng.shuffle(cells)
+    px, py = sim.player.center_x, sim.player.center_y
+    for x, y in cells:
+        if len(sim.enemies) >= count:
+            break
+        ex = x * TILE + TILE / 2
+        ey = y * TILE + TILE / 2
+        if math.hypot(ex - px, ey - py) < 200:
+            continue
+        enemy = Enemy(ex, ey, sim)
+        enemy.activation_delay = 0
+        enemy.last_seen_pos = (px, py)
+        enemy.last_seen_time = sim.time
+        enemy.memory_time = math.inf
+        sim.add_enemy(enemy)
+
+
+def scenario_chase(count):
+    def build(grid, seed):
+        sim, _ = scenario_empty(grid, seed)
+        spawn_chasers(sim, count)
+
+        def tick(frame):
+            # игрок бегает по кругу, чтобы поле потоков пересчитывалось
+            sim.move_x = math.cos(frame / 40)
+            sim.move_y = math.sin(frame / 40)
+            # память не кончается — враги всё время идут к игроку
+            for enemy in sim.enemies:
+                enemy.last_seen_pos = (sim.player.center_x, sim.player.center_y)
+                enemy.last_seen_time = sim.time
+        return sim, tick
+    return build
+
+
+def scenario_patrol(count=0):
+    def build(grid, seed):
+        """Обычный спавн (или count патрульных): враги патрулируют, игрок бегает по кругу."""
+        sim = make_sim(grid, seed)
+        sim.active_size = (1920, 1080)
+        if count:
+            spawn_chasers(sim, count)
+            for enemy in sim.enemies:
+                enemy.last_seen_pos = None  # про игрока не знают, пока не увидят
+                enemy.memory_time = 12.5
+
+        def tick(frame):
+            sim.move_x = math.cos(frame / 60)
+            sim.move_y = math.sin(frame / 60)
+        return sim, tick
+    return build
+
+
+def scenario_barrage(enemies=0):
+    def build(grid, seed):
+        sim, _ = scenario_empty(grid, seed)
+        sim.player.weapon = 'shotgun'
+
+        def tick(frame):
+            # убитых заменяем новыми — нагрузка на попадания не падает
+            if enemies:
+                spawn_chasers(sim, enemies)
+            shotgun_volley(sim, frame)
+        return sim, tick
+    return build
+
+
+def shotgun_volley(sim, frame):
+    """Дробовик без перезарядки и задержки — залп каждый кадр по кругу."""
+    player = sim.player
+    player.ammo['shotgun'] = player.max_ammo['shotgun']
+    player.last_fire = -math.inf
+    angle = frame * 0.15
+    sim.aim_x = player.center_x + math.cos(angle) * 300
+    sim.aim_y = player.center_y + math.sin(angle) * 300
+    sim.shoot()
+
+
+def scenario_particles(count):
+    def build(grid, seed):
+        sim, _ = scenario_empty(grid, seed)
+        particles = sim.particles
+        rng = particles.rng
+
+        def tick(frame):
+            # держим около count живых частиц
+            n = count - len(particles)
+            if n > 0:
+                particles.emit(n, sim.player.center_x, sim.player.center_y,
+                               rng.uniform(-300, 300, n), rng.uniform(-300, 300, n),
+                               rng.integers(1, 4, n), (200, 40, 40),
+                               life=rng.uniform(0.3, 1.0, n))
+        return sim, tick
+    return build
+
+
+FRAME_SCENARIOS = {
+    "empty": (GRID_DEFAULT, scenario_empty),
+    "chase_10": (GRID_1080P, scenario_chase(10)),
+    "chase_50": (GRID_1080P, scenario_chase(50)),
+    "chase_200": (GRID_1080P, scenario_chase(200)),
+    "patrol_200": (GRID_1080P, scenario_patrol(200)),
+    "patrol_big": (GRID_BIG, scenario_patrol(600)),
+    "shotgun_barrage": (GRID_DEFAULT, scenario_barrage()),
+    "shotgun_vs_50": (GRID_1080P, scenario_barrage(50)),
+    "shotgun_vs_200": (GRID_1080P, scenario_barrage(200)),
+    "particles_5k": (GRID_DEFAULT, scenario_particles(5000)),
+}
+
+SETUP_SCENARIOS = {
+    "setup_default": GRID_DEFAULT,
+    "setup_1080p": GRID_1080P,
+    "setup_4k": GRID_4K,
+}
+
+
+# ---------------- Измерение
+
+def run_frames(sim, tick, frames, warmup, view=None):
+    """Гоняет кадры: update всегда, draw — если есть окно."""
+    update_times = []
+    draw_times = []
+    profiler = Profiler(enabled=True)
+    sim.profiler = profiler
+    for frame in range(warmup + frames):
+        if frame == warmup:
+            profiler.reset()
+        profiler.begin_frame()
+        if tick:
+            tick(frame)
+
+        start = time.perf_counter()
+        if view:
+            view.update_frame()
+        else:
+            sim.step()
+        elapsed = time.perf_counter() - start
+
+        draw_elapsed = None
+        if view:
+            start = time.perf_counter()
+            view.on_draw()
+            view.window.ctx.finish()  # ждём GPU, иначе меряем только постановку команд
+            draw_elapsed = time.perf_counter() - start
+
+        if frame >= warmup:
+            update_times.append(elapsed)
+            if draw_elapsed is not None:
+                draw_times.append(draw_elapsed)
+
+    result = {"update_ms": percentiles(update_times)}
+    if draw_times:
+        result["draw_ms"] = percentiles(draw_times)
+    # разбивка по фазам update — среднее за последние кадры
+    result["phases_ms"] = {name: round(mean, 4) for name, (mean, _) in profiler.averages().items()}
+    # сколько врагов подумало за кадр в каждом ярусе планировщика AI — в среднем
+    frames_counts = [counts for _, _, _, counts in profiler.frames]
+    if frames_counts:
+        names = [name for name in frames_counts[-1] if name.startswith("think.")]
+        result["thinks"] = {name[len("think."):]: round(sum(c.get(name, 0) for c in frames_counts) /
+                                                         len(frames_counts), 2)
+                            for name in names}
+    result["enemies"] = len(sim.enemies)
+    result["bullets"] = len(sim.bullet_pool.active)
+    result["particles"] = len(sim.particles)
+    return result
+
+
+def run_setup(grid, repeats, seed):
+    """Время плана уровня (LevelPlan.build — то, что игра считает в фоне во время
+    отсчёта), setup() и таблицы PVS отдельно.
+
+    PVS строится синхронно: фоновый поток делил бы GIL с замером и шумел
+    в p95/p99. В игре он строится в фоне, поэтому в setup_ms его нет.
+    """
+    sim = Simulation(grid[0], grid[1], autosave=False, seed=seed, async_pvs=False)
+    plan_times = []
+    setup_times = []
+    pvs_times = []
+    for generation in range(repeats):
+        plan = LevelPlan(seed, generation, 1, grid[0], grid[1])
+        start = time.perf_counter()
+        plan.build()
+        plan_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        sim.setup()
+        elapsed = time.perf_counter() - start
+        pvs_times.append(sim.visibility.build_time)
+        setup_times.append(elapsed - sim.visibility.build_time)
+    return {
+        "grid": list(grid),
+        "plan_ms": percentiles(plan_times),
+        "setup_ms": percentiles(setup_times),
+        "pvs_ms": percentiles(pvs_times),
+    }
+
+
+class BenchView:
+    """Отрисовка сценария через настоящий GameWindow."""
+
+    def __init__(self, sim):
+        import main
+        self.view = main.GameWindow(autosave=False)
+        self.window = self.view.window
+        self.window.show_view(self.view)
+        self.view.sim = sim
+        self.view.generation = -1
+        self.view.sync_level()
+        self.view.sync_sprites()
+
+    def update_frame(self):
+        # то же, что GameWindow.update, но ровно один шаг логики на кадр
+        view = self.view
+        view.sim.step()
+        view.handle_events()
+        view.sync_level()
+        view.sync_sprites()
+        view.update_camera(view.sim.clock.step)
+
+    def on_draw(self):
+        self.view.on_draw()
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(new, old_path):
+    """Печатает изменение p50/p95 относительно старого прогона."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\ncompared with {old_path} ({old.get('meta', {}).get('revision')})")
+    for name, result in new["scenarios"].items():
+        before = old.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for key, stats in result.items():
+            # только распределения времени (thinks и прочие счётчики — не они)
+            if not isinstance(stats, dict) or "p50" not in stats or "p50" not in before.get(key, {}):
+                continue
+            for q in ("p50", "p95"):
+                a, b = before[key][q], stats[q]
+                change = (b - a) / a * 100 if a else 0.0
+                print(f"  {name:18} {key:12} {q}: {a:9.3f} -> {b:9.3f} ms ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки update/draw/setup")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--setup-repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="*", help="имена сценариев")
+    parser.add_argument("--draw", action="store_true", help="мерить отрисовку (нужен OpenGL)")
+    parser.add_argument("--headless", action="store_true", help="отрисовка без окна (ARCADE_HEADLESS)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="JSON прошлого прогона")
+    args = parser.parse_args(argv)
+
+    window = None
+    if args.draw:
+        if args.headless:
+            os.environ["ARCADE_HEADLESS"] = "1"
+        import arcade
+        window = arcade.Window(1920, 1080, "bench", visible=False)
+
+    results = {}
+    for name, (grid, build) in FRAME_SCENARIOS.items():
+        if args.only and name not in args.only:
+            continue
+        sim, tick = build(grid, args.seed)
+        view = BenchView(sim) if window else None
+        results[name] = run_frames(sim, tick, args.frames, args.warmup, view)
+        results[name]["grid"] = list(grid)
+        line = (f"{name:18} update p50 {results[name]['update_ms']['p50']:8.3f} ms"
+                f"  p99 {results[name]['update_ms']['p99']:8.3f} ms")
+        if "draw_ms" in results[name]:
+            line += f"  draw p50 {results[name]['draw_ms']['p50']:8.3f} ms"
+        print(line)
+
+    for name, grid in SETUP_SCENARIOS.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = run_setup(grid, args.setup_repeats, args.seed)
+        print(f"{name:18} setup  p50 {results[name]['setup_ms']['p50']:8.3f} ms"
+              f"  plan p50 {results[name]['plan_ms']['p50']:8.3f} ms"
+              f"  pvs p50 {results[name]['pvs_ms']['p50']:8.3f} ms")
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "seed": args.seed,
+            "draw": bool(window),
+        },
+        "scenarios": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"saved {args.out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
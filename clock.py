@@ -0,0 +1,42 @@
+"""Часы с фиксированным шагом для симуляции.
+
+Кадр любой длины раскладывается на целое число шагов step, остаток копится
+до следующего кадра. Если машина не успевает, шагов за кадр не больше
+max_steps — игра замедляется, а не уходит в «спираль смерти».
+"""
+
+FIXED_STEP = 1 / 60
+MAX_STEPS = 5
+MAX_FRAME = 0.25  # кадр длиннее (отладчик, перетаскивание окна) режется до этого
+
+
+class FixedStepClock:
+    def __init__(self, step=FIXED_STEP, max_steps=MAX_STEPS):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.steps = 0  # всего сделано шагов
+        self.dropped = 0.0  # выброшенное время, секунд
+
+    @property
+    def alpha(self):
+        """Доля следующего шага, уже накопленная (для интерполяции при отрисовке)."""
+        return self.accumulator / self.step
+
+    def advance(self, frame_time):
+        """Добавляет время кадра и возвращает, сколько шагов сделать."""
+        self.accumulator += min(max(frame_time, 0.0), MAX_FRAME)
+        # эпсилон: 1/60 + 1/60 в float чуть меньше 2/60
+        n = int(self.accumulator / self.step + 1e-6)
+        if n > self.max_steps:
+            # не догоняем: лишнее время выбрасываем
+            self.dropped += (n - self.max_steps) * self.step
+            self.accumulator -= (n - self.max_steps) * self.step
+            n = self.max_steps
+        self.accumulator = max(0.0, self.accumulator - n * self.step)
+        self.steps += n
+        return n
+
+    def reset(self):
+        """Сбрасывает накопленный остаток (пауза, смена уровня)."""
+        self.accumulator = 0.0
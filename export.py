@@ -1,14 +1,197 @@
-from docx import Document
-from save import load_game
+"""Экспорт статистики в фоне: DOCX, CSV и Parquet.
 
+StatsExport работает в своём потоке и читает базу отдельным соединением
+(WAL: писателю сохранений не мешает). Сводки считает SQLite по индексам
+(save.STATS_QUERIES), а построчная таблица уровней идёт курсором по
+CHUNK строк — вся история в память не грузится. Меню рисует progress
+и message. Файлы пишутся в папку reports рядом с игрой, с датой в имени,
+прежние отчёты не затираются.
 
-def export_to_word():
-    level, kills = load_game()
+Тяжёлые библиотеки (python-docx, pandas, pyarrow) импортируются уже
+в потоке. Для Parquet нужны pandas и pyarrow; если чего-то нет, Parquet
+пропускается и меню показывает, какого модуля нет, отдельной строкой (skipped).
+"""
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import save
+from resources import data_path
+
+log = logging.getLogger(__name__)
+
+REPORTS_DIR = "reports"
+CHUNK = 5000  # строк уровней за одно чтение
+
+# построчная таблица: один уровень одного забега
+LEVEL_COLUMNS = ("run_id", "run_started", "seed", "level", "outcome", "duration", "kills", "shots")
+LEVELS_QUERY = """
+SELECT levels.run_id, datetime(runs.started, 'unixepoch', 'localtime'), runs.seed,
+       levels.level, levels.outcome, levels.duration, levels.kills, levels.shots
+FROM levels JOIN runs ON runs.id = levels.run_id
+ORDER BY levels.id
+"""
+
+
+class StatsExport:
+    """Один экспорт; start() запускает поток и сразу возвращается."""
+
+    def __init__(self, folder=None, formats=("docx", "csv", "parquet")):
+        self.folder = folder or data_path(REPORTS_DIR)
+        self.formats = formats
+        self.progress = 0.0  # 0..1
+        self.message = ""
+        self.paths = []  # записанные файлы
+        self.skipped = []  # форматы, которые не записаны, с причиной — меню показывает их отдельно
+        self.error = None
+        self.cancelled = False
+        self.done_rows = 0  # строк уровней записано, по всем файлам
+        self.total_rows = 1
+        self.stage_rows = 0  # строк уровней в одном файле
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.message = "EXPORTING..."
+        self._thread = threading.Thread(target=self._run, name="stats-export", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            self.export()
+        except Exception as exc:
+            log.exception("export failed")
+            self.error = exc
+            self.message = f"EXPORT FAILED: {exc}"
 
-    doc = Document()
-    doc.add_heading('Miami Gun - Statistics', level=1)
+    # --- сам экспорт ---
+    def export(self):
+        save.flush(save.CLOSE_TIMEOUT)  # история последнего уровня — уже в базе
+        os.makedirs(self.folder, exist_ok=True)
+        base = os.path.join(self.folder, time.strftime("report_%Y%m%d_%H%M%S"))
 
-    doc.add_paragraph(f'Last level reached: {level}')
-    doc.add_paragraph(f'Total kills: {kills}')
+        conn = sqlite3.connect(save.service().path)
+        try:
+            stats = save.history_stats(conn)
+            total = conn.execute("SELECT COUNT(*) FROM levels").fetchone()[0]
+            # доля работы на файл: DOCX — только сводки, остальные проходят все строки
+            stages = [fmt for fmt in self.formats if fmt != "docx"]
+            self.stage_rows = total
+            self.total_rows = max(1, total * len(stages))
 
-    doc.save("Game_Report.docx")
\ No newline at end of file
+            if "docx" in self.formats:
+                self.paths.append(self.write_docx(base + ".docx", stats))
+            if "csv" in self.formats:
+                self.paths.append(self.write_csv(base + ".csv", conn))
+            if "parquet" in self.formats:
+                path = self.write_parquet(base + ".parquet", conn)
+                if path:
+                    self.paths.append(path)
+        finally:
+            conn.close()
+
+        if self.cancelled:
+            self.message = "EXPORT CANCELLED"
+            return
+        self.progress = 1.0
+        self.message = f"SAVED TO {self.folder}"
+
+    def level_chunks(self, conn):
+        """Строки уровней пачками по CHUNK; двигает progress."""
+        cursor = conn.execute(LEVELS_QUERY)
+        while not self.cancelled:
+            rows = cursor.fetchmany(CHUNK)
+            if not rows:
+                break
+            yield rows
+            self.done_rows += len(rows)
+            self.progress = min(self.done_rows / self.total_rows, 0.99)
+
+    def write_docx(self, path, stats):
+        from docx import Document
+
+        level, kills = save.load_game()
+        doc = Document()
+        doc.add_heading('Miami Gun - Statistics', level=1)
+        doc.add_paragraph(f'Last level reached: {level}')
+        doc.add_paragraph(f'Total kills: {kills}')
+        doc.add_paragraph(f'Runs played: {stats["runs"]}')
+
+        add_table(doc, "Kills by weapon", ("Weapon", "Kills"), stats["kills_by_weapon"])
+        add_table(doc, "Shots by weapon", ("Weapon", "Shots"), stats["shots_by_weapon"])
+        add_table(doc, "Deaths by level", ("Level", "Deaths"), stats["deaths_by_level"])
+        add_table(doc, "Clear time by level", ("Level", "Average, s", "Best, s", "Clears"),
+                  [(lvl, f"{avg:.1f}", f"{best:.1f}", count)
+                   for lvl, avg, best, count in stats["clear_time_by_level"]])
+        doc.save(path)
+        return path
+
+    def write_csv(self, path, conn):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(LEVEL_COLUMNS)
+            for rows in self.level_chunks(conn):
+                writer.writerows(rows)
+        return path
+
+    def write_parquet(self, path, conn):
+        """None — нет pandas или pyarrow; какого именно, пишется в skipped."""
+        try:
+            import pandas as pd
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            log.warning("export: parquet skipped: %s", exc)
+            missing = (exc.name or "pandas/pyarrow").upper()
+            self.skipped.append(f"PARQUET SKIPPED: {missing} NOT AVAILABLE")
+            self.done_rows += self.stage_rows
+            return None
+
+        writer = None
+        try:
+            for rows in self.level_chunks(conn):
+                table = pa.Table.from_pandas(pd.DataFrame.from_records(rows, columns=LEVEL_COLUMNS),
+                                             preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            if writer is None:  # история пуста — файл с одними колонками
+                pd.DataFrame(columns=LEVEL_COLUMNS).to_parquet(path, index=False)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+
+def add_table(doc, title, header, rows):
+    doc.add_heading(title, level=2)
+    if not rows:
+        doc.add_paragraph('No data yet')
+        return
+    table = doc.add_table(rows=1, cols=len(header))
+    for cell, text in zip(table.rows[0].cells, header):
+        cell.text = text
+    for row in rows:
+        for cell, value in zip(table.add_row().cells, row):
+            cell.text = str(value if value is not None else '-')
+
+
+def export_to_word():
+    """Старый синхронный вход: только DOCX."""
+    job = StatsExport(formats=("docx",))
+    job.export()
+    return job.paths[0]
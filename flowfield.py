@@ -0,0 +1,124 @@
+"""Общее поле потоков (Dijkstra по тайловой сетке) к клетке игрока."""
+import heapq
+import math
+from collections import OrderedDict
+
+from los import BLOCKED
+
+DIAG = math.sqrt(2)
+NEIGHBOURS = (
+    (1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+    (1, 1, DIAG), (1, -1, DIAG), (-1, 1, DIAG), (-1, -1, DIAG),
+)
+
+
+class FlowField:
+    def __init__(self, grid, tile, radius=None):
+        self.grid = grid
+        self.tile = tile
+        self.radius = radius  # дальше стольких клеток пути поле не считается (большие карты)
+        self.rows = len(grid)
+        self.cols = len(grid[0]) if self.rows else 0
+
+        size = self.cols * self.rows
+        self.dist = [math.inf] * size
+        # для каждой клетки — центр следующей клетки по пути к цели (или None)
+        self.next_pos = [None] * size
+        self.target = None
+        self.rebuilds = 0
+
+    def _passable(self, x, y):
+        return 0 <= x < self.cols and 0 <= y < self.rows and self.grid[y][x] != BLOCKED
+
+    def update(self, x, y):
+        """Пересчитывает поле, только если цель сменила клетку. Возвращает True при пересчёте."""
+        cell = (int(x // self.tile), int(y // self.tile))
+        if cell == self.target or not self._passable(*cell):
+            return False
+        self.target = cell
+        self._rebuild(cell)
+        return True
+
+    def _rebuild(self, target):
+        cols = self.cols
+        tile = self.tile
+        half = tile / 2
+        dist = [math.inf] * len(self.dist)
+        next_pos = [None] * len(self.next_pos)
+
+        radius = math.inf if self.radius is None else self.radius
+        tx, ty = target
+        dist[ty * cols + tx] = 0.0
+        heap = [(0.0, tx, ty)]
+
+        while heap:
+            d, x, y = heapq.heappop(heap)
+            if d > dist[y * cols + x]:
+                continue
+            center = (x * tile + half, y * tile + half)
+            for ox, oy, cost in NEIGHBOURS:
+                nx, ny = x + ox, y + oy
+                if not self._passable(nx, ny):
+                    continue
+                # диагональ только если оба соседних прохода свободны (не режем углы)
+                if ox and oy and not (self._passable(x + ox, y) and self._passable(x, y + oy)):
+                    continue
+                nd = d + cost
+                if nd > radius:
+                    continue
+                i = ny * cols + nx
+                if nd < dist[i]:
+                    dist[i] = nd
+                    next_pos[i] = center
+                    heapq.heappush(heap, (nd, nx, ny))
+
+        self.dist = dist
+        self.next_pos = next_pos
+        self.rebuilds += 1
+
+    def next_step(self, x, y):
+        """Центр следующей клетки на пути к цели для точки мира (O(1)), None — уже на месте или недостижимо."""
+        cx = int(x // self.tile)
+        cy = int(y // self.tile)
+        if not (0 <= cx < self.cols and 0 <= cy < self.rows):
+            return None
+        return self.next_pos[cy * self.cols + cx]
+
+    def distance(self, x, y):
+        """Длина пути до цели в клетках (inf — недостижимо)."""
+        cx = int(x // self.tile)
+        cy = int(y // self.tile)
+        if not (0 <= cx < self.cols and 0 <= cy < self.rows):
+            return math.inf
+        return self.dist[cy * self.cols + cx]
+
+
+class FieldCache:
+    """Поля к неподвижным точкам (последнее место, где видели игрока).
+
+    Поле на клетку цели строится один раз и живёт, пока нужно: враги,
+    потерявшие игрока в одном месте, идут по одному полю. Хранятся
+    последние size полей.
+    """
+
+    def __init__(self, grid, tile, radius=None, size=8):
+        self.grid = grid
+        self.tile = tile
+        self.radius = radius
+        self.size = size
+        self.fields = OrderedDict()  # клетка цели -> FlowField
+
+    def get(self, x, y):
+        """Поле к клетке точки мира; None — клетка непроходима."""
+        cell = (int(x // self.tile), int(y // self.tile))
+        field = self.fields.get(cell)
+        if field is not None:
+            self.fields.move_to_end(cell)
+            return field
+        field = FlowField(self.grid, self.tile, self.radius)
+        if not field.update(x, y):
+            return None
+        self.fields[cell] = field
+        if len(self.fields) > self.size:
+            self.fields.popitem(last=False)
+        return field
@@ -0,0 +1,241 @@
+"""Генератор карт на NumPy: чистая функция (seed, ширина, высота, параметры) -> сетка.
+
+Карта строится так же, как раньше в Simulation.make_map: рамка из стен,
+случайные блоки и проходы. После этого свободное место размечается на
+связные области (4-соседство) и все области, кроме самой большой,
+заливаются стеной — закрытых карманов не остаётся, любая свободная
+клетка достижима из любой другой.
+
+Геометрия считается сразу для пачки карт (массивы формы (N, h, w)),
+поэтому generate_batch выдаёт тысячи карт в секунду — для подбора
+параметров генератора офлайн. generate(seed, ...) — та же пачка из
+одной карты, результат совпадает с соответствующей картой пачки.
+"""
+import time
+
+import numpy as np
+
+WALL = 1
+FREE = 0
+
+
+class LevelParams:
+    def __init__(self, blocks=8, block_min=2, block_max=4, passages=6):
+        self.blocks = blocks  # случайных прямоугольников стен
+        self.block_min = block_min  # сторона блока в клетках, включительно
+        self.block_max = block_max
+        self.passages = passages  # пробитых клеток в стенах
+
+    def __repr__(self):
+        return (f"LevelParams(blocks={self.blocks}, block_min={self.block_min}, "
+                f"block_max={self.block_max}, passages={self.passages})")
+
+
+DEFAULT_PARAMS = LevelParams()
+
+
+class Layout:
+    """Одна карта и маски для спавна."""
+
+    def __init__(self, grid, free, dead_end, spawnable, pockets):
+        self.grid = grid  # uint8 (h, w): 1 — стена
+        self.free = free  # свободные клетки (все связны)
+        self.dead_end = dead_end  # свободные, у которых меньше двух свободных соседей
+        self.spawnable = spawnable  # свободные и не тупики
+        self.pockets = pockets  # сколько клеток залито при починке связности
+
+    @property
+    def height(self):
+        return self.grid.shape[0]
+
+    @property
+    def width(self):
+        return self.grid.shape[1]
+
+    def to_lists(self):
+        """Сетка списками: grid[y][x] — для los, pvs, flowfield."""
+        return self.grid.tolist()
+
+    def spawn_cells(self):
+        """(x, y) всех клеток для спавна, построчно снизу вверх."""
+        ys, xs = np.nonzero(self.spawnable)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+
+# ---------------- Генерация
+
+def _draw(seed, width, height, params):
+    """Случайные числа одной карты: блоки (x, y, w, h) и проходы (x, y).
+
+    Один вызов генератора на карту — в пачке основное время уходит на
+    создание генераторов, а не на сами числа.
+    """
+    n = params.blocks
+    u = np.random.default_rng(seed).random(4 * n + 2 * params.passages)
+    sides = params.block_max - params.block_min + 1
+    w = params.block_min + (u[0:n] * sides).astype(np.int64)
+    h = params.block_min + (u[n:2 * n] * sides).astype(np.int64)
+    # блок целиком внутри рамки: левый край 1 .. width - w - 2
+    sx = 1 + (u[2 * n:3 * n] * (width - w - 2)).astype(np.int64)
+    sy = 1 + (u[3 * n:4 * n] * (height - h - 2)).astype(np.int64)
+    p = u[4 * n:]
+    px = 3 + (p[:params.passages] * (width - 6)).astype(np.int64)
+    py = 3 + (p[params.passages:] * (height - 6)).astype(np.int64)
+    return sx, sy, w, h, px, py
+
+
+def _neighbours(free):
+    """Число свободных соседей (4-соседство) для каждой клетки пачки."""
+    f = free.astype(np.uint8)
+    count = np.zeros(free.shape, np.uint8)
+    count[:, 1:, :] += f[:, :-1, :]
+    count[:, :-1, :] += f[:, 1:, :]
+    count[:, :, 1:] += f[:, :, :-1]
+    count[:, :, :-1] += f[:, :, 1:]
+    return count
+
+
+def _label(free):
+    """Метки связных областей: у клеток одной области одинаковая метка, у стен h * w.
+
+    Минимальная метка растекается к соседям, после чего каждая клетка
+    «прыгает» к метке клетки, номер которой носит (как в union-find), —
+    так проходов нужно заметно меньше длины самого длинного пути.
+    Карты, где ничего не поменялось, из дальнейших проходов выбывают.
+    """
+    n, h, w = free.shape
+    size = h * w
+    dtype = np.int16 if size < np.iinfo(np.int16).max else np.int32
+    labels = np.where(free, np.arange(size, dtype=dtype).reshape(1, h, w), dtype(size)).astype(dtype)
+    sentinel = np.full((n, 1), size, dtype)  # метка стены указывает сама на себя
+
+    active = np.arange(n)
+    while len(active):
+        m = len(active)
+        current = labels[active]
+        spread = current.copy()
+        np.minimum(spread[:, 1:, :], current[:, :-1, :], out=spread[:, 1:, :])
+        np.minimum(spread[:, :-1, :], current[:, 1:, :], out=spread[:, :-1, :])
+        np.minimum(spread[:, :, 1:], current[:, :, :-1], out=spread[:, :, 1:])
+        np.minimum(spread[:, :, :-1], current[:, :, 1:], out=spread[:, :, :-1])
+        spread[~free[active]] = size
+
+        flat = np.concatenate([spread.reshape(m, size), sentinel[:m]], axis=1)
+        flat = np.take_along_axis(flat, flat.astype(np.intp), axis=1)
+        spread = flat[:, :size].reshape(m, h, w)
+
+        changed = (spread != current).any(axis=(1, 2))
+        labels[active] = spread
+        active = active[changed]
+    return labels
+
+
+def _largest(labels, free):
+    """Маска самой большой области каждой карты (при равенстве — с меньшей меткой)."""
+    n, h, w = labels.shape
+    size = h * w + 1
+    flat = labels.reshape(n, -1).astype(np.intp)
+    offsets = (np.arange(n) * size)[:, None]
+    counts = np.bincount((flat + offsets).ravel(), minlength=n * size).reshape(n, size)
+    counts[:, size - 1] = 0  # стены
+    main = counts.argmax(axis=1)
+    return (labels == main[:, None, None]) & free
+
+
+def generate_batch(seeds, width, height, params=DEFAULT_PARAMS):
+    """Пачка карт. Возвращает словарь массивов формы (N, height, width):
+    grid, free, dead_end, spawnable — и pockets (N,) — сколько клеток залито.
+    """
+    seeds = list(seeds)
+    n = len(seeds)
+    draws = [_draw(seed, width, height, params) for seed in seeds]
+    sx, sy, bw, bh, px, py = (np.array(column) for column in zip(*draws))
+
+    ys = np.arange(height).reshape(1, 1, height, 1)
+    xs = np.arange(width).reshape(1, 1, 1, width)
+
+    # блоки: (N, блоки, h, w) -> объединение по блокам
+    inside = ((ys >= sy[:, :, None, None]) & (ys < (sy + bh)[:, :, None, None]) &
+              (xs >= sx[:, :, None, None]) & (xs < (sx + bw)[:, :, None, None]))
+    grid = inside.any(axis=1).astype(np.uint8)
+
+    # рамка
+    grid[:, 0, :] = WALL
+    grid[:, -1, :] = WALL
+    grid[:, :, 0] = WALL
+    grid[:, :, -1] = WALL
+
+    # проходы
+    rows = np.repeat(np.arange(n), px.shape[1])
+    grid[rows, py.ravel(), px.ravel()] = FREE
+
+    # связность: всё, кроме самой большой области, — в стену
+    free = grid == FREE
+    main = _largest(_label(free), free)
+    pockets = (free & ~main).sum(axis=(1, 2))
+    grid[free & ~main] = WALL
+    free = main
+
+    dead_end = free & (_neighbours(free) < 2)
+    return {
+        "grid": grid,
+        "free": free,
+        "dead_end": dead_end,
+        "spawnable": free & ~dead_end,
+        "pockets": pockets,
+    }
+
+
+def generate(seed, width, height, params=DEFAULT_PARAMS):
+    """Одна карта как Layout."""
+    batch = generate_batch([seed], width, height, params)
+    return Layout(batch["grid"][0], batch["free"][0], batch["dead_end"][0],
+                  batch["spawnable"][0], int(batch["pockets"][0]))
+
+
+# ---------------- Оценка параметров офлайн
+
+def evaluate(params=DEFAULT_PARAMS, width=40, height=22, count=10000, first_seed=0, batch_size=2000):
+    """Статистика генератора по count картам: доля свободного места, тупики, залитые карманы."""
+    start = time.perf_counter()
+    free_share = []
+    dead_ends = []
+    pockets = []
+    for lo in range(first_seed, first_seed + count, batch_size):
+        batch = generate_batch(range(lo, min(lo + batch_size, first_seed + count)), width, height, params)
+        free_share.append(batch["free"].mean(axis=(1, 2)))
+        dead_ends.append(batch["dead_end"].sum(axis=(1, 2)))
+        pockets.append(batch["pockets"])
+    elapsed = time.perf_counter() - start
+
+    free_share = np.concatenate(free_share)
+    dead_ends = np.concatenate(dead_ends)
+    pockets = np.concatenate(pockets)
+    return {
+        "maps": count,
+        "maps_per_second": count / elapsed if elapsed else 0.0,
+        "free_share_mean": float(free_share.mean()),
+        "free_share_min": float(free_share.min()),
+        "dead_ends_mean": float(dead_ends.mean()),
+        "pockets_mean": float(pockets.mean()),
+        "maps_with_pockets": float((pockets > 0).mean()),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Оценка параметров генератора карт")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--width", type=int, default=40)
+    parser.add_argument("--height", type=int, default=22)
+    parser.add_argument("--blocks", type=int, nargs="*", default=[DEFAULT_PARAMS.blocks])
+    parser.add_argument("--passages", type=int, default=DEFAULT_PARAMS.passages)
+    args = parser.parse_args()
+
+    for blocks in args.blocks:
+        params = LevelParams(blocks=blocks, passages=args.passages)
+        stats = evaluate(params, args.width, args.height, args.count)
+        print(params)
+        for key, value in stats.items():
+            print(f"  {key:<18}{value:,.3f}")
@@ -0,0 +1,133 @@
+"""Прямая видимость по тайловой сетке (DDA, обход вокселей Amanatides & Woo)."""
+import math
+
+BLOCKED = 1
+TIE_EPS = 1e-9  # ближе — сравниваем точно: ошибка float-шагов DDA на порядки меньше
+
+SCALE = 2.0 ** 64  # умножение на степень двойки в float точное
+
+
+def _exact(*values):
+    """Значения одним целым масштабом: float — двоичная дробь, так что
+    после умножения на общую степень двойки это точные целые."""
+    scaled = [v * SCALE for v in values]
+    if all(v.is_integer() for v in scaled):
+        ints = [int(v) for v in scaled]
+    else:
+        # совсем мелкие дроби — общий знаменатель через as_integer_ratio
+        ratios = [float(v).as_integer_ratio() for v in values]
+        scale = max(den for _, den in ratios)  # знаменатели — степени двойки
+        ints = [num * (scale // den) for num, den in ratios]
+    # лишние общие нули в младших битах убираем — меньше длинной арифметики
+    low = 0
+    for v in ints:
+        low |= v
+    shift = (low & -low).bit_length() - 1
+    return [v >> shift for v in ints]
+
+
+def raycast(grid, x1, y1, x2, y2, tile):
+    """Идёт по клеткам отрезка от (x1, y1) к (x2, y2).
+
+    Возвращает ((cx, cy), дистанция) для первой стены на пути
+    или (None, длина отрезка), если путь свободен.
+    Стоимость — O(число пересечённых клеток).
+
+    Какую границу клетки луч пересечёт раньше, решают float; если они
+    ближе TIE_EPS — точно, в целых (tie_order). Иначе луч через угол клеток
+    шёл то по углу, то мимо в зависимости от направления, и A→B
+    расходилось с B→A.
+    """
+    rows = len(grid)
+    cols = len(grid[0]) if rows else 0
+
+    cx = int(x1 // tile)
+    cy = int(y1 // tile)
+    if not (0 <= cx < cols and 0 <= cy < rows) or grid[cy][cx] == BLOCKED:
+        return (cx, cy), 0.0
+
+    dx = x2 - x1
+    dy = y2 - y1
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return None, 0.0
+
+    # t — параметр вдоль отрезка (0..1), на котором пересекаем границу клетки
+    if dx > 0:
+        step_x = 1
+        t_max_x = ((cx + 1) * tile - x1) / dx
+        t_delta_x = tile / dx
+    elif dx < 0:
+        step_x = -1
+        t_max_x = (cx * tile - x1) / dx
+        t_delta_x = -tile / dx
+    else:
+        step_x = 0
+        t_max_x = t_delta_x = math.inf
+
+    if dy > 0:
+        step_y = 1
+        t_max_y = ((cy + 1) * tile - y1) / dy
+        t_delta_y = tile / dy
+    elif dy < 0:
+        step_y = -1
+        t_max_y = (cy * tile - y1) / dy
+        t_delta_y = -tile / dy
+    else:
+        step_y = 0
+        t_max_y = t_delta_y = math.inf
+
+    while True:
+        order = t_max_x - t_max_y
+        if -TIE_EPS <= order <= TIE_EPS:
+            order = tie_order(x1, y1, x2, y2, tile, cx, cy)
+        if order < 0:
+            t = t_max_x
+            if t > 1:
+                break
+            cx += step_x
+            t_max_x += t_delta_x
+        elif order > 0:
+            t = t_max_y
+            if t > 1:
+                break
+            cy += step_y
+            t_max_y += t_delta_y
+        else:
+            # ровно через угол: не даём взгляду проскочить между двумя стенами
+            t = t_max_x
+            if t > 1:
+                break
+            for nx, ny in ((cx + step_x, cy), (cx, cy + step_y)):
+                if not (0 <= nx < cols and 0 <= ny < rows) or grid[ny][nx] == BLOCKED:
+                    return (nx, ny), t * length
+            cx += step_x
+            cy += step_y
+            t_max_x += t_delta_x
+            t_max_y += t_delta_y
+
+        if not (0 <= cx < cols and 0 <= cy < rows) or grid[cy][cx] == BLOCKED:
+            return (cx, cy), t * length
+
+    return None, length
+
+
+def tie_order(x1, y1, x2, y2, tile, cx, cy):
+    """Знак t_x - t_y для луча в клетке (cx, cy), посчитанный точно.
+
+    Координаты переводятся в целые общего масштаба (_exact);
+    t_x = ex / |dx|, t_y = ey / |dy|, где ex, ey — расстояния до следующих
+    границ по осям; знак разности — знак ex * |dy| - ey * |dx|.
+    """
+    x1, y1, x2, y2, tile = _exact(x1, y1, x2, y2, tile)
+    dx = x2 - x1
+    dy = y2 - y1
+    ex = (cx + 1) * tile - x1 if dx > 0 else x1 - cx * tile
+    ey = (cy + 1) * tile - y1 if dy > 0 else y1 - cy * tile
+    order = ex * abs(dy) - ey * abs(dx)
+    return (order > 0) - (order < 0)
+
+
+def line_clear(grid, x1, y1, x2, y2, tile):
+    """Проверка прямой видимости между двумя точками мира."""
+    return raycast(grid, x1, y1, x2, y2, tile)[0] is None
@@ -2,404 +2,139 @@ import arcade
 import random
 import math
 import time
-from audio import music
-from save import load_game, save_game
-from resources import resource_path
+from audio import music, sfx
+from save import load_game
+import textures
+from static_layer import ChunkedLayer
+from profiler import Profiler, ProfilerOverlay
+from simulation import Simulation, TILE, CHUNK, BULLET_SIZE, BULLET_POOL_SIZE
 
 SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 640
 SCREEN_TITLE = "Hotline Miami Style"
 
-TILE = 48
-MAP_W = 30
-MAP_H = 20
-
-PLAYER_SPEED = 350  # Быстрое плавное движение
-BULLET_SPEED = 1000  # Очень быстрые пули
-ENEMY_SPEED = 180
-MELEE_RANGE = 44
-MELEE_COOLDOWN = 0.3
-PLAYER_SIZE = 22
-ENEMY_SIZE = 20
-BULLET_SIZE = 4
-WALL_COLOR = (35, 35, 35)
-
-FIRE_RATE_PISTOL = 0.15
-FIRE_RATE_SHOTGUN = 0.8
-SHOTGUN_PELLETS = 7
-SHOTGUN_SPREAD_DEG = 28
-
-# Gameplay settings
-ONE_HIT_PLAYER = True
-ONE_HIT_ENEMY = True
-
-
-# ---------------- Utilities
-
-def normalize(vx, vy):
-    dist = math.hypot(vx, vy)
-    if dist == 0:
-        return 0.0, 0.0
-    return vx / dist, vy / dist
-
-
-def sample_line_clear(x1, y1, x2, y2, wall_list, step=8):
-    """Проверка прямой видимости."""
-    dx = x2 - x1
-    dy = y2 - y1
-    dist = math.hypot(dx, dy)
-    if dist == 0:
-        return True
-    nx = dx / dist
-    ny = dy / dist
-    steps = int(dist / step)
-    for i in range(1, steps + 1):
-        sx = x1 + nx * (i * step)
-        sy = y1 + ny * (i * step)
-        hits = arcade.get_sprites_at_point((sx, sy), wall_list)
-        if hits:
-            return False
-    return True
-
-# ---------------- Entities
+# Тряска камеры
+SHAKE_PISTOL = 2
+SHAKE_SHOTGUN = 7
+SHAKE_DECAY = 40  # пикселей амплитуды в секунду
 
-class Decor(arcade.Sprite):
-    def __init__(self, texture_path, x, y, scale=0.6):
-        super().__init__(texture_path, scale=scale)
-        self.center_x = x
-        self.center_y = y
-
-
-
-class Wall(arcade.SpriteSolidColor):
-    def __init__(self, w, h, color, center_x, center_y):
-        super().__init__(w, h, color)
-        self.center_x = center_x
-        self.center_y = center_y
-
-
-class Bullet(arcade.SpriteCircle):
-    def __init__(self, dx, dy):
-        super().__init__(BULLET_SIZE, (255, 255, 100))
-        self.vx = dx * BULLET_SPEED
-        self.vy = dy * BULLET_SPEED
-        self.lifetime = 1.0  # 1 секунда жизни
-        self.spawn_time = time.time()
-
-    def update(self, delta_time):
-        current_time = time.time()
-        if current_time - self.spawn_time > self.lifetime:
-            self.kill()
-            return
-
-        self.center_x += self.vx * delta_time
-        self.center_y += self.vy * delta_time
-
-
-class Particle(arcade.SpriteCircle):
-    def __init__(self, size, color, dx, dy, life):
-        super().__init__(size, color)
-        self.dx = dx
-        self.dy = dy
-        self.life = life
-
-    def update(self, delta_time: float = 0):
-        self.center_x += self.dx
-        self.center_y += self.dy
-        self.life -= 1
-        if self.life <= 0:
-            self.kill()
+# Размер мира в тайлах; None — один экран
+MAP_W = None
+MAP_H = None
 
+# Сколько кусков уровня запекать за кадр заранее: следующий уровень во время
+# отсчёта и соседние с экраном куски при прокрутке
+PREPARE_CHUNKS_PER_FRAME = 1
 
+# Время на AI врагов за кадр: сверх него дальние враги думают на следующем шаге
+AI_BUDGET = 0.002
 
 
+# ---------------- Sprites
+# Только картинки: положение и логика живут в simulation.py
 
-class Actor(arcade.Sprite):
-    def __init__(self, size=20, color=(255, 255, 255)):
-        super().__init__()
-        self.texture = arcade.make_circle_texture(size*2, color)
-        self.width = size * 2
-        self.height = size * 2
-        self.alive = True
-
-
-    def kill_actor(self):
-        self.alive = False
-        self.kill()
-
-
-
-class Player(arcade.Sprite):
-    def __init__(self, x, y):
-        super().__init__(resource_path("assets/player.png"), scale=0.6)
-        self.center_x = x
-        self.center_y = y
-        self.alive = True
-        self.speed = PLAYER_SPEED
-        self.width = 40  # примерно визуальный размер
-        self.height = 40
-        self.angle = 0
-        self.last_fire = 0
-        self.last_melee = 0
-        self.weapon = 'pistol'
-        self.ammo = {'pistol': 24, 'shotgun': 8}
-        self.max_ammo = {'pistol': 24, 'shotgun': 8}
-        self.reloading = False
-        self.reload_timer = 0
-        self.reload_time = {'pistol': 1.5, 'shotgun': 2.1}
-        self.health = 100
-
-        def kill_actor(self):
-            self.alive = False
-            # чтобы спрайт исчезал со сцены
-            self.kill()
-
-
-
-class Enemy(arcade.Sprite):
-    def __init__(self, x, y):
-        super().__init__(resource_path("assets/thug_2.png"), scale=0.6)
+class Decor(arcade.Sprite):
+    def __init__(self, texture, x, y, scale=0.6):
+        super().__init__(texture, scale=scale)
         self.center_x = x
         self.center_y = y
-        self.width = 34 # примерно визуальный размер
-        self.height = 34
-        self.state = 'patrol'
-        self.patrol_target = None
-        self.vision_radius = 550  # было 350
-        self.attack_radius = 60  # было 60
-
-
-        self.activation_delay = random.uniform(0.6, 1.2)
-        self.spawn_time = time.time()
-
-        self.vx = 0
-        self.vy = 0
-        self.last_attack_time = 0
-        self.attack_cooldown = 1.0
-        self.speed = ENEMY_SPEED
-        self.chase_speed_mult = 1.35
-        self.last_state_change = 0
-        self.stun_timer = 0
-        self.alive = True
-        self.stuck_timer = 0
-        self.last_seen_time = 0
-        self.last_seen_pos = None
-        self.last_seen_time = 0
-        self.last_seen_pos = None
-        self.memory_time = 12.5
-
-        # --- ПАТРУЛЬ ---
-        self.patrol_points = []
-        self.patrol_index = 0
-        self.patrol_wait_timer = 0
-        self.patrol_wait_time = random.uniform(0.3, 1.1)
-
-        self.prev_x = self.center_x
-        self.prev_y = self.center_y
-        self.stuck_time = 0.0
-
-
-        # --- ПОИСК ---
-        self.search_timer = 0
-        self.search_duration = random.uniform(1.0, 2.0)
-    def pick_patrol_points(self, wall_list, count=4, radius=260):
-        """Генерит точки патруля вокруг текущей позиции, чтобы не было хождения в стену."""
-        self.patrol_points.clear()
-        tries = 0
-
-        while len(self.patrol_points) < count and tries < 200:
-            tries += 1
-            px = self.center_x + random.uniform(-radius, radius)
-            py = self.center_y + random.uniform(-radius, radius)
-
-            # временный спрайт для проверки коллизий
-            temp = arcade.SpriteSolidColor(self.width, self.height, (0, 0, 0))
-            temp.center_x = px
-            temp.center_y = py
-
-            if not arcade.check_for_collision_with_list(temp, wall_list):
-                self.patrol_points.append((px, py))
-
-        if not self.patrol_points:
-            self.patrol_points = [(self.center_x, self.center_y)]
-        self.patrol_index = 0
-
-    def move_towards(self, tx, ty, wall_list, speed, delta_time):
-        """Двигает врага к точке с коллизиями."""
-        dx = tx - self.center_x
-        dy = ty - self.center_y
-        dist = math.hypot(dx, dy)
-        if dist == 0:
-            return True
-
-        nx = dx / dist
-        ny = dy / dist
 
-        move_x = nx * speed * delta_time
-        move_y = ny * speed * delta_time
 
-        old_x = self.center_x
-        self.center_x += move_x
-        if arcade.check_for_collision_with_list(self, wall_list) or \
-                arcade.check_for_collision_with_list(self, self.game.decor_list):
-            self.center_x = old_x
-
-        old_y = self.center_y
-        self.center_y += move_y
-        if arcade.check_for_collision_with_list(self, wall_list) or \
-                arcade.check_for_collision_with_list(self, self.game.decor_list):
-            self.center_y = old_y
-
-        self.angle = math.degrees(math.atan2(-dy, dx)) + 90
-
-        return dist < 14
-
-    def kill_actor(self):
-        self.alive = False
-        self.kill()
-
-    def update_ai(self, player, wall_list, delta_time):
-        if time.time() - self.spawn_time < self.activation_delay:
-            return None
-
-        # если оглушён
-        if self.stun_timer > 0:
-            self.stun_timer -= delta_time
-            return None
-
-        now = time.time()
-        moved = math.hypot(self.center_x - self.prev_x, self.center_y - self.prev_y)
-
-        if moved < 0.5:
-            self.stuck_time += delta_time
-        else:
-            self.stuck_time = 0.0
-
-        self.prev_x = self.center_x
-        self.prev_y = self.center_y
-        dx = player.center_x - self.center_x
-        dy = player.center_y - self.center_y
-        dist = math.hypot(dx, dy)
-
-        # видимость
-        can_see = False
-        if dist < self.vision_radius:
-            can_see = sample_line_clear(
-                self.center_x, self.center_y,
-                player.center_x, player.center_y,
-                wall_list
-            )
-
-        # ---------------- ЕСЛИ ВИДИТ ИГРОКА ----------------
-        if can_see and dist < self.vision_radius:
-            self.state = "chase"
-            self.last_seen_time = now
-            self.last_seen_pos = (player.center_x, player.center_y)
-
-            chase_speed = self.speed * self.chase_speed_mult
-
-            # идём к игроку
-            if dist > self.attack_radius:
-                self.move_towards(player.center_x, player.center_y, wall_list, chase_speed, delta_time)
-
-            # атака
-            if dist <= self.attack_radius and now - self.last_attack_time > self.attack_cooldown:
-                self.last_attack_time = now
-                return "attack"
-
-            return None
-
-        # ---------------- ЕСЛИ ПОТЕРЯЛ, НО ПОМНИТ ----------------
-        if self.last_seen_pos and (now - self.last_seen_time) < self.memory_time:
-            self.state = "search"
-
-            tx, ty = self.last_seen_pos
-            arrived = self.move_towards(tx, ty, wall_list, self.speed * 1.15, delta_time)
-
-            # дошёл до последней позиции — начинает "искать"
-            if arrived:
-                self.search_timer += delta_time
-
-                # типа "сканит" местность: крутится на месте
-                self.angle += 180 * delta_time
-
-                if self.search_timer >= self.search_duration:
-                    # не нашёл — забывает
-                    self.last_seen_pos = None
-                    self.search_timer = 0
-
-            return None
-
-        # ---------------- ПАТРУЛЬ ----------------
-        if self.state != "patrol":
-            self.state = "patrol"
-            self.patrol_wait_timer = 0
-
-        # если нет точек патруля — создаём
-        if not self.patrol_points:
-            self.pick_patrol_points(wall_list, count=4, radius=280)
-
-        # ожидание на точке
-        if self.patrol_wait_timer > 0:
-            self.patrol_wait_timer -= delta_time
-            return None
+class PlayerSprite(arcade.Sprite):
+    def __init__(self):
+        super().__init__(textures.get("player"), scale=0.6)
+        self.width = 40  # примерно визуальный размер
+        self.height = 40
 
-        tx, ty = self.patrol_points[self.patrol_index]
-        arrived = self.move_towards(tx, ty, wall_list, self.speed * 0.75, delta_time)
-        if self.stuck_time > 0.7:
-            self.patrol_index = (self.patrol_index + 1) % len(self.patrol_points)
-            self.patrol_wait_timer = 0.0
 
-            # если совсем в тупике — генерим новые точки
-            if self.stuck_time > 1.4:
-                self.pick_patrol_points(wall_list, count=4, radius=320)
+class EnemySprite(arcade.Sprite):
+    def __init__(self):
+        super().__init__(textures.get("thug_2"), scale=0.6)
+        self.width = 34  # примерно визуальный размер
+        self.height = 34
 
-            self.stuck_time = 0.0
-            return None
 
-        if arrived:
-            # стоим на точке чуть-чуть, потом следующая
-            self.patrol_wait_timer = self.patrol_wait_time
-            self.patrol_wait_time = random.uniform(0.3, 1.1)
+class LevelLayers:
+    """Запечённые слои уровня по кускам: пол + мебель и отдельно стены + трупы.
+
+    Трупы впечатываются в слой стен, поверх них — как рисовались до
+    запекания, и без лишнего прохода по экрану.
+
+    Спрайты пола, стен и мебели создаются только на время запекания куска.
+    Пока идёт отсчёт после зачистки, окно запекает куски вокруг точки
+    спавна следующего уровня (его план уже посчитан в фоне) — к смене
+    уровня остаётся только подменить слои.
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+        world_width = plan.map_w * TILE
+        world_height = plan.map_h * TILE
+        self.ground = ChunkedLayer(world_width, world_height, CHUNK, self.paint_ground)
+        self.walls = ChunkedLayer(world_width, world_height, CHUNK, self.paint_walls)
+
+        # мебель по кускам: крупный предмет попадает в несколько
+        self.decor = {}
+        for d in plan.decor:
+            sprite = Decor(textures.get(d.name), d.center_x, d.center_y, scale=d.scale)
+            for key in self.ground.keys(d.center_x - d.width / 2, d.center_y - d.height / 2,
+                                        d.center_x + d.width / 2, d.center_y + d.height / 2):
+                self.decor.setdefault(key, []).append(sprite)
+
+    def tiles(self, left, bottom, right, top):
+        """Клетки сетки внутри куска."""
+        grid = self.plan.grid
+        x0 = int(left // TILE)
+        y0 = int(bottom // TILE)
+        x1 = min(int(right // TILE), len(grid[0]))
+        y1 = min(int(top // TILE), len(grid))
+        return [(x, y) for y in range(y0, y1) for x in range(x0, x1)]
+
+    def tile_sprite(self, texture, scale, x, y):
+        sprite = arcade.Sprite(texture, scale=scale)
+        sprite.center_x = x * TILE + TILE / 2
+        sprite.center_y = y * TILE + TILE / 2
+        sprite.width = TILE
+        sprite.height = TILE
+        return sprite
+
+    def paint_ground(self, left, bottom, right, top):
+        floor_texture = textures.get("floor")
+        floor = arcade.SpriteList()
+        for x, y in self.tiles(left, bottom, right, top):
+            floor.append(self.tile_sprite(floor_texture, 1.0, x, y))
+        decor = arcade.SpriteList()
+        for sprite in self.decor.get((int(left // CHUNK), int(bottom // CHUNK)), ()):
+            decor.append(sprite)
+        return floor, decor
+
+    def paint_walls(self, left, bottom, right, top):
+        wall_texture = textures.get("wall")
+        grid = self.plan.grid
+        walls = arcade.SpriteList()
+        for x, y in self.tiles(left, bottom, right, top):
+            if grid[y][x] == 1:
+                walls.append(self.tile_sprite(wall_texture, 0.1, x, y))
+        return (walls,)
 
-            self.patrol_index += 1
-            if self.patrol_index >= len(self.patrol_points):
-                self.patrol_index = 0
+    def prepare(self, left, bottom, right, top, budget=None):
+        """Запекает недостающие куски прямоугольника в обоих слоях (budget — на слой)."""
+        return self.ground.prepare(left, bottom, right, top, budget) + \
+            self.walls.prepare(left, bottom, right, top, budget)
 
-        return None
+    def stamp(self, sprite):
+        self.walls.stamp(sprite)
 
 
 # ---------------- Game
 
 class GameWindow(arcade.View):
-    def __init__(self):
+    def __init__(self, map_w=None, map_h=None, level=None, total_kills=None, autosave=True):
         # создаём полноэкранное окно
         super().__init__()
         arcade.set_background_color((15, 15, 15))
         self.SCREEN_WIDTH, self.SCREEN_HEIGHT = self.window.get_size()
 
-        self.decor_textures = [
-            resource_path("assets/chair1.png"),
-            resource_path("assets/chair2.png"),
-            resource_path("assets/flower1.png"),
-            resource_path("assets/flower2.png"),
-            resource_path("assets/lamp1.png"),
-            resource_path("assets/lamp2.png"),
-            resource_path("assets/musor1.png"),
-            resource_path("assets/musor2.png"),
-            resource_path("assets/sofa.png"),
-            resource_path("assets/table1.png"),
-            resource_path("assets/table2.png"),
-            resource_path("assets/table3.png"),
-            resource_path("assets/table4.png"),
-        ]
-
-        # Пересчёт тайлов под новый размер
-        global TILE, MAP_W, MAP_H
-        TILE = 48  # можно оставить или масштабировать
-        MAP_W = self.SCREEN_WIDTH // TILE
-        MAP_H = self.SCREEN_HEIGHT // TILE
-
         # HUD, камеры, спрайты и всё остальное — оставляем как есть
         self.hud_message = arcade.Text("", 20, self.SCREEN_HEIGHT - 40, arcade.color.WHITE, 16)
         self.hud_enemies = arcade.Text("", 20, self.SCREEN_HEIGHT - 70, arcade.color.RED, 14)
@@ -418,35 +153,56 @@ class GameWindow(arcade.View):
         self.dead_sub = arcade.Text("PRESS R TO RESTART", self.SCREEN_WIDTH // 2, self.SCREEN_HEIGHT // 2 - 30,
                                     arcade.color.WHITE, 24, anchor_x="center", font_name="Kenney Future")
 
+        # --- симуляция: мир задан в тайлах, по умолчанию — один экран ---
+        # level/total_kills не заданы — продолжаем сохранённую игру
+        saved_level, saved_kills = load_game()
+        level = saved_level if level is None else level
+        total_kills = saved_kills if total_kills is None else total_kills
+        map_w = map_w or MAP_W or self.SCREEN_WIDTH // TILE
+        map_h = map_h or MAP_H or self.SCREEN_HEIGHT // TILE
+        self.sim = Simulation(map_w, map_h, level=level, total_kills=total_kills, autosave=autosave)
+        # враги думают только в кусках рядом с экраном
+        self.sim.active_size = (self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
+        self.sim.ai_scheduler.budget = AI_BUDGET
+        self.generation = -1  # какой уровень симуляции сейчас нарисован
+
+        # --- профайлер (F3 — показать, F4 — сохранить CSV) ---
+        self.profiler = Profiler()
+        self.profiler.gpu_sync = self.window.ctx.finish
+        self.sim.profiler = self.profiler
+        self.profiler_overlay = None
+
         # остальной init код без изменений
         self.flash_timer = 0
-        self.shake = 0
-        self.blood_splats = []
-        self.neon_offset = 0
-        self.player: Player = None
+        self.shake = 0.0  # амплитуда тряски камеры в пикселях
+        textures.load_all()  # все картинки один раз, до создания спрайтов
+        self.player_sprite = PlayerSprite()
         self.player_list = arcade.SpriteList()
+        self.player_list.append(self.player_sprite)
         self.enemy_list = arcade.SpriteList()
-        self.wall_list = arcade.SpriteList(use_spatial_hash=True)
+        self.enemy_sprites = {}  # враг симуляции -> спрайт
+        # запечённые по кускам слои уровня; staged — следующий уровень во время отсчёта
+        self.layers = None
+        self.staged = None
+
+        # --- спрайты пуль: по одному на слот пула, лишние скрыты ---
         self.bullet_list = arcade.SpriteList()
-        self.particle_list = arcade.SpriteList()
-        self.floor_list = arcade.SpriteList(use_spatial_hash=True)
-        self.decor_list = arcade.SpriteList(use_spatial_hash=True)
-        self.corpse_list = arcade.SpriteList()
+        for _ in range(BULLET_POOL_SIZE):
+            sprite = arcade.SpriteCircle(BULLET_SIZE, (255, 255, 100))
+            sprite.visible = False
+            self.bullet_list.append(sprite)
 
         # --- КАМЕРЫ ---
         self.world_camera = arcade.camera.Camera2D()
         self.gui_camera = arcade.camera.Camera2D()
 
-        # Размер мира
-        self.world_width = MAP_W * TILE
-        self.world_height = MAP_H * TILE
-
         # Плавность
         self.camera_lerp = 0.15
 
         # Мёртвая зона
         self.dead_zone_w = int(self.SCREEN_WIDTH * 0.35)
         self.dead_zone_h = int(self.SCREEN_HEIGHT * 0.45)
+        self.camera_pos = (self.SCREEN_WIDTH / 2, self.SCREEN_HEIGHT / 2)
 
         self.keys_pressed = {
             arcade.key.W: False,
@@ -457,32 +213,46 @@ class GameWindow(arcade.View):
         self.mouse_x = 0
         self.mouse_y = 0
 
-        self.total_kills = 0
-        self.level, self.total_kills = load_game()
-
-        self.message = ''
-        self.paused = False
-        self.last_update_time = time.time()
         #вспышки темные
         self.dark_time = 0
         self.dark_alpha = 0
 
         self.setup()
 
-    def is_free_cell(self, grid, x, y):
-        """Клетка свободна и не является тупиком"""
-        if grid[y][x] != 0:
-            return False
+    # уровень, счёт и игрок живут в симуляции
+    @property
+    def level(self):
+        return self.sim.level
+
+    @level.setter
+    def level(self, value):
+        self.sim.level = value
 
-        free = 0
-        if grid[y + 1][x] == 0: free += 1
-        if grid[y - 1][x] == 0: free += 1
-        if grid[y][x + 1] == 0: free += 1
-        if grid[y][x - 1] == 0: free += 1
+    @property
+    def total_kills(self):
+        return self.sim.total_kills
+
+    @total_kills.setter
+    def total_kills(self, value):
+        self.sim.total_kills = value
+
+    @property
+    def player(self):
+        return self.sim.player
+
+    @property
+    def world_width(self):
+        return self.sim.world_width
+
+    @property
+    def world_height(self):
+        return self.sim.world_height
 
-        return free >= 2
     def on_update(self, delta_time: float):
+        self.profiler.begin_frame()
         self.update(delta_time)  # вызываем твой update каждый кадр
+        with self.profiler.section("update.camera"):
+            self.update_camera(delta_time)
         if self.flash_timer > 0:
             self.flash_timer -= delta_time
 
@@ -496,233 +266,196 @@ class GameWindow(arcade.View):
         self.window.set_mouse_visible(True)
         self.window.set_exclusive_mouse(False)
         self.SCREEN_WIDTH, self.SCREEN_HEIGHT = self.window.get_size()
+        sfx.load()
         music.play_game()
 
+    def setup(self):
+        self.sim.setup()
+        self.sync_level()
+        self.sync_sprites()
 
-    def spawn_decorations(self, decor_textures, count=10):
-        """Добавляет случайные декорации на карту без пересечений."""
-        tries = 0
-        placed = 0
-        max_tries = count * 20  # чтобы не застрять в бесконечном цикле
-
-        while placed < count and tries < max_tries:
-            tries += 1
-
-            x = random.randint(1, MAP_W - 2) * TILE + TILE / 2
-            y = random.randint(1, MAP_H - 2) * TILE + TILE / 2
-
-            decor = Decor(random.choice(decor_textures), x, y, scale=0.6)
-
-
-            # Проверяем пересечения
-            collision = arcade.check_for_collision_with_list(decor, self.wall_list) or \
-                        arcade.check_for_collision_with_list(decor, self.player_list) or \
-                        arcade.check_for_collision_with_list(decor, self.enemy_list) or \
-                        arcade.check_for_collision_with_list(decor, self.decor_list)
-            if not collision:
-                self.decor_list.append(decor)
-                placed += 1
-
-
-    def make_map(self):
-        grid = [[0 for _ in range(MAP_W)] for __ in range(MAP_H)]
-        # Границы
-        for x in range(MAP_W):
-            grid[0][x] = 1
-            grid[MAP_H - 1][x] = 1
-        for y in range(MAP_H):
-            grid[y][0] = 1
-            grid[y][MAP_W - 1] = 1
-
-        # Случайные комнаты
-        for _ in range(8):  # Меньше стен для тестирования
-            w = random.randint(2, 4)
-            h = random.randint(2, 4)
-            sx = random.randint(1, MAP_W - w - 2)
-            sy = random.randint(1, MAP_H - h - 2)
-            for yy in range(sy, sy + h):
-                for xx in range(sx, sx + w):
-                    grid[yy][xx] = 1
-
-        # Создаем несколько проходов
-        for _ in range(6):
-            x = random.randint(3, MAP_W - 4)
-            y = random.randint(3, MAP_H - 4)
-            if grid[y][x] == 1:
-                grid[y][x] = 0
-
-        return grid
-
-    def is_open_space(grid, x, y, radius=1):
-        """Проверяет, что вокруг тайла есть хотя бы одно свободное место (0) в квадрате radius*radius"""
-        for dy in range(-radius, radius + 1):
-            for dx in range(-radius, radius + 1):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < MAP_W and 0 <= ny < MAP_H:
-                    if grid[ny][nx] == 0:
-                        return True
-        return False
+    def sync_level(self):
+        """Пересоздаёт спрайты карты, если симуляция сгенерировала новый уровень."""
+        if self.generation == self.sim.generation:
+            return
+        self.generation = self.sim.generation
 
-    def setup(self):
-        # --- очистка ---
-        self.player_list.clear()
         self.enemy_list.clear()
-        self.wall_list.clear()
-        self.floor_list.clear()
-        self.decor_list.clear()
-        self.bullet_list.clear()
-        self.particle_list.clear()
-        self.corpse_list.clear()
-
-        # --- карта ---
-        grid = self.make_map()
-
-        # --- стены ---
-        for y in range(MAP_H):
-            for x in range(MAP_W):
-                if grid[y][x] == 1:
-                    wx = x * TILE + TILE / 2
-                    wy = y * TILE + TILE / 2
-                    wall = arcade.Sprite(resource_path("assets/wall.png"), scale=0.1)
-                    wall.center_x = wx
-                    wall.center_y = wy
-                    wall.width = TILE
-                    wall.height = TILE
-                    self.wall_list.append(wall)
-
-        # --- пол ---
-        for y in range(MAP_H):
-            for x in range(MAP_W):
-                fx = x * TILE + TILE / 2
-                fy = y * TILE + TILE / 2
-                floor = arcade.Sprite(resource_path("assets/floor.png"), scale=1.0)
-                floor.center_x = fx
-                floor.center_y = fy
-                floor.width = TILE
-                floor.height = TILE
-                self.floor_list.append(floor)
-
-        # --- СПАВН ИГРОКА (без тупиков) ---
-        self.player = None
-        center_x, center_y = MAP_W // 2, MAP_H // 2
-
-        for radius in range(1, 10):
-            for dx in range(-radius, radius + 1):
-                for dy in range(-radius, radius + 1):
-                    x = center_x + dx
-                    y = center_y + dy
-
-                    if 1 <= x < MAP_W - 1 and 1 <= y < MAP_H - 1:
-                        if self.is_free_cell(grid, x, y):
-                            px = x * TILE + TILE / 2
-                            py = y * TILE + TILE / 2
-
-                            temp_player = Player(px, py)
-
-                            if not arcade.check_for_collision_with_list(temp_player, self.wall_list):
-                                self.player = temp_player
-                                break
-
-                if self.player:
-                    break
-            if self.player:
-                break
-
-        # fallback если карта плохая
-        if not self.player:
-            self.player = Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-
-        self.player_list.append(self.player)
-
-        # --- ВРАГИ ---
-        for _ in range(4 + self.level):
-            tries = 0
-            while tries < 50:
-                x = random.randint(1, MAP_W - 2)
-                y = random.randint(1, MAP_H - 2)
-
-                if self.is_free_cell(grid, x, y):
-                    ex = x * TILE + TILE / 2
-                    ey = y * TILE + TILE / 2
-
-                    # не рядом с игроком
-                    dist = math.hypot(
-                        ex - self.player.center_x,
-                        ey - self.player.center_y
-                    )
-
-                    if dist > 200:
-                        enemy = Enemy(ex, ey)
-                        enemy.game = self
-
-                        if not arcade.check_for_collision_with_list(enemy, self.wall_list):
-                            self.enemy_list.append(enemy)
-                            break
-
-                tries += 1
-
-        # --- декор ---
-        self.spawn_decorations(self.decor_textures, count=8)
-
-        # --- текст уровня ---
-        self.message = f"LEVEL {self.level} - KILL ALL ENEMIES"
-        self.last_update_time = time.time()
-
-        # --- размеры мира ---
-        self.world_width = MAP_W * TILE
-        self.world_height = MAP_H * TILE
+        self.enemy_sprites = {}
+
+        # --- слои: готовые из отсчёта или новые (куски запекутся при выводе) ---
+        staged = self.staged
+        self.staged = None
+        if staged is None or staged.plan is not self.sim.plan:
+            staged = LevelLayers(self.sim.plan)
+        if self.layers is not None:
+            staged.ground.adopt(self.layers.ground)
+            staged.walls.adopt(self.layers.walls)
+        self.layers = staged
+
+        # --- камера сразу на игроке ---
+        self.camera_pos = self.clamp_camera(self.player.center_x, self.player.center_y)
+
+    def stage_next_level(self):
+        """Во время отсчёта запекает куски вокруг спавна уровня, план которого готов в фоне."""
+        plan = self.sim.next_plan
+        if plan is None or not plan.ready:
+            return
+        if self.staged is None or self.staged.plan is not plan:
+            self.staged = LevelLayers(plan)
+        self.staged.prepare(*self.view_rect(self.clamp_camera(*plan.player_pos)),
+                            budget=PREPARE_CHUNKS_PER_FRAME)
+
+    def sync_sprites(self):
+        """Переносит положения из симуляции в спрайты."""
+        player = self.sim.player
+        self.player_sprite.position = (player.center_x, player.center_y)
+        self.player_sprite.angle = player.angle
+        self.player_sprite.visible = player.alive
+
+        left, bottom, right, top = self.view_rect(margin=TILE)
+        for enemy in self.sim.enemies:
+            sprite = self.enemy_sprites.get(enemy)
+            if sprite is None:
+                sprite = EnemySprite()
+                self.enemy_sprites[enemy] = sprite
+                self.enemy_list.append(sprite)
+            sprite.position = (enemy.center_x, enemy.center_y)
+            sprite.angle = enemy.angle
+            sprite.visible = left <= enemy.center_x <= right and bottom <= enemy.center_y <= top
+        if len(self.enemy_sprites) != len(self.sim.enemies):
+            for enemy in [e for e in self.enemy_sprites if not e.alive]:
+                self.enemy_sprites.pop(enemy).remove_from_sprite_lists()
+
+        bullets = list(self.sim.bullets)
+        for i, sprite in enumerate(self.bullet_list):
+            if i < len(bullets):
+                sprite.position = (bullets[i].center_x, bullets[i].center_y)
+                sprite.visible = True
+            elif sprite.visible:
+                sprite.visible = False
+
+    def handle_events(self):
+        """Разбирает события симуляции: тряска от выстрелов, трупы в пол, звуки."""
+        for kind, data in self.sim.events:
+            if kind == "shot":
+                self.shake = max(self.shake, SHAKE_PISTOL if data == 'pistol' else SHAKE_SHOTGUN)
+                sfx.play(data)
+            elif kind == "corpse":
+                sprite = self.enemy_sprites.get(data)
+                if sprite is not None:
+                    self.stamp_corpse(data, sprite.scale)
+                sfx.play("enemy_death")
+            elif kind == "hit":
+                sfx.play("hit")
+            elif kind == "melee":
+                sfx.play("melee")
+                sfx.play("enemy_death")
+            elif kind == "death":
+                sfx.play("player_death")
+        self.sim.events.clear()
+
+    def update_camera(self, delta_time):
+        """Камера следует за игроком: мёртвая зона + плавное догоняние."""
+        cx, cy = self.camera_pos
+
+        # цель сдвигается, только когда игрок вышел из мёртвой зоны
+        tx, ty = cx, cy
+        dz_w = self.dead_zone_w / 2
+        dz_h = self.dead_zone_h / 2
+        if self.player.center_x > cx + dz_w:
+            tx = self.player.center_x - dz_w
+        elif self.player.center_x < cx - dz_w:
+            tx = self.player.center_x + dz_w
+        if self.player.center_y > cy + dz_h:
+            ty = self.player.center_y - dz_h
+        elif self.player.center_y < cy - dz_h:
+            ty = self.player.center_y + dz_h
+
+        tx, ty = self.clamp_camera(tx, ty)
+
+        # camera_lerp задан для 60 fps — пересчитываем под реальный кадр
+        k = 1 - (1 - self.camera_lerp) ** (delta_time * 60)
+        self.camera_pos = (cx + (tx - cx) * k, cy + (ty - cy) * k)
+
+        self.shake = max(0.0, self.shake - SHAKE_DECAY * delta_time)
+
+    def clamp_camera(self, x, y):
+        """Центр камеры так, чтобы не показывать пустоту за границами мира."""
+        half_w = self.SCREEN_WIDTH / 2
+        half_h = self.SCREEN_HEIGHT / 2
+        x = min(max(x, half_w), max(half_w, self.world_width - half_w))
+        y = min(max(y, half_h), max(half_h, self.world_height - half_h))
+        return x, y
+
+    def view_rect(self, center=None, margin=0):
+        """Видимая часть мира (left, bottom, right, top) для центра камеры."""
+        cx, cy = center or self.camera_pos
+        half_w = self.SCREEN_WIDTH / 2 + margin
+        half_h = self.SCREEN_HEIGHT / 2 + margin
+        return cx - half_w, cy - half_h, cx + half_w, cy + half_h
+
+    def mouse_world(self):
+        """Позиция мыши в координатах мира."""
+        cx, cy = self.camera_pos
+        return (self.mouse_x - self.SCREEN_WIDTH / 2 + cx,
+                self.mouse_y - self.SCREEN_HEIGHT / 2 + cy)
 
     def on_draw(self):
         self.clear((18, 10, 30))  # тёмно-фиолетовый
-        self.floor_list.draw()  # Рисуем пол
-        self.decor_list.draw()  # ← МЕБЕЛЬ
-        self.wall_list.draw()
-        self.corpse_list.draw()# Рисуем стены поверх пола
-        self.player_list.draw()  # Персонажи
-        self.enemy_list.draw()
-        self.bullet_list.draw()
-        self.particle_list.draw()
-
-        sx = random.randint(-self.shake, self.shake)
-        sy = random.randint(-self.shake, self.shake)
-        self.shake = max(0, self.shake - 1)
-
-
-        # --- Тряска экрана (если есть) ---
-        shake_x = random.uniform(-getattr(self, "screen_shake", 0), getattr(self, "screen_shake", 0)) if getattr(self,
-                                                                                                                 "screen_shake",
-                                                                                                                 0) > 0 else 0
-        shake_y = random.uniform(-getattr(self, "screen_shake", 0), getattr(self, "screen_shake", 0)) if getattr(self,
-                                                                                                                 "screen_shake",
-                                                                                                                 0) > 0 else 0
-
-        # --- Рисуем спрайты ---
-        for sl in (self.wall_list, self.bullet_list, self.enemy_list, self.player_list, self.particle_list):
-            for spr in sl:
-                spr.center_x += shake_x
-                spr.center_y += shake_y
-            sl.draw()
-            for spr in sl:
-                spr.center_x -= shake_x
-                spr.center_y -= shake_y
-
-        # --- Вспышка экрана ---
-        if getattr(self, "flash_alpha", 0) > 0:
-            arcade.draw_lrtb_rectangle_filled(0, SCREEN_WIDTH, SCREEN_HEIGHT, 0,
-                                              (self.flash_color[0], self.flash_color[1], self.flash_color[2],
-                                               int(self.flash_alpha)))
 
+        # --- Мир: тряска — это только смещение камеры ---
+        cx, cy = self.camera_pos
+        if self.shake > 0:
+            cx += random.uniform(-self.shake, self.shake)
+            cy += random.uniform(-self.shake, self.shake)
+        self.world_camera.position = (cx, cy)
+
+        prof = self.profiler
+        view = self.view_rect((cx, cy), margin=self.shake)
+        with self.world_camera.activate():
+            with prof.section("draw.ground", sync=True):
+                self.layers.ground.draw(*view)  # пол и мебель
+            with prof.section("draw.walls", sync=True):
+                self.layers.walls.draw(*view)  # стены поверх пола, трупы и кровь поверх стен
+            with prof.section("draw.bullets", sync=True):
+                self.bullet_list.draw()
+            with prof.section("draw.enemies", sync=True):
+                self.enemy_list.draw()
+            with prof.section("draw.player", sync=True):
+                self.player_list.draw()  # Персонажи
+            with prof.section("draw.particles", sync=True):
+                self.sim.particles.draw()
+
+        # --- GUI ---
+        self.gui_camera.use()
+        sw, sh = self.SCREEN_WIDTH, self.SCREEN_HEIGHT
+
+        with prof.section("draw.hud", sync=True):
+            self.draw_hud(sw, sh)
+        with prof.section("draw.overlays", sync=True):
+            self.draw_overlays(sw, sh)
+
+        if prof.enabled:
+            prof.count("enemies", len(self.enemy_list))
+            prof.count("bullets", len(self.sim.bullet_pool.active))
+            prof.count("particles", len(self.sim.particles))
+            prof.count("chunks", self.layers.ground.drawn)
+            prof.count("baked", len(self.layers.ground.chunks))
+            prof.count("awake", self.sim.active_enemies)
+            prof.count("stamps", self.layers.walls.pending())
+            self.profiler_overlay.draw(sw, sh)
+
+    def draw_hud(self, sw, sh):
         # --- HUD ---
-        hud_x, hud_y = shake_x, shake_y  # сдвиг HUD вместе с экраном (опционально)
-
-        self.hud_message.text = self.message
-        self.hud_message.x = 20 + hud_x
-        self.hud_message.y = SCREEN_HEIGHT - 40 + hud_y
+        self.hud_message.text = self.sim.message
+        self.hud_message.x = 20
+        self.hud_message.y = sh - 40
         self.hud_message.draw()
 
-        self.hud_enemies.text = f'ENEMIES: {len(self.enemy_list)}'
-        self.hud_enemies.x = 20 + hud_x
-        self.hud_enemies.y = SCREEN_HEIGHT - 70 + hud_y
+        self.hud_enemies.text = f'ENEMIES: {len(self.sim.enemies)}'
+        self.hud_enemies.x = 20
+        self.hud_enemies.y = sh - 70
         self.hud_enemies.draw()
 
 
@@ -731,8 +464,8 @@ class GameWindow(arcade.View):
         maxa = self.player.max_ammo.get(self.player.weapon, 0)
         reload_status = ' [RELOADING]' if self.player.reloading else ''
         self.hud_weapon.text = f'{w}: {ammo}/{maxa}{reload_status}'
-        self.hud_weapon.x = 20 + hud_x
-        self.hud_weapon.y = SCREEN_HEIGHT - 100 + hud_y
+        self.hud_weapon.x = 20
+        self.hud_weapon.y = sh - 100
         self.hud_weapon.draw()
 
         # Цвет здоровья
@@ -744,42 +477,49 @@ class GameWindow(arcade.View):
             hc = arcade.color.RED
         self.hud_health.text = f'HEALTH: {self.player.health}'
         self.hud_health.color = hc
-        self.hud_health.x = 20 + hud_x
-        self.hud_health.y = SCREEN_HEIGHT - 130 + hud_y
+        self.hud_health.x = 20
+        self.hud_health.y = sh - 130
         self.hud_health.draw()
 
-        self.hud_controls.x = 20 + hud_x
-        self.hud_controls.y = 20 + hud_y
+        self.hud_controls.x = 20
+        self.hud_controls.y = 20
         self.hud_controls.draw()
 
+    def draw_overlays(self, sw, sh):
+        """Пауза, экран смерти, вспышки и затемнение."""
+        # --- Вспышка экрана ---
+        if getattr(self, "flash_alpha", 0) > 0:
+            arcade.draw_lrtb_rectangle_filled(0, sw, sh, 0,
+                                              (self.flash_color[0], self.flash_color[1], self.flash_color[2],
+                                               int(self.flash_alpha)))
 
         # --- Пауза ---
-        if self.paused:
-            left, right = SCREEN_WIDTH // 2 - 200, SCREEN_WIDTH // 2 + 200
-            bottom, top = SCREEN_HEIGHT // 2 - 50, SCREEN_HEIGHT // 2 + 50
+        if self.sim.paused:
+            left, right = sw // 2 - 200, sw // 2 + 200
+            bottom, top = sh // 2 - 50, sh // 2 + 50
             arcade.draw_lrbt_rectangle_filled(left, right, bottom, top, (0, 0, 0, 120))
-            self.paused_text.x = SCREEN_WIDTH // 2 + hud_x
-            self.paused_text.y = SCREEN_HEIGHT // 2 + hud_y
+            self.paused_text.x = sw // 2
+            self.paused_text.y = sh // 2
             self.paused_text.draw()
 
         # --- Смерть игрока ---
         if not self.player.alive:
-            left, right = SCREEN_WIDTH // 2 - 250, SCREEN_WIDTH // 2 + 250
-            bottom, top = SCREEN_HEIGHT // 2 - 75, SCREEN_HEIGHT // 2 + 75
+            left, right = sw // 2 - 250, sw // 2 + 250
+            bottom, top = sh // 2 - 75, sh // 2 + 75
             arcade.draw_lrbt_rectangle_filled(left, right, bottom, top, (0, 0, 0, 120))
-            self.dead_title.x = SCREEN_WIDTH // 2 + hud_x
-            self.dead_title.y = SCREEN_HEIGHT // 2 + 30 + hud_y
+            self.dead_title.x = sw // 2
+            self.dead_title.y = sh // 2 + 30
             self.dead_title.draw()
-            self.dead_sub.x = SCREEN_WIDTH // 2 + hud_x
-            self.dead_sub.y = SCREEN_HEIGHT // 2 - 30 + hud_y
+            self.dead_sub.x = sw // 2
+            self.dead_sub.y = sh // 2 - 30
             self.dead_sub.draw()
 
         if self.flash_timer > 0:
             arcade.draw_rectangle_filled(
-                SCREEN_WIDTH // 2,
-                SCREEN_HEIGHT // 2,
-                SCREEN_WIDTH,
-                SCREEN_HEIGHT,
+                sw // 2,
+                sh // 2,
+                sw,
+                sh,
                 (255, 255, 255, 90)
             )
         # Затемнение экрана
@@ -795,10 +535,10 @@ class GameWindow(arcade.View):
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ESCAPE:
             from menu import MenuView
-            from save import save_game
 
-            # сохраняем текущий прогресс
-            save_game(self.level, self.total_kills)
+            # сохраняем текущий прогресс и дописываем уровень в историю
+            self.sim.finish()
+            self.sim.save()
             self.window.show_view(MenuView())
             return
             # WASD — отмечаем как нажатые
@@ -806,21 +546,25 @@ class GameWindow(arcade.View):
             self.keys_pressed[key] = True
             return True
 
-        if key in self.keys_pressed:
-            self.keys_pressed[key] = True
-        elif key == arcade.key.SPACE:
-            self.do_melee()
+        if key == arcade.key.SPACE:
+            self.sim.melee()
         elif key == arcade.key.R:
-            self.level = 1
-            self.setup()
+            self.sim.restart()
+            self.sync_level()
+            self.sync_sprites()
         elif key == arcade.key.P:
-            self.paused = not self.paused
+            self.sim.paused = not self.sim.paused
         elif key == arcade.key.KEY_1 or key == arcade.key.NUM_1:
-            if not self.player.reloading:
-                self.player.weapon = 'pistol'
+            self.sim.switch_weapon('pistol')
         elif key == arcade.key.KEY_2 or key == arcade.key.NUM_2:
-            if not self.player.reloading:
-                self.player.weapon = 'shotgun'
+            self.sim.switch_weapon('shotgun')
+        elif key == arcade.key.F3:
+            if self.profiler_overlay is None:
+                self.profiler_overlay = ProfilerOverlay(self.profiler)
+            self.profiler.toggle()
+        elif key == arcade.key.F4 and self.profiler.enabled:
+            path = self.profiler.dump_csv(time.strftime("profile_%Y%m%d_%H%M%S.csv"))
+            self.sim.message = f"PROFILE SAVED: {path}"
 
 
     def on_key_release(self, key, modifiers):
@@ -835,290 +579,58 @@ class GameWindow(arcade.View):
         self.mouse_x = x
         self.mouse_y = y
 
-
-
     def on_mouse_press(self, x, y, button, modifiers):
         if button == arcade.MOUSE_BUTTON_LEFT:
-            self.shoot()
-
-    def shoot(self):
-        if not self.player or not self.player.alive or self.paused or self.player.reloading:
-            return
-
-        # --- вычисляем направление прямо перед выстрелом ---
-        dx = self.mouse_x - self.player.center_x
-        dy = self.mouse_y - self.player.center_y
-
-        # --- остальной код стрельбы ---
-
-        # остальной код без изменений
-
-        current_time = time.time()
-        weapon = self.player.weapon
-
-        if self.player.ammo[weapon] <= 0:
-            self.player.reloading = True
-            self.player.reload_timer = current_time
-            return
-
-        rate = FIRE_RATE_PISTOL if weapon == 'pistol' else FIRE_RATE_SHOTGUN
-        if current_time - self.player.last_fire < rate:
-            return
+            self.sim.aim_x, self.sim.aim_y = self.mouse_world()
+            self.sim.shoot()
 
-        self.player.last_fire = current_time
-
-        dx = self.mouse_x - self.player.center_x
-        dy = self.mouse_y - self.player.center_y
-        if dx == 0 and dy == 0:
-            return
-
-        nx, ny = normalize(dx, dy)
-
-        if weapon == 'pistol':
-            bx = Bullet(nx, ny)
-            bx.center_x = self.player.center_x + nx * 30
-            bx.center_y = self.player.center_y + ny * 30
-            self.bullet_list.append(bx)
-            self.player.ammo['pistol'] -= 1
-
-
-
-            # Вспышка
-            for _ in range(3):
-                px = Particle(2, (255, 255, 200),
-                              nx * random.uniform(3, 5) + random.uniform(-1, 1),
-                              ny * random.uniform(3, 5) + random.uniform(-1, 1),
-                              life=random.randint(5, 10))
-                px.center_x = self.player.center_x + nx * 25
-                px.center_y = self.player.center_y + ny * 25
-                self.particle_list.append(px)
-
-        else:  # shotgun
-            spread = SHOTGUN_SPREAD_DEG / 2
-            for i in range(SHOTGUN_PELLETS):
-                angle = math.atan2(ny, nx) + math.radians(random.uniform(-spread, spread))
-                sx = math.cos(angle)
-                sy = math.sin(angle)
-                b = Bullet(sx, sy)
-                b.center_x = self.player.center_x + sx * 30
-                b.center_y = self.player.center_y + sy * 30
-                self.bullet_list.append(b)
-
-            self.player.ammo['shotgun'] -= 1
-
-
-            # Большая вспышка
-            for _ in range(8):
-                px = Particle(3, (255, 220, 100),
-                              nx * random.uniform(4, 7) + random.uniform(-2, 2),
-                              ny * random.uniform(4, 7) + random.uniform(-2, 2),
-                              life=random.randint(8, 15))
-                px.center_x = self.player.center_x + nx * 25
-                px.center_y = self.player.center_y + ny * 25
-                self.particle_list.append(px)
-
-    def do_melee(self):
-        if not self.player or not self.player.alive or self.paused:
-            return
-        # остальной код без изменений
-
-        current_time = time.time()
-        if current_time - self.player.last_melee < MELEE_COOLDOWN:
-            return
-
-        self.player.last_melee = current_time
-        angle_rad = math.radians(self.player.angle)
-        fx = math.cos(angle_rad)
-        fy = math.sin(angle_rad)
-
-        to_kill = []
-        for enemy in self.enemy_list:
-            dx = enemy.center_x - self.player.center_x
-            dy = enemy.center_y - self.player.center_y
-            proj = dx * fx + dy * fy
-            dist = math.hypot(dx, dy)
-            if dist <= MELEE_RANGE and proj > 0:
-                to_kill.append(enemy)
-
-        for e in to_kill:
-            spawn_blood(self.particle_list, e.center_x, e.center_y)
-            e.kill_actor()
-
-        if to_kill:
-            self.message = f'MELEE KILL - {len(to_kill)} ENEMIES'
-
-    def kill_enemy(self, enemy):
-        self.total_kills += 1
+    def stamp_corpse(self, enemy, scale):
+        """Впечатывает труп и пятно крови поверх стен."""
         corpse = arcade.Sprite(
-            resource_path("assets/bloods2.png"),  # СПРАЙТ ЛЕЖАЩЕГО ЧУВАКА
-            scale=enemy.scale
+            textures.get("bloods2"),  # СПРАЙТ ЛЕЖАЩЕГО ЧУВАКА
+            scale=scale
         )
         corpse.center_x = enemy.center_x
         corpse.center_y = enemy.center_y
         corpse.angle = enemy.angle
 
-        self.corpse_list.append(corpse)
-        enemy.remove_from_sprite_lists()
+        # пятно крови под трупом, оба впечатываются в слой стен
+        blood = arcade.Sprite(textures.get("bloods"), scale=scale)
+        blood.center_x = enemy.center_x
+        blood.center_y = enemy.center_y
+        blood.angle = random.uniform(0, 360)
+
+        self.layers.stamp(blood)
+        self.layers.stamp(corpse)
 
     # ---------------- Основной апдейт
     def update(self, delta_time):
-        if self.paused:
-            self.particle_list.update()
-            self.bullet_list.update()
-            return
-
-        if not self.player or not self.player.alive:
-            self.particle_list.update()
-            self.bullet_list.update()
-            if len(self.enemy_list) == 0:
-                self.level += 1
-                self.setup()
-            return
-
-        current_time = time.time()
-
-        # --- Пули ---
-        for bullet in self.bullet_list:
-            bullet.update(delta_time)
-            if arcade.check_for_collision_with_list(bullet, self.wall_list):
-                for _ in range(2):
-                    px = Particle(1, (200, 200, 200),
-                                  random.uniform(-2, 2),
-                                  random.uniform(-2, 2),
-                                  life=random.randint(5, 10))
-                    px.center_x = bullet.center_x
-                    px.center_y = bullet.center_y
-                    self.particle_list.append(px)
-                bullet.kill()
-                continue
-
-            enemies_hit = arcade.check_for_collision_with_list(bullet, self.enemy_list)
-            if enemies_hit:
-                for enemy in enemies_hit:
-                    spawn_blood(self.particle_list, enemy.center_x, enemy.center_y)
-                    self.kill_enemy(enemy)
-                    enemy.kill_actor()
-                bullet.kill()
-                continue
-
-            if arcade.check_for_collision_with_list(bullet, self.wall_list) or \
-                    arcade.check_for_collision_with_list(bullet, self.decor_list):
-                bullet.kill()
-                continue
-
-        self.particle_list.update()
-
-        # --- Перезарядка оружия ---
-        if self.player.reloading:
-            w = self.player.weapon
-            if current_time - self.player.reload_timer > self.player.reload_time[w]:
-                self.player.ammo[w] = self.player.max_ammo[w]
-                self.player.reloading = False
-
-        # --- AI врагов ---
-        for enemy in self.enemy_list:
-            action = enemy.update_ai(self.player, self.wall_list, delta_time)
-            if action == 'attack':
-                if ONE_HIT_PLAYER:
-                    self.player.alive = False
-                    self.player.kill()
-                    self.message = 'YOU DIED - PRESS R TO RESTART'
-                    return
-                else:
-                    self.player.health -= 20
-                    if self.player.health <= 0:
-                        self.player.alive = False
-                        self.player.kill()
-                        self.message = 'YOU DIED - PRESS R TO RESTART'
-                        return
-
-        # --- Движение игрока ---
+        # --- ввод ---
         move_x = move_y = 0
         if self.keys_pressed[arcade.key.W]: move_y += 1
         if self.keys_pressed[arcade.key.S]: move_y -= 1
         if self.keys_pressed[arcade.key.A]: move_x -= 1
         if self.keys_pressed[arcade.key.D]: move_x += 1
+        self.sim.move_x, self.sim.move_y = move_x, move_y
+        self.sim.aim_x, self.sim.aim_y = self.mouse_world()
+
+        self.sim.update(delta_time)
 
-        if move_x != 0 or move_y != 0:
-            # нормализация диагонали
-            if move_x != 0 and move_y != 0:
-                move_x *= 0.7071
-                move_y *= 0.7071
-
-            dx = move_x * self.player.speed * delta_time
-            dy = move_y * self.player.speed * delta_time
-
-            # движение по X
-            old_x = self.player.center_x
-            self.player.center_x += dx
-            if arcade.check_for_collision_with_list(self.player, self.wall_list) or \
-                    arcade.check_for_collision_with_list(self.player, self.decor_list):
-                self.player.center_x = old_x
-
-            old_y = self.player.center_y
-            self.player.center_y += dy
-            if arcade.check_for_collision_with_list(self.player, self.wall_list) or \
-                    arcade.check_for_collision_with_list(self.player, self.decor_list):
-                self.player.center_y = old_y
-
-            # частицы шагов
-            if current_time - self.last_update_time > 0.05:
-                for _ in range(2):
-                    px = Particle(1, (100, 100, 100), 0, 0, life=random.randint(15, 25))
-                    px.center_x = self.player.center_x + random.uniform(-5, 5)
-                    px.center_y = self.player.center_y + random.uniform(-5, 5)
-                    self.particle_list.append(px)
-                self.last_update_time = current_time
-
-
-        # --- Вращение к мышке ---
-        dx = self.mouse_x - self.player.center_x
-        dy = self.mouse_y - self.player.center_y
-        if dx != 0 or dy != 0:
-            self.player.angle = math.degrees(math.atan2(-dy, dx)) + 90
-
-        # --- Победа на уровне ---
-        if len(self.enemy_list) == 0:
-            if not getattr(self, 'level_cleared', False):
-                self.level_cleared = True
-                self.level_cleared_time = current_time
-                self.message = f'LEVEL {self.level} CLEARED! GET READY...'
-                for _ in range(20):
-                    px = Particle(random.randint(2, 4),
-                                  (random.randint(200, 255), random.randint(200, 255), 50),
-                                  random.uniform(-10, 10),
-                                  random.uniform(-10, 10),
-                                  life=random.randint(20, 40))
-                    px.center_x = self.player.center_x
-                    px.center_y = self.player.center_y
-                    self.particle_list.append(px)
-
-            elif current_time - self.level_cleared_time > 1.5:
-                self.level_cleared = False
-                self.level += 1
-                # Сохраняем прогресс
-                save_game(self.level, self.total_kills)
-                self.setup()
-
-
-def spawn_blood(particle_list, x, y):
-    for _ in range(12):
-        angle = random.random() * math.pi * 2
-        speed = random.uniform(2, 6)
-        dx = math.cos(angle) * speed
-        dy = math.sin(angle) * speed
-        p = Particle(random.randint(2, 4),
-                     (random.randint(180, 220), 20, 20),
-                     dx, dy,
-                     life=random.randint(15, 30))
-        p.center_x = x + random.uniform(-5, 5)
-        p.center_y = y + random.uniform(-5, 5)
-        particle_list.append(p)
+        with self.profiler.section("update.sync"):
+            self.sync_frame()
 
+    def sync_frame(self):
+        # трупы штампуем, пока спрайты врагов ещё на месте
+        self.handle_events()
+        self.sync_level()
+        self.sync_sprites()
+        # куски у края экрана — заранее, по одному за кадр
+        self.layers.prepare(*self.view_rect(margin=CHUNK / 2), budget=PREPARE_CHUNKS_PER_FRAME)
+        self.stage_next_level()
 
 
 if __name__ == '__main__':
     window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
     game = GameWindow()
     window.show_view(game)
-    arcade.run()
\ No newline at end of file
+    arcade.run()
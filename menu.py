@@ -1,8 +1,14 @@
+import startup  # первым: от него считается время запуска
+import threading
+
 import arcade
-from main import GameWindow  # в main.py должен быть GameView(arcade.View)
 from audio import music
 from save import init_db
-from export import export_to_word
+
+# main (игра: numpy, симуляция, спрайты) и export импортируются, когда
+# нужны, — меню показывается раньше. main подгружается в фоне после
+# первого кадра, так что к ENTER он обычно уже готов
+startup.mark("imports")
 
 SCREEN_TITLE = "Miami Gun"
 
@@ -11,6 +17,9 @@ class MenuView(arcade.View):
         super().__init__()
         self.timer = 0
         self.blink = True
+        self.export = None  # export.StatsExport — идёт в фоне, меню не ждёт
+        self.export_text = arcade.Text("", 0, 0, arcade.color.LIGHT_GRAY, 16, anchor_x="center")
+        self.export_warning = arcade.Text("", 0, 0, arcade.color.ORANGE, 16, anchor_x="center")
 
 
     def on_show_view(self):
@@ -66,6 +75,35 @@ class MenuView(arcade.View):
             anchor_x="center"
         )
 
+        if self.export:
+            self.draw_export(w, h)
+
+        if not startup.reported:
+            startup.first_frame()
+            threading.Thread(target=preload_game, name="preload-game", daemon=True).start()
+
+    def draw_export(self, w, h):
+        """Прогресс экспорта полосой под пунктами меню."""
+        job = self.export
+        y = h // 2 - 140
+        if job.running:
+            left, width = w // 2 - 200, 400
+            arcade.draw_lbwh_rectangle_outline(left, y, width, 12, arcade.color.HOT_PINK, 2)
+            if job.progress > 0:
+                arcade.draw_lbwh_rectangle_filled(left, y, width * job.progress, 12, arcade.color.HOT_PINK)
+            self.export_text.text = f"EXPORTING... {job.progress:.0%}"
+        else:
+            self.export_text.text = job.message
+        self.export_text.x = w // 2
+        self.export_text.y = y - 30
+        self.export_text.draw()
+        # пропущенный формат — отдельной строкой, чтобы не потерялся в пути к папке
+        if job.skipped:
+            self.export_warning.text = "  ".join(job.skipped)
+            self.export_warning.x = w // 2
+            self.export_warning.y = y - 60
+            self.export_warning.draw()
+
     def on_update(self, delta_time: float):
         self.timer += delta_time
         if self.timer >= 0.45:
@@ -74,24 +112,31 @@ class MenuView(arcade.View):
 
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ENTER:
+            from main import GameWindow
             self.window.show_view(GameWindow())
 
         elif key == arcade.key.N:
             # NEW GAME — сброс прогресса
-            game = GameWindow()
-            game.level = 1
-            game.total_kills = 0
-            game.setup()
-            self.window.show_view(game)
+            from main import GameWindow
+            self.window.show_view(GameWindow(level=1, total_kills=0))
 
         elif key == arcade.key.ESCAPE:
             arcade.close_window()
         elif key == arcade.key.M:
-            export_to_word()
+            if not (self.export and self.export.running):
+                from export import StatsExport
+                self.export = StatsExport().start()
+
+def preload_game():
+    """Импорт игры в фоне, пока игрок смотрит на меню."""
+    import main  # noqa: F401
+
 
 def main():
     init_db()
+    startup.mark("save_db")
     window = arcade.Window(title=SCREEN_TITLE, fullscreen=True)
+    startup.mark("window")
     window.show_view(MenuView())
     arcade.run()
 
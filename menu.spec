@@ -6,7 +6,8 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('assets', 'assets'), ('music', 'music')],
-    hiddenimports=[],
+    # экспорт импортирует их в потоке — PyInstaller сам их не найдёт
+    hiddenimports=['pyarrow', 'pyarrow.parquet'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,37 +1,118 @@
-import arcade
+"""Фоновая музыка меню и игры.
+
+Треки не декодируются целиком при запуске: файл открывается потоком
+(pyglet StreamingSource) только когда трек впервые нужен, и дальше
+читается кусками во время игры. Зацикливает сам pyglet Player
+(loop: на конце трека перемотка в начало) — у arcade.Sound потоковый
+звук не зацикливается. Если файла нет или нечем его декодировать,
+музыки просто не будет: ошибка в лог, игра идёт дальше.
+
+Треки сменяются плавно: новый нарастает, старый за то же время затихает,
+после чего его плеер удаляется (поток и голос микшера освобождаются).
+Громкость двигает таймер pyglet.clock — он тикает внутри arcade.run().
+"""
+import logging
+
 from resources import resource_path
 
-class MusicManager:
-    def __init__(self):
-        # Загружаем музыку один раз
-        self.menu_music = arcade.load_sound(resource_path("music/menu.ogg"))
-        self.game_music = arcade.load_sound(resource_path("music/game.ogg"))
+log = logging.getLogger(__name__)
 
+TRACKS = {
+    "menu": "music/menu.ogg",
+    "game": "music/game.ogg",
+}
+FADE_TIME = 1.0  # секунд на смену трека
+FADE_TICK = 1 / 30  # шаг громкости при смене
+
+
+class MusicManager:
+    def __init__(self, volume=0.6):
+        self.volume = volume
+        self.players = {}  # трек -> pyglet Player (играет или затихает)
+        self.missing = set()  # треки, которые не открылись, — не пробуем каждый раз
+        self.fading = {}  # трек -> плеер, который затихает
         self.player = None
         self.current = None  # "menu" или "game"
+        self.target = volume  # громкость текущего трека после нарастания
+        self._ticking = False
+
+    def _load(self, track_name):
+        if track_name in self.missing:
+            return None
+        if track_name not in self.players:
+            from pyglet import media
 
-    def _play(self, sound, track_name, volume=0.6):
+            try:
+                source = media.load(resource_path(TRACKS[track_name]), streaming=True)
+            except Exception as exc:  # нет файла или декодера (ogg без ffmpeg/libvorbis)
+                log.warning("music: cannot open %s: %s", TRACKS[track_name], exc)
+                self.missing.add(track_name)
+                return None
+            player = media.Player()
+            player.queue(source)
+            player.loop = True
+            player.volume = 0.0
+            self.players[track_name] = player
+        return self.players[track_name]
+
+    def _play(self, track_name, volume=None):
         # Если уже играет этот трек — ничего не делаем
         if self.current == track_name:
             return
 
-        # Остановить предыдущий
+        # Предыдущий затихает
         if self.player:
-            self.player.pause()
+            self.fading[self.current] = self.player
 
-        # Запустить новый
-        self.player = sound.play(volume=volume, loop=True)
+        # Новый нарастает; если он ещё затихал — с того же места, иначе с начала
+        self.player = self._load(track_name)
         self.current = track_name
+        self.target = self.volume if volume is None else volume
+        if self.player:
+            if self.fading.pop(track_name, None) is None:
+                self.player.seek(0)
+            self.player.play()
+        self._start_fade()
+
+    def _start_fade(self):
+        if self._ticking:
+            return
+        import pyglet
+
+        pyglet.clock.schedule_interval(self._fade, FADE_TICK)
+        self._ticking = True
+
+    def _fade(self, delta_time):
+        step = self.volume * delta_time / FADE_TIME
+        done = True
+        if self.player and self.player.volume < self.target:
+            self.player.volume = min(self.target, self.player.volume + step)
+            done = False
+        for track_name, player in list(self.fading.items()):
+            player.volume = max(0.0, player.volume - step)
+            if player.volume > 0:
+                done = False
+                continue
+            player.pause()
+            player.delete()
+            del self.fading[track_name]
+            del self.players[track_name]
+        if done:
+            import pyglet
+
+            pyglet.clock.unschedule(self._fade)
+            self._ticking = False
 
     # --- публичные методы ---
     def play_menu(self):
-        self._play(self.menu_music, "menu")
+        self._play("menu")
 
     def play_game(self):
-        self._play(self.game_music, "game")
+        self._play("game")
 
     def stop(self):
         if self.player:
-            self.player.pause()
+            self.fading[self.current] = self.player
             self.player = None
-            self.current = None
\ No newline at end of file
+            self.current = None
+            self._start_fade()
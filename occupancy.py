@@ -0,0 +1,128 @@
+"""Сетка занятости для движения: стены и мебель растеризуются в мелкие клетки.
+
+Столкновение прямоугольника (игрок, враг) проверяется не против спрайтов,
+а по байтам сетки. Сдвиг идёт отдельно по X и по Y: проверяются только
+клетки, в которые вступает передний край, и объект останавливается
+вплотную к препятствию.
+"""
+import math
+
+import numpy as np
+
+OCC_CELL = 8  # пикселей; делит тайл 48 без остатка
+EPS = 1e-6  # зазор у стены, чтобы край не попал в занятую клетку из-за округления
+
+
+class OccupancyGrid:
+    def __init__(self, width, height, cell=OCC_CELL):
+        self.cell = cell
+        self.cols = int(math.ceil(width / cell))
+        self.rows = int(math.ceil(height / cell))
+        self.cells = bytearray(self.cols * self.rows)
+
+    @classmethod
+    def from_tiles(cls, grid, tile, cell=OCC_CELL):
+        """Сетка из карты тайлов (1 — стена): списки или массив NumPy."""
+        rows = len(grid)
+        cols = len(grid[0]) if rows else 0
+        occ = cls(cols * tile, rows * tile, cell)
+        k = tile // cell
+        if k * cell != tile:
+            for y, row in enumerate(grid):
+                for x, value in enumerate(row):
+                    if value == 1:
+                        occ.fill_rect(x * tile, y * tile, (x + 1) * tile, (y + 1) * tile)
+            return occ
+
+        # тайл делится на клетки нацело: каждый тайл — блок k x k клеток
+        walls = (np.asarray(grid) == 1).astype(np.uint8)
+        occ.cells[:] = np.repeat(np.repeat(walls, k, axis=0), k, axis=1).tobytes()
+        return occ
+
+    # --- клетки ---
+    def span(self, lo, hi):
+        """Клетки, которые накрывает отрезок [lo, hi) по одной оси."""
+        return int(math.floor(lo / self.cell)), int(math.ceil(hi / self.cell)) - 1
+
+    def fill_rect(self, left, bottom, right, top, value=1):
+        """Помечает все клетки, хотя бы частично накрытые прямоугольником."""
+        c0, c1 = self.span(left, right)
+        r0, r1 = self.span(bottom, top)
+        c0 = max(c0, 0)
+        c1 = min(c1, self.cols - 1)
+        if c0 > c1:
+            return
+        fill = bytes([value]) * (c1 - c0 + 1)
+        for r in range(max(r0, 0), min(r1, self.rows - 1) + 1):
+            start = r * self.cols
+            self.cells[start + c0:start + c1 + 1] = fill
+
+    def rect_blocked(self, left, bottom, right, top):
+        """Накрывает ли прямоугольник занятую клетку. За границей — занято."""
+        c0, c1 = self.span(left, right)
+        r0, r1 = self.span(bottom, top)
+        if c0 < 0 or r0 < 0 or c1 >= self.cols or r1 >= self.rows:
+            return True
+        cells = self.cells
+        cols = self.cols
+        for r in range(r0, r1 + 1):
+            if 1 in cells[r * cols + c0:r * cols + c1 + 1]:
+                return True
+        return False
+
+    def _column_blocked(self, c, r0, r1):
+        if c < 0 or c >= self.cols or r0 < 0 or r1 >= self.rows:
+            return True
+        cells = self.cells
+        cols = self.cols
+        for r in range(r0, r1 + 1):
+            if cells[r * cols + c]:
+                return True
+        return False
+
+    def _row_blocked(self, r, c0, c1):
+        if r < 0 or r >= self.rows or c0 < 0 or c1 >= self.cols:
+            return True
+        start = r * self.cols
+        return 1 in self.cells[start + c0:start + c1 + 1]
+
+    # --- движение ---
+    def sweep_x(self, left, bottom, right, top, dx):
+        """Насколько можно сдвинуть прямоугольник по X (не больше dx по модулю)."""
+        if dx == 0:
+            return 0.0
+        r0, r1 = self.span(bottom, top)
+        cell = self.cell
+        if dx > 0:
+            last = int(math.ceil(right / cell)) - 1
+            new_last = int(math.ceil((right + dx) / cell)) - 1
+            for c in range(last + 1, new_last + 1):
+                if self._column_blocked(c, r0, r1):
+                    return max(0.0, c * cell - right - EPS)
+        else:
+            first = int(math.floor(left / cell))
+            new_first = int(math.floor((left + dx) / cell))
+            for c in range(first - 1, new_first - 1, -1):
+                if self._column_blocked(c, r0, r1):
+                    return min(0.0, (c + 1) * cell - left + EPS)
+        return dx
+
+    def sweep_y(self, left, bottom, right, top, dy):
+        """Насколько можно сдвинуть прямоугольник по Y (не больше dy по модулю)."""
+        if dy == 0:
+            return 0.0
+        c0, c1 = self.span(left, right)
+        cell = self.cell
+        if dy > 0:
+            last = int(math.ceil(top / cell)) - 1
+            new_last = int(math.ceil((top + dy) / cell)) - 1
+            for r in range(last + 1, new_last + 1):
+                if self._row_blocked(r, c0, c1):
+                    return max(0.0, r * cell - top - EPS)
+        else:
+            first = int(math.floor(bottom / cell))
+            new_first = int(math.floor((bottom + dy) / cell))
+            for r in range(first - 1, new_first - 1, -1):
+                if self._row_blocked(r, c0, c1):
+                    return min(0.0, (r + 1) * cell - bottom + EPS)
+        return dy
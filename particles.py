@@ -0,0 +1,162 @@
+"""Система частиц на массивах NumPy: векторное обновление и отрисовка одним вызовом."""
+import numpy as np
+
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_pos;
+in vec4 in_color;
+in float in_size;
+
+out vec4 v_color;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_pos, 0.0, 1.0);
+    gl_PointSize = in_size;
+    v_color = in_color;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+in vec4 v_color;
+out vec4 f_color;
+
+void main() {
+    // круглая точка
+    if (length(gl_PointCoord - vec2(0.5)) > 0.5)
+        discard;
+    f_color = v_color;
+}
+"""
+
+
+class ParticleSystem:
+    """Частицы живут в массивах; скорость — пикселей в секунду, жизнь — в секундах."""
+
+    def __init__(self, capacity=16384, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.dropped = 0
+        self.rng = np.random.default_rng(seed)
+
+        self.pos = np.zeros((capacity, 2), np.float32)
+        self.vel = np.zeros((capacity, 2), np.float32)
+        self.color = np.zeros((capacity, 4), np.uint8)
+        self.size = np.zeros(capacity, np.float32)  # диаметр в пикселях
+        self.life = np.zeros(capacity, np.float32)
+
+        # GL-ресурсы создаются при первой отрисовке
+        self._program = None
+        self._geometry = None
+        self._buffers = None
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, n, x, y, vx, vy, size, color, life):
+        """Добавляет n частиц. Любой аргумент — скаляр или массив длины n.
+
+        size — радиус (как у старых SpriteCircle), color — RGB/RGBA или массив (n, 3|4).
+        Лишнее сверх capacity отбрасывается.
+        """
+        requested = n
+        n = max(0, min(n, self.capacity - self.count))
+        self.dropped += requested - n
+        if n == 0:
+            return 0
+        s = slice(self.count, self.count + n)
+
+        self.pos[s, 0] = _head(x, n)
+        self.pos[s, 1] = _head(y, n)
+        self.vel[s, 0] = _head(vx, n)
+        self.vel[s, 1] = _head(vy, n)
+        self.size[s] = np.asarray(_head(size, n), np.float32) * 2
+
+        color = np.asarray(color)
+        if color.ndim == 2:
+            color = color[:n]
+        self.color[s, 3] = 255
+        self.color[s, :color.shape[-1]] = color
+
+        self.life[s] = _head(life, n)
+        self.count += n
+        return n
+
+    def update(self, delta_time):
+        n = self.count
+        if n == 0:
+            return
+        self.pos[:n] += self.vel[:n] * delta_time
+        self.life[:n] -= delta_time
+
+        dead = self.life[:n] <= 0
+        alive = n - int(np.count_nonzero(dead))
+        if alive == n:
+            return
+
+        # swap-компакция: дыры в начале заполняем живыми из хвоста
+        holes = np.flatnonzero(dead[:alive])
+        tail = np.flatnonzero(~dead[alive:]) + alive
+        if len(holes):
+            for arr in (self.pos, self.vel, self.color, self.size, self.life):
+                arr[holes] = arr[tail]
+        self.count = alive
+
+    def clear(self):
+        self.count = 0
+
+    def draw(self):
+        """Рисует все живые частицы одним вызовом."""
+        n = self.count
+        if n == 0:
+            return
+        import arcade
+        ctx = arcade.get_window().ctx
+        if self._program is None:
+            self._create_gl(ctx)
+
+        pos_buf, color_buf, size_buf = self._buffers
+        pos_buf.write(self.pos[:n].tobytes())
+        color_buf.write(self.color[:n].tobytes())
+        size_buf.write(self.size[:n].tobytes())
+
+        # размер точки берётся из gl_PointSize; в arcade 3.3 у контекста нет
+        # PROGRAM_POINT_SIZE — тогда константа pyglet. Флаг снимается после вывода
+        point_size = getattr(ctx, "PROGRAM_POINT_SIZE", None)
+        if point_size is None:
+            from pyglet import gl
+
+            point_size = gl.GL_PROGRAM_POINT_SIZE
+        with ctx.enabled(ctx.BLEND, point_size):
+            self._geometry.render(self._program, mode=ctx.POINTS, vertices=n)
+
+    def _create_gl(self, ctx):
+        from arcade.gl import BufferDescription
+
+        cap = self.capacity
+        self._buffers = (
+            ctx.buffer(reserve=cap * 8, usage="stream"),
+            ctx.buffer(reserve=cap * 4, usage="stream"),
+            ctx.buffer(reserve=cap * 4, usage="stream"),
+        )
+        pos_buf, color_buf, size_buf = self._buffers
+        self._geometry = ctx.geometry([
+            BufferDescription(pos_buf, "2f", ["in_pos"]),
+            BufferDescription(color_buf, "4f1", ["in_color"], normalized=["in_color"]),
+            BufferDescription(size_buf, "1f", ["in_size"]),
+        ], mode=ctx.POINTS)
+        self._program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+
+
+def _head(value, n):
+    """Обрезает массив до n элементов, скаляры оставляет как есть."""
+    if np.ndim(value):
+        return value[:n]
+    return value
@@ -0,0 +1,147 @@
+"""Восприятие врагов одним проходом NumPy.
+
+Позиции, тревога, таймеры и очередь планировщика всех врагов уровня лежат
+в массивах по слотам (enemy.slot; при удалении на место врага переезжает
+последний). Раз в шаг gather() переписывает позиции из объектов, а sense()
+сразу для пачки думающих врагов считает расстояние до игрока, радиусы
+зрения и атаки, застревание и перезарядку удара. Линия видимости
+проверяется только у тех, кто оказался в радиусе зрения, — тоже пачкой,
+одной строкой таблицы PVS.
+"""
+import numpy as np
+
+# массивы по слотам: имя -> (тип, начальное значение)
+FIELDS = {
+    "x": (np.float64, 0.0),
+    "y": (np.float64, 0.0),
+    "alert": (np.bool_, False),  # не патрулирует (погоня, поиск)
+    "prev_x": (np.float64, 0.0),  # позиция на прошлом обдумывании
+    "prev_y": (np.float64, 0.0),
+    "stuck_time": (np.float64, 0.0),  # сколько стоит на месте
+    "next_attack": (np.float64, -np.inf),  # раньше этого времени удар ещё перезаряжается
+    "stun": (np.float64, 0.0),  # оглушение, секунд
+    "wake_time": (np.float64, 0.0),  # до этого времени после спавна враг не думает
+    "vision": (np.float64, 0.0),  # радиусы и перезарядка — из Enemy при добавлении
+    "attack_radius": (np.float64, 0.0),
+    "attack_cooldown": (np.float64, 0.0),
+    # очередь планировщика (scheduler.py)
+    "last_think": (np.int64, 0),  # шаг, на котором враг думал последний раз
+    "phase": (np.int64, 0),  # сдвиг очереди у дальних, чтобы думали вразнобой
+    "overdue": (np.bool_, False),  # очередь пропущена из-за бюджета
+}
+
+
+class Perception:
+    def __init__(self, capacity=64):
+        self.enemies = []  # слот -> враг
+        self.added = 0  # всего добавлено (для сдвига очереди)
+        self.arrays = {name: np.full(capacity, value, dtype) for name, (dtype, value) in FIELDS.items()}
+        for name, array in self.arrays.items():
+            setattr(self, name, array)
+
+    def __len__(self):
+        return len(self.enemies)
+
+    def _grow(self):
+        for name, (dtype, value) in FIELDS.items():
+            old = self.arrays[name]
+            array = np.full(len(old) * 2, value, dtype)
+            array[:len(old)] = old
+            self.arrays[name] = array
+            setattr(self, name, array)
+
+    def add(self, enemy, step):
+        slot = len(self.enemies)
+        if slot == len(self.x):
+            self._grow()
+        for name, (_, value) in FIELDS.items():
+            self.arrays[name][slot] = value
+        self.x[slot] = self.prev_x[slot] = enemy.center_x
+        self.y[slot] = self.prev_y[slot] = enemy.center_y
+        self.wake_time[slot] = enemy.spawn_time + enemy.activation_delay
+        self.vision[slot] = enemy.vision_radius
+        self.attack_radius[slot] = enemy.attack_radius
+        self.attack_cooldown[slot] = enemy.attack_cooldown
+        self.last_think[slot] = step
+        self.phase[slot] = self.added
+        self.added += 1
+        enemy.slot = slot
+        self.enemies.append(enemy)
+
+    def remove(self, enemy):
+        slot = enemy.slot
+        last = len(self.enemies) - 1
+        if slot is None or slot > last or self.enemies[slot] is not enemy:
+            return
+        if slot != last:
+            moved = self.enemies[last]
+            for array in self.arrays.values():
+                array[slot] = array[last]
+            self.enemies[slot] = moved
+            moved.slot = slot
+        self.enemies.pop()
+        enemy.slot = None
+
+    def clear(self):
+        for enemy in self.enemies:
+            enemy.slot = None
+        self.enemies.clear()
+        self.added = 0
+
+    def gather(self):
+        """Позиции и тревога из объектов врагов — раз в шаг, до планировщика."""
+        n = len(self.enemies)
+        if n:
+            enemies = self.enemies
+            self.x[:n] = np.fromiter((e.center_x for e in enemies), np.float64, n)
+            self.y[:n] = np.fromiter((e.center_y for e in enemies), np.float64, n)
+            self.alert[:n] = np.fromiter((e.state != "patrol" for e in enemies), np.bool_, n)
+
+    def attacked(self, enemy, now):
+        """Враг ударил — следующий удар не раньше перезарядки."""
+        self.next_attack[enemy.slot] = now + self.attack_cooldown[enemy.slot]
+
+    def sense(self, idx, px, py, now, elapsed, move_time, visibility):
+        """Один проход по пачке слотов idx; elapsed и move_time — массивы той же длины.
+
+        Возвращает (враг, время движения, прошедшее время, расстояние до игрока,
+        видит игрока, время застревания, может ударить) для тех, кто
+        сейчас думает: ещё не проснувшиеся после спавна пропускают ход,
+        оглушённые только отсчитывают оглушение.
+        """
+        if not len(idx):
+            return []
+        thinking = self.wake_time[idx] <= now
+        stun = self.stun[idx]
+        if stun.any():
+            stunned = thinking & (stun > 0)
+            self.stun[idx[stunned]] = stun[stunned] - elapsed[stunned]
+            for slot in idx[stunned].tolist():
+                enemy = self.enemies[slot]
+                enemy.vx = enemy.vy = 0
+            thinking &= ~stunned
+        if not thinking.all():
+            idx = idx[thinking]
+            elapsed = elapsed[thinking]
+            move_time = move_time[thinking]
+
+        x = self.x[idx]
+        y = self.y[idx]
+        dist = np.hypot(px - x, py - y)
+
+        # стоит на месте — копит время застревания
+        moved = np.hypot(x - self.prev_x[idx], y - self.prev_y[idx])
+        stuck = np.where(moved < 0.5, self.stuck_time[idx] + elapsed, 0.0)
+        self.stuck_time[idx] = stuck
+        self.prev_x[idx] = x
+        self.prev_y[idx] = y
+
+        sees = dist < self.vision[idx]
+        look = np.nonzero(sees)[0]
+        if len(look):
+            sees[look] = visibility.visible_from(x[look], y[look], px, py)
+        ready = (dist <= self.attack_radius[idx]) & (self.next_attack[idx] < now)
+
+        enemies = self.enemies
+        return list(zip([enemies[slot] for slot in idx.tolist()], move_time.tolist(), elapsed.tolist(),
+                        dist.tolist(), sees.tolist(), stuck.tolist(), ready.tolist()))
@@ -0,0 +1,74 @@
+"""Пулы заранее созданных спрайтов (пули, частицы), чтобы не плодить объекты в перестрелке."""
+
+OVERFLOW_DROP = "drop"    # пул пуст — новый объект не выдаём
+OVERFLOW_STEAL = "steal"  # пул пуст — забираем самый старый активный
+
+
+class SpritePool:
+    """sprite_list=None — пул обычных объектов без отрисовки (см. simulation.py)."""
+
+    def __init__(self, factory, sprite_list, capacity, overflow=OVERFLOW_DROP):
+        if overflow not in (OVERFLOW_DROP, OVERFLOW_STEAL):
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        self.factory = factory
+        self.sprite_list = sprite_list
+        self.capacity = capacity
+        self.overflow = overflow
+
+        self.free = []
+        for _ in range(capacity):
+            sprite = factory()
+            sprite.pool = self
+            self.free.append(sprite)
+        # активные в порядке выдачи — первый и есть самый старый
+        self.active = {}
+
+        # счётчики
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+        self.stolen = 0
+
+    def acquire(self):
+        """Выдаёт спрайт из пула и добавляет его в sprite_list. None — если пул пуст и политика drop."""
+        if self.free:
+            sprite = self.free.pop()
+            self.hits += 1
+        else:
+            self.misses += 1
+            if self.overflow == OVERFLOW_STEAL and self.active:
+                sprite = next(iter(self.active.values()))
+                self.release(sprite)
+                self.free.pop()
+                self.stolen += 1
+            else:
+                self.dropped += 1
+                return None
+
+        self.active[id(sprite)] = sprite
+        if self.sprite_list is not None:
+            self.sprite_list.append(sprite)
+        return sprite
+
+    def release(self, sprite):
+        """Возвращает спрайт в пул (повторный вызов безопасен)."""
+        if self.active.pop(id(sprite), None) is None:
+            return
+        if self.sprite_list is not None:
+            sprite.remove_from_sprite_lists()
+        self.free.append(sprite)
+
+    def clear(self):
+        """Возвращает в пул все активные спрайты."""
+        for sprite in list(self.active.values()):
+            self.release(sprite)
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "active": len(self.active),
+            "hits": self.hits,
+            "misses": self.misses,
+            "dropped": self.dropped,
+            "stolen": self.stolen,
+        }
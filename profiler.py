@@ -0,0 +1,194 @@
+"""Профайлер кадра: время по фазам update/draw, счётчики спрайтов, график и CSV.
+
+Замеры — процессорное время на стороне Python. Отрисовка в GL асинхронная,
+поэтому для фаз draw можно включить gpu_sync (ctx.finish) — тогда время
+включает работу видеокарты, но сам кадр становится медленнее.
+"""
+import csv
+import time
+from collections import deque
+
+HISTORY = 600  # кадров в CSV
+AVERAGE_OVER = 120  # кадров в скользящем среднем и на графике
+
+
+class _Section:
+    __slots__ = ("profiler", "name", "sync", "start")
+
+    def __init__(self, profiler, name, sync):
+        self.profiler = profiler
+        self.name = name
+        self.sync = sync
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        if self.sync and profiler.gpu_sync:
+            profiler.gpu_sync()
+        profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.gpu_sync = None  # например ctx.finish
+
+        self.frame = 0
+        self.current = {}  # имя фазы -> секунд в текущем кадре
+        self.counts = {}  # имя списка -> число объектов
+        self.names = []  # фазы в порядке первого появления (для CSV и оверлея)
+        self.frames = deque(maxlen=HISTORY)  # (номер, время кадра, фазы, счётчики)
+        self.frame_times = deque(maxlen=AVERAGE_OVER)
+        self._frame_start = None
+
+    def section(self, name, sync=False):
+        """with profiler.section("update.ai"): ... — пустышка, если профайлер выключен."""
+        if not self.enabled:
+            return _NULL_SECTION
+        return _Section(self, name, sync)
+
+    def add(self, name, seconds):
+        if name not in self.current:
+            if name not in self.names:
+                self.names.append(name)
+            self.current[name] = 0.0
+        self.current[name] += seconds
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counts[name] = value
+
+    def begin_frame(self):
+        """Граница кадров: закрывает предыдущий кадр и начинает новый."""
+        now = time.perf_counter()
+        if self.enabled and self._frame_start is not None:
+            frame_time = now - self._frame_start
+            self.frames.append((self.frame, frame_time, self.current, dict(self.counts)))
+            self.frame_times.append(frame_time)
+        self.frame += 1
+        self.current = {}
+        self._frame_start = now
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.reset()
+        return self.enabled
+
+    def reset(self):
+        self.current = {}
+        self.frames.clear()
+        self.frame_times.clear()
+        self._frame_start = None
+
+    # --- статистика ---
+    def averages(self):
+        """Имя фазы -> (среднее, максимум) в миллисекундах за последние AVERAGE_OVER кадров."""
+        recent = list(self.frames)[-AVERAGE_OVER:]
+        result = {}
+        if not recent:
+            return result
+        for name in self.names:
+            values = [f[2].get(name, 0.0) for f in recent]
+            result[name] = (sum(values) / len(values) * 1000, max(values) * 1000)
+        return result
+
+    def frame_average(self):
+        if not self.frame_times:
+            return 0.0
+        return sum(self.frame_times) / len(self.frame_times) * 1000
+
+    def report(self):
+        """Текст для оверлея."""
+        avg = self.frame_average()
+        fps = 1000 / avg if avg else 0
+        lines = [f"FRAME {avg:6.2f} ms  ({fps:5.1f} FPS)   avg / max ms"]
+        for name, (mean, peak) in self.averages().items():
+            lines.append(f"{name:<22}{mean:7.3f} {peak:7.3f}")
+        if self.counts:
+            lines.append("")
+            lines.append("  ".join(f"{name}: {value}" for name, value in self.counts.items()))
+        return "\n".join(lines)
+
+    def dump_csv(self, path):
+        """Пишет последние HISTORY кадров: время кадра, фазы и счётчики в миллисекундах."""
+        count_names = []
+        for _, _, _, counts in self.frames:
+            for name in counts:
+                if name not in count_names:
+                    count_names.append(name)
+
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "frame_ms"] + self.names + count_names)
+            for number, frame_time, sections, counts in self.frames:
+                writer.writerow([number, round(frame_time * 1000, 4)] +
+                                [round(sections.get(n, 0.0) * 1000, 4) for n in self.names] +
+                                [counts.get(n, "") for n in count_names])
+        return path
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+class ProfilerOverlay:
+    """Текст со средними и график времени кадра поверх GUI."""
+
+    GRAPH_W = 240
+    GRAPH_H = 80
+    GRAPH_MAX_MS = 50.0
+    TEXT_EVERY = 10  # пересобирать текст раз в столько кадров — вёрстка дорогая
+
+    def __init__(self, profiler):
+        import arcade
+        self.profiler = profiler
+        self.text = arcade.Text("", 0, 0, arcade.color.WHITE, 10, multiline=True, width=420,
+                                font_name=("Consolas", "DejaVu Sans Mono", "Courier New"))
+        self._frames_since_text = self.TEXT_EVERY
+
+    def draw(self, right, top):
+        import arcade
+        profiler = self.profiler
+
+        # --- график: полоса 16.7 ms и 33.3 ms, линия времени кадров ---
+        left = right - self.GRAPH_W - 10
+        bottom = top - self.GRAPH_H - 10
+        arcade.draw_lrbt_rectangle_filled(left, right - 10, bottom, top - 10, (0, 0, 0, 160))
+        scale = self.GRAPH_H / self.GRAPH_MAX_MS
+        for ms, color in ((1000 / 60, (80, 200, 80, 200)), (1000 / 30, (220, 180, 60, 200))):
+            y = bottom + ms * scale
+            arcade.draw_line(left, y, right - 10, y, color, 1)
+
+        times = profiler.frame_times
+        if len(times) > 1:
+            step = self.GRAPH_W / (times.maxlen - 1)
+            points = [(left + i * step, bottom + min(t * 1000, self.GRAPH_MAX_MS) * scale)
+                      for i, t in enumerate(times)]
+            arcade.draw_line_strip(points, (255, 90, 90, 255), 1)
+
+        # --- таблица фаз ---
+        self._frames_since_text += 1
+        if self._frames_since_text >= self.TEXT_EVERY:
+            self._frames_since_text = 0
+            self.text.text = profiler.report()
+        self.text.x = right - self.text.content_width - 20
+        self.text.y = bottom - 10
+        self.text.anchor_y = "top"
+        arcade.draw_lrbt_rectangle_filled(self.text.x - 6, right - 10,
+                                          self.text.y - self.text.content_height - 6, self.text.y + 4,
+                                          (0, 0, 0, 160))
+        self.text.draw()
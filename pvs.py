@@ -0,0 +1,246 @@
+"""Таблица видимости клетка-клетка (PVS) для статичной карты уровня.
+
+Для каждой свободной клетки хранится упакованный битсет: бит j установлен,
+если из центра этой клетки виден центр свободной клетки j.
+
+Правило видимости одно — raycast между центрами клеток (los.raycast), —
+и до готовности таблицы, и после, и на картах, где таблица не строится:
+поведение врагов не зависит от того, успел ли фоновый поток.
+
+Строится таблица по сдвигам, а не по парам: клетки, которые пересекает
+луч между центрами, зависят только от сдвига (dx, dy), поэтому путь
+считается один раз на сдвиг, а проверка «все клетки пути свободны» идёт
+сразу для всех начальных клеток сдвигами маски NumPy.
+"""
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from los import BLOCKED, TIE_EPS, line_clear, tie_order
+
+log = logging.getLogger(__name__)
+
+# Дальше таблица растёт квадратично (40 000 клеток — 200 MB и минуты счёта):
+# на таких картах запросы всегда идут через raycast
+MAX_CELLS = 4096
+
+
+def ray_cells(dx, dy, tile):
+    """Клетки (сдвигом от начальной), которые проверяет raycast от центра клетки
+    к центру клетки со сдвигом (dx, dy), — тот же обход, что в los.raycast."""
+    half = tile / 2
+    x1 = y1 = half
+    ddx = dx * tile
+    ddy = dy * tile
+    cx = cy = 0
+    if ddx > 0:
+        step_x, t_max_x, t_delta_x = 1, (tile - x1) / ddx, tile / ddx
+    elif ddx < 0:
+        step_x, t_max_x, t_delta_x = -1, (0 - x1) / ddx, -tile / ddx
+    else:
+        step_x, t_max_x, t_delta_x = 0, math.inf, math.inf
+    if ddy > 0:
+        step_y, t_max_y, t_delta_y = 1, (tile - y1) / ddy, tile / ddy
+    elif ddy < 0:
+        step_y, t_max_y, t_delta_y = -1, (0 - y1) / ddy, -tile / ddy
+    else:
+        step_y, t_max_y, t_delta_y = 0, math.inf, math.inf
+
+    cells = []
+    while True:
+        order = t_max_x - t_max_y
+        if -TIE_EPS <= order <= TIE_EPS:
+            order = tie_order(x1, y1, x1 + ddx, y1 + ddy, tile, cx, cy)
+        if order < 0:
+            if t_max_x > 1:
+                break
+            cx += step_x
+            t_max_x += t_delta_x
+        elif order > 0:
+            if t_max_y > 1:
+                break
+            cy += step_y
+            t_max_y += t_delta_y
+        else:
+            if t_max_x > 1:
+                break
+            cells += [(cx + step_x, cy), (cx, cy + step_y)]
+            cx += step_x
+            cy += step_y
+            t_max_x += t_delta_x
+            t_max_y += t_delta_y
+        cells.append((cx, cy))
+    return cells
+
+
+class VisibilityTable:
+    def __init__(self, grid, tile):
+        self.grid = grid
+        self.tile = tile
+
+        # нумеруем свободные клетки
+        self.cells = []
+        self.index = {}
+        for y, row in enumerate(grid):
+            for x, value in enumerate(row):
+                if value != BLOCKED:
+                    self.index[(x, y)] = len(self.cells)
+                    self.cells.append((x, y))
+        # тот же номер клетки массивом (-1 — стена), для запросов пачкой
+        free = np.asarray(grid) != BLOCKED
+        self.index_grid = np.full(free.shape, -1, np.int64)
+        self.index_grid[free] = np.arange(len(self.cells))
+
+        n = len(self.cells)
+        self.enabled = n <= MAX_CELLS
+        self.stride = (n + 7) // 8  # байт на строку
+        self.bits = bytearray(n * self.stride if self.enabled else 0)
+
+        self.ready = False
+        self.build_time = 0.0
+        self._cancelled = False
+        self._thread = None
+
+    # --- построение ---
+    def build(self):
+        """Считает всю таблицу.
+
+        Видимость симметрична, поэтому пара считается один раз — от клетки
+        с меньшим номером (сдвиг вниз по строкам или вправо по строке).
+        """
+        if not self.enabled:
+            log.info("PVS: %d cells > %d, using raycasts only", len(self.cells), MAX_CELLS)
+            return
+        start = time.perf_counter()
+        n = len(self.cells)
+        free = self.index_grid >= 0
+        rows, cols = free.shape
+        index = self.index_grid
+        # карта в рамке из стен: клетка пути за краем — стена, как в raycast
+        padded = np.zeros((rows * 3, cols * 3), np.bool_)
+        padded[rows:rows * 2, cols:cols * 2] = free
+        seen = np.zeros((n, n), np.bool_)
+        seen[np.arange(n), np.arange(n)] = True
+
+        for dy in range(rows):
+            if self._cancelled:
+                return
+            for dx in range(-cols + 1, cols):
+                if dy == 0 and dx <= 0:
+                    continue
+                # начальные клетки, у которых клетка со сдвигом внутри карты
+                x0, x1 = max(0, -dx), cols - max(0, dx)
+                if x0 >= x1:
+                    continue
+                h = rows - dy
+                clear = free[:h, x0:x1] & free[dy:, x0 + dx:x1 + dx]
+                for k, (ox, oy) in enumerate(ray_cells(dx, dy, self.tile)):
+                    if k & 7 == 7 and not clear.any():
+                        break
+                    top = rows + oy
+                    left = cols + x0 + ox
+                    np.logical_and(clear, padded[top:top + h, left:left + x1 - x0], out=clear)
+                ys, xs = np.nonzero(clear)
+                if len(ys):
+                    i = index[ys, xs + x0]
+                    j = index[ys + dy, xs + x0 + dx]
+                    seen[i, j] = True
+                    seen[j, i] = True
+                # отдаём GIL главному потоку между сдвигами
+                time.sleep(0)
+
+        self.bits = bytearray(np.packbits(seen, axis=1, bitorder="little").tobytes())
+        self.build_time = time.perf_counter() - start
+        self.ready = True
+        log.info("PVS: %d cells, %.1f ms, %.1f KB",
+                 len(self.cells), self.build_time * 1000, self.memory_bytes() / 1024)
+
+    def build_async(self):
+        """Строит таблицу в фоновом потоке; до готовности запросы идут через raycast."""
+        if not self.enabled:
+            return self.build()
+        self._thread = threading.Thread(target=self.build, name="pvs-build", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Останавливает фоновое построение (например, при смене уровня)."""
+        self._cancelled = True
+
+    # --- запросы ---
+    def cell_at(self, x, y):
+        """Клетка сетки для точки мира."""
+        return int(x // self.tile), int(y // self.tile)
+
+    def can_see_tiles(self, a, b):
+        """Видна ли клетка b из клетки a."""
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return False
+        if not self.ready:
+            return self._centers_clear(a, b)
+        return bool(self.bits[i * self.stride + (j >> 3)] >> (j & 7) & 1)
+
+    def _centers_clear(self, a, b):
+        """Raycast между центрами клеток — то же, что записано в таблице.
+
+        Как и build(), луч всегда идёт от клетки с меньшим номером: ответ
+        не зависит от порядка аргументов, даже если raycast где-то не симметричен.
+        """
+        if self.index[a] > self.index[b]:
+            a, b = b, a
+        half = self.tile / 2
+        return line_clear(self.grid,
+                          a[0] * self.tile + half, a[1] * self.tile + half,
+                          b[0] * self.tile + half, b[1] * self.tile + half,
+                          self.tile)
+
+    def can_see(self, x1, y1, x2, y2):
+        """Видимость между двумя точками мира — между центрами их клеток.
+
+        Пока таблица строится (или не строится вовсе) — raycast по тем же центрам.
+        """
+        return self.can_see_tiles(self.cell_at(x1, y1), self.cell_at(x2, y2))
+
+    def visible_from(self, xs, ys, x, y):
+        """Видна ли точка мира (x, y) из каждой точки xs, ys (массивы NumPy).
+
+        По таблице — одна строка клетки (x, y) на всю пачку (видимость
+        симметрична), пока таблица строится — raycast между центрами для каждой точки.
+        """
+        cell = self.cell_at(x, y)
+        i = self.index.get(cell)
+        if i is None:
+            return np.zeros(len(xs), np.bool_)
+        if not self.ready:
+            tile = self.tile
+            return np.array([self.can_see_tiles((int(ax // tile), int(ay // tile)), cell)
+                             for ax, ay in zip(xs.tolist(), ys.tolist())], np.bool_)
+        j = self.index_grid[(ys // self.tile).astype(np.int64), (xs // self.tile).astype(np.int64)]
+        row = np.frombuffer(self.bits, np.uint8, self.stride, i * self.stride)
+        return (j >= 0) & ((row[j >> 3] >> (j & 7)) & 1).astype(np.bool_)
+
+    def visible_cells(self, cell):
+        """Все свободные клетки, видимые из cell (для шума, спавна и т.п.)."""
+        i = self.index.get(cell)
+        if i is None:
+            return []
+        if not self.ready:
+            return [c for c in self.cells if self.can_see_tiles(cell, c)]
+        row = self.bits[i * self.stride:(i + 1) * self.stride]
+        return [self.cells[j] for j in range(len(self.cells)) if row[j >> 3] >> (j & 7) & 1]
+
+    # --- статистика ---
+    def memory_bytes(self):
+        return len(self.bits)
+
+    def stats(self):
+        return {
+            "cells": len(self.cells),
+            "ready": self.ready,
+            "build_ms": round(self.build_time * 1000, 1),
+            "bytes": self.memory_bytes(),
+        }
@@ -5,4 +5,16 @@ def resource_path(relative_path):
     """Возвращает путь к файлу (работает и в exe)"""
     if hasattr(sys, "_MEIPASS"):
         return os.path.join(sys._MEIPASS, relative_path)
-    return os.path.join(os.path.abspath("."), relative_path)
\ No newline at end of file
+    return os.path.join(os.path.abspath("."), relative_path)
+
+
+def data_path(filename):
+    """Абсолютный путь к изменяемому файлу игры (сохранение): рядом с exe или с исходниками.
+
+    Не зависит от текущей папки — игру можно запускать откуда угодно.
+    """
+    if getattr(sys, "frozen", False):
+        folder = os.path.dirname(os.path.abspath(sys.executable))
+    else:
+        folder = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(folder, filename)
@@ -1,59 +1,353 @@
+"""Сохранение прогресса в SQLite без задержек кадра.
+
+Одно долгоживущее соединение (WAL) после открытия принадлежит фоновому
+потоку-писателю. save_game только запоминает последнее состояние и будит
+писателя: несколько сохранений подряд сливаются в одну запись. load_game
+отдаёт состояние из памяти — прочитанное при запуске или последнее
+сохранённое, поэтому медленный диск (или антивирус, проверяющий .db)
+кадр не держит. flush() ждёт, пока всё записано; при выходе он
+вызывается сам (atexit).
+
+Там же история забегов: таблицы runs, levels и events только дополняются.
+События уровня (выстрелы, убийства, смерть) копит RunHistory в памяти и
+отдаёт писателю пачкой на границе уровня — одна транзакция на уровень,
+а не на выстрел. Схема версионируется через PRAGMA user_version: новая
+версия — новая запись в конце MIGRATIONS.
+"""
+import atexit
+import logging
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future
 
-DB_NAME = "game_save.db"
+from resources import data_path
 
+log = logging.getLogger(__name__)
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
+DB_NAME = "game_save.db"
+CLOSE_TIMEOUT = 5.0  # сколько ждать записи при выходе, секунд
+FLUSH_EVENTS = 2000  # столько событий за уровень — сбрасываем, не дожидаясь конца
 
-    cur.execute("""
+# версия схемы -> её SQL; номер версии = индекс + 1
+MIGRATIONS = [
+    # 1: прогресс (таблица была и до версий — поэтому IF NOT EXISTS)
+    """
     CREATE TABLE IF NOT EXISTS save (
         id INTEGER PRIMARY KEY,
         level INTEGER,
         kills INTEGER
-    )
-    """)
+    );
+    INSERT OR IGNORE INTO save (id, level, kills) VALUES (1, 1, 0);
+    """,
+    # 2: история забегов
+    """
+    CREATE TABLE runs (
+        id INTEGER PRIMARY KEY,
+        started REAL,  -- unix time
+        seed INTEGER,
+        map_w INTEGER,
+        map_h INTEGER
+    );
+    CREATE TABLE levels (
+        id INTEGER PRIMARY KEY,
+        run_id INTEGER NOT NULL,
+        level INTEGER,
+        outcome TEXT,  -- cleared, died, restart, quit
+        duration REAL,  -- секунд игры
+        kills INTEGER,
+        shots INTEGER
+    );
+    CREATE TABLE events (
+        run_id INTEGER NOT NULL,
+        level_id INTEGER NOT NULL,
+        time REAL,  -- секунд от начала уровня
+        kind TEXT,  -- shot, kill, death
+        weapon TEXT,  -- pistol, shotgun, melee
+        x REAL,
+        y REAL
+    );
+    CREATE INDEX events_kind_weapon ON events (kind, weapon);
+    CREATE INDEX events_run ON events (run_id, kind);
+    CREATE INDEX levels_outcome ON levels (outcome, level, duration);
+    CREATE INDEX levels_run ON levels (run_id);
+    """,
+]
 
-    # создаём запись если её нет
-    cur.execute("SELECT * FROM save WHERE id = 1")
-    if cur.fetchone() is None:
-        cur.execute(
-            "INSERT INTO save (id, level, kills) VALUES (1, 1, 0)"
-        )
+# сводки для отчёта; каждая идёт по своему индексу
+STATS_QUERIES = {
+    "kills_by_weapon": "SELECT weapon, COUNT(*) FROM events WHERE kind = 'kill' GROUP BY weapon",
+    "shots_by_weapon": "SELECT weapon, COUNT(*) FROM events WHERE kind = 'shot' GROUP BY weapon",
+    "deaths_by_level": "SELECT level, COUNT(*) FROM levels WHERE outcome = 'died' GROUP BY level",
+    "clear_time_by_level": "SELECT level, AVG(duration), MIN(duration), COUNT(*) FROM levels "
+                           "WHERE outcome = 'cleared' GROUP BY level",
+}
 
-    conn.commit()
-    conn.close()
 
+def migrate(conn):
+    """Доводит схему до последней версии; возвращает версию, с которой начали."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], version + 1):
+        # executescript сам делает COMMIT перед скриптом — версия пишется в той же транзакции
+        conn.executescript(f"BEGIN; {script} PRAGMA user_version = {number}; COMMIT;")
+        log.info("save: schema migrated to version %d", number)
+    return version
 
-def save_game(level, kills):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
 
-    cur.execute("""
-        UPDATE save
-        SET level = ?, kills = ?
-        WHERE id = 1
-    """, (level, kills))
+def history_stats(conn):
+    """Сводки истории забегов: имя -> список строк."""
+    stats = {name: conn.execute(sql).fetchall() for name, sql in STATS_QUERIES.items()}
+    stats["runs"] = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    return stats
 
-    conn.commit()
-    conn.close()
 
+class SaveService:
+    """Писатель сохранений в фоне.
+
+    save() возвращает concurrent.futures.Future, который завершается, когда
+    это (или более новое) состояние записано; в asyncio его можно ждать
+    через asyncio.wrap_future.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or data_path(DB_NAME)
+        self.state = (1, 0)  # (level, kills) — последнее сохранённое, даже если ещё не на диске
+        self.requests = 0  # вызовов save()
+        self.writes = 0  # записей в базу (после слияния)
+        self.write_time = 0.0  # длительность последней записи, секунд
+
+        self._cond = threading.Condition()
+        self._pending = None  # состояние, которое ещё не записано
+        self._waiters = []  # Future для _pending
+        self._jobs = []  # пачки истории: (запросы, Future); не сливаются, пишутся по порядку
+        self._ids = {}  # таблица -> следующий id (id выдаём сами, не дожидаясь записи)
+        self._busy = False  # писатель сейчас пишет
+        self._closed = False
+        self._conn = None
+        self._thread = None
+
+    # --- жизненный цикл ---
+    def open(self):
+        """Открывает базу, обновляет схему и читает сохранение (один раз, при запуске)."""
+        if self._conn is not None:
+            return self
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # в WAL надёжно, а fsync только на checkpoint
+        migrate(conn)
+        row = conn.execute("SELECT level, kills FROM save WHERE id = 1").fetchone()
+        if row:
+            self.state = tuple(row)
+        for table in ("runs", "levels"):
+            self._ids[table] = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0] + 1
+
+        self._conn = conn
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Дописывает очередь и закрывает соединение. False — не успели за timeout."""
+        if self._conn is None:
+            return True
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            log.warning("save: writer did not finish in %.1f s", timeout)
+            return False
+        self._conn.close()
+        self._conn = None
+        self._thread = None
+        return True
+
+    # --- запись ---
+    def save(self, level, kills):
+        """Ставит сохранение в очередь и сразу возвращает Future."""
+        future = Future()
+        with self._cond:
+            if self._closed or self._conn is None:
+                raise RuntimeError("save service is not open")
+            self.state = (level, kills)
+            self._pending = self.state
+            self._waiters.append(future)
+            self.requests += 1
+            self._cond.notify()
+        return future
+
+    def append(self, statements):
+        """Ставит в очередь пачку вставок [(sql, строки), ...] — одна транзакция, Future."""
+        future = Future()
+        with self._cond:
+            if self._closed or self._conn is None:
+                raise RuntimeError("save service is not open")
+            self._jobs.append((statements, future))
+            self.requests += 1
+            self._cond.notify()
+        return future
+
+    def next_id(self, table):
+        """id для новой строки runs/levels — сразу, без обращения к базе."""
+        with self._cond:
+            value = self._ids[table]
+            self._ids[table] = value + 1
+        return value
+
+    def flush(self, timeout=None):
+        """Ждёт, пока очередь записана. False — не дождались за timeout."""
+        with self._cond:
+            return self._cond.wait_for(self._idle, timeout)
+
+    def _idle(self):
+        return self._pending is None and not self._jobs and not self._busy
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._jobs or self._closed)
+                if self._pending is None and not self._jobs:
+                    return  # закрыт и писать нечего
+                state = self._pending
+                waiters = self._waiters
+                jobs = self._jobs
+                self._pending = None
+                self._waiters = []
+                self._jobs = []
+                self._busy = True
+
+            # всё накопленное — одной транзакцией
+            error = None
+            start = time.perf_counter()
+            try:
+                with self._conn:
+                    for statements, _ in jobs:
+                        for sql, rows in statements:
+                            self._conn.executemany(sql, rows)
+                    if state is not None:
+                        self._conn.execute("UPDATE save SET level = ?, kills = ? WHERE id = 1", state)
+            except sqlite3.Error as exc:
+                log.exception("save: write failed")
+                error = exc
+            self.write_time = time.perf_counter() - start
+
+            with self._cond:
+                self.writes += 1
+                self._busy = False
+                self._cond.notify_all()
+            for future in waiters:
+                if error is None:
+                    future.set_result(state)
+                else:
+                    future.set_exception(error)
+            for _, future in jobs:
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    def stats(self):
+        """Сводки истории отдельным соединением (WAL: писателю не мешает)."""
+        conn = sqlite3.connect(self.path)
+        try:
+            return history_stats(conn)
+        finally:
+            conn.close()
 
-def load_game():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
 
-    cur.execute("SELECT level, kills FROM save WHERE id = 1")
-    data = cur.fetchone()
+class RunHistory:
+    """История одного забега: события копятся в памяти и пишутся пачкой.
 
-    conn.close()
+    Время — секунды симуляции. Строка уровня пишется в конце уровня
+    (end_level), вместе с его событиями.
+    """
 
-    if data:
-        return data  # (level, kills)
-    else:
-        return 1, 0
+    def __init__(self, service, seed, map_w, map_h):
+        self.service = service
+        self.run_id = service.next_id("runs")
+        self.level_id = None  # None — уровень не идёт
+        self.level = 0
+        self.level_start = 0.0
+        self.kills = 0
+        self.shots = 0
+        self.events = []
+        service.append([("INSERT INTO runs (id, started, seed, map_w, map_h) VALUES (?, ?, ?, ?, ?)",
+                         [(self.run_id, time.time(), seed, map_w, map_h)])])
+
+    def start_level(self, level, now):
+        if self.level_id is not None:
+            self.end_level("restart", now)
+        self.level_id = self.service.next_id("levels")
+        self.level = level
+        self.level_start = now
+        self.kills = self.shots = 0
+
+    def event(self, kind, now, weapon=None, x=0.0, y=0.0):
+        if self.level_id is None:
+            return
+        if kind == "kill":
+            self.kills += 1
+        elif kind == "shot":
+            self.shots += 1
+        self.events.append((self.run_id, self.level_id, now - self.level_start, kind, weapon, x, y))
+        if len(self.events) >= FLUSH_EVENTS:
+            self.service.append([self._events()])
+
+    def end_level(self, outcome, now):
+        """Закрывает уровень: строка уровня и его события — одной транзакцией."""
+        if self.level_id is None:
+            return None
+        row = (self.level_id, self.run_id, self.level, outcome, now - self.level_start, self.kills, self.shots)
+        self.level_id = None
+        return self.service.append([
+            ("INSERT INTO levels (id, run_id, level, outcome, duration, kills, shots) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?)", [row]),
+            self._events(),
+        ])
+
+    def _events(self):
+        rows, self.events = self.events, []
+        return "INSERT INTO events (run_id, level_id, time, kind, weapon, x, y) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+
+
+# ---------------- Общий сервис игры
+
+_service = None
+
+
+def service():
+    """Сервис сохранений игры; открывается при первом обращении."""
+    global _service
+    if _service is None:
+        _service = SaveService()
+        atexit.register(_service.close)
+    return _service.open()
+
+
+def init_db():
+    service()
+
+
+def save_game(level, kills):
+    return service().save(level, kills)
+
+
+def load_game():
+    return service().state  # (level, kills)
+
+
+def flush(timeout=None):
+    return service().flush(timeout)
 
 
 def reset_save():
-    save_game(1, 0)
+    return save_game(1, 0)
+
+
+def new_run(seed, map_w, map_h):
+    return RunHistory(service(), seed, map_w, map_h)
+
+
+def stats():
+    return service().stats()
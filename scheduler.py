@@ -0,0 +1,141 @@
+"""Планировщик AI: как часто враг думает, зависит от расстояния до игрока.
+
+Ближние и встревоженные (погоня, поиск) думают каждый шаг. Остальные
+патрульные думают по очереди раз в несколько шагов. Средние (могут быть
+на экране) между разами идут дальше с прежней скоростью (Enemy.coast),
+дальние стоят и проходят весь пропущенный путь за один раз. Таймеры врага
+при этом не теряют время: update_ai получает, сколько прошло с прошлого раза,
+но не больше периода яруса. Враги вне активной зоны спят и время не копят.
+
+Поверх частот есть общий бюджет времени AI на кадр. Когда он кончился,
+дальние откладываются на следующий шаг и думают первыми, ближние думают
+всегда. Бюджет меряется часами, поэтому по умолчанию выключен (None) —
+иначе одинаковый seed давал бы разные забеги.
+
+Ярусы и очередь считаются сразу для всех врагов по массивам perception.py.
+"""
+import time
+
+import numpy as np
+
+# (имя, от скольких пикселей до игрока, думать раз в столько шагов, идти между разами)
+# — по возрастанию дистанции
+TIERS = (
+    ("near", 0, 1, True),  # радиус зрения врага 550 — рядом с ним реакция без задержки
+    ("mid", 600, 3, True),
+    ("far", 1100, 8, False),  # полдиагонали экрана 1080p — дальше врага не видно
+)
+BATCH = 32  # редких врагов выдаём пачками, бюджет проверяется между пачками
+
+
+class AIScheduler:
+    def __init__(self, tiers=TIERS, budget=None):
+        self.tiers = tiers
+        self.budget = budget  # секунд на AI за кадр, None — без ограничения
+        self.spent = 0.0  # потрачено в текущем кадре
+        self.limits = np.array([distance * distance for _, distance, _, _ in tiers[1:]], np.float64)
+        self.periods = np.array([period for _, _, period, _ in tiers], np.int64)
+        self.coasts = np.array([coast for _, _, _, coast in tiers], np.bool_)
+
+        # метрики последнего шага
+        self.awake = 0  # врагов в активной зоне
+        self.population = dict.fromkeys(self.names, 0)  # врагов в каждом ярусе
+        self.thinks = dict.fromkeys(self.names, 0)  # сколько из них подумало
+        self.deferred = 0  # отложено из-за бюджета
+
+    @property
+    def names(self):
+        return [tier[0] for tier in self.tiers]
+
+    def begin_frame(self):
+        self.spent = 0.0
+
+    def batches(self, perception, step, delta_time, px, py, bounds=None):
+        """Кто думает на шаге step: выдаёт пачки (слоты, время движения, прошедшее время).
+
+        Враги вне bounds (left, bottom, right, top) спят. Остальные, чья
+        очередь не пришла, сдвигаются по инерции здесь же. Позиции берутся
+        из perception — перед вызовом нужен perception.gather().
+        """
+        n = len(perception)
+        if not n:
+            self.awake = self.deferred = 0
+            self.population = dict.fromkeys(self.names, 0)
+            self.thinks = dict.fromkeys(self.names, 0)
+            return
+        start = time.perf_counter()
+        x = perception.x[:n]
+        y = perception.y[:n]
+
+        # ярус по расстоянию, встревоженные всегда ближние
+        tier = np.searchsorted(self.limits, (x - px) ** 2 + (y - py) ** 2, side="right")
+        tier[perception.alert[:n]] = 0
+        period = self.periods[tier]
+        overdue = perception.overdue[:n]
+        due = overdue | ((step + perception.phase[:n]) % period == 0)  # период 1 — всегда
+        waiting = ~due
+        awake = None  # None — вся карта
+        if bounds:
+            awake = (x >= bounds[0]) & (x < bounds[2]) & (y >= bounds[1]) & (y < bounds[3])
+            due &= awake
+            waiting &= awake
+            # спящие время не копят: проснувшись, враг не проходит весь сон за один шаг
+            perception.last_think[:n][~awake] = step
+
+        coast = self.coasts[tier]
+        enemies = perception.enemies
+        for slot in np.nonzero(waiting & coast)[0].tolist():
+            enemies[slot].coast(delta_time)
+
+        idx = np.nonzero(due)[0]
+        # не больше периода яруса (отложенные бюджетом и сменившие ярус тоже)
+        elapsed = np.minimum(step - perception.last_think[idx], period[idx]) * delta_time
+        # кто не шёл между разами, проходит весь путь сейчас
+        move_time = np.where(coast[idx], delta_time, elapsed)
+
+        budget = self.budget
+        if budget is None:
+            # без бюджета думают все, чья очередь пришла, — одной пачкой
+            perception.last_think[idx] = step
+            perception.overdue[idx] = False
+            deferred = 0
+            yield idx, move_time, elapsed
+        else:
+            # сначала все ближние, потом остальные пачками, отложенные в прошлый раз — первыми
+            every = period[idx] == 1
+            first = idx[every]
+            order = np.nonzero(~every)[0]
+            order = np.concatenate((order[overdue[idx[order]]], order[~overdue[idx[order]]]))
+            perception.last_think[first] = step
+            perception.overdue[first] = False
+            yield first, move_time[every], elapsed[every]
+            self.spent += time.perf_counter() - start
+
+            deferred = 0
+            for lo in range(0, len(order), BATCH):
+                # первая пачка думает всегда: иначе при толпе ближних дальние не думали бы никогда
+                if lo and self.spent > budget:
+                    rest = idx[order[lo:]]
+                    perception.overdue[rest] = True
+                    for slot in rest[coast[rest]].tolist():
+                        enemies[slot].coast(delta_time)
+                    deferred = len(rest)
+                    break
+                start = time.perf_counter()
+                part = order[lo:lo + BATCH]
+                batch = idx[part]
+                perception.overdue[batch] = False
+                perception.last_think[batch] = step
+                yield batch, move_time[part], elapsed[part]
+                self.spent += time.perf_counter() - start
+
+        names = self.names
+        thought = tier[idx]
+        if deferred:
+            thought = thought[perception.overdue[idx] == 0]
+        if awake is not None:
+            tier = tier[awake]
+        self.awake = len(tier)
+        self.population = dict(zip(names, np.bincount(tier, minlength=len(names)).tolist()))
+        self.thinks = dict(zip(names, np.bincount(thought, minlength=len(names)).tolist()))
+        self.deferred = deferred
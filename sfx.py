@@ -0,0 +1,146 @@
+"""Звуковые эффекты: банк звуков и постоянный набор голосов.
+
+Звуки загружаются целиком (короткие wav из :resources: arcade) один раз
+в load(). Играют они через VOICES заранее созданных pyglet Player —
+новых плееров во время боя не создаётся, и одновременно звучит не больше
+VOICES эффектов. Если свободного голоса нет, новый звук забирает голос
+у самого старого из менее (или так же) важных; если все заняты более
+важными — не играет.
+
+У каждого звука ещё свой предел: не чаще раза в interval секунд и не
+больше limit копий сразу (лишняя копия заменяет самую старую того же
+звука). Так залп дробовика или убийство толпы не забивают микшер одним
+и тем же звуком.
+"""
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+VOICES = 12
+
+# имя -> (файл, громкость, приоритет, не чаще раза в столько секунд, копий сразу)
+SOUNDS = {
+    "pistol": (":resources:sounds/laser1.wav", 0.35, 2, 0.05, 3),
+    "shotgun": (":resources:sounds/explosion2.wav", 0.5, 3, 0.1, 2),
+    "melee": (":resources:sounds/hit3.wav", 0.6, 3, 0.05, 2),
+    "hit": (":resources:sounds/rockHit2.wav", 0.25, 0, 0.04, 3),  # пуля в стену
+    "enemy_death": (":resources:sounds/hurt2.wav", 0.5, 1, 0.03, 4),
+    "player_death": (":resources:sounds/gameover3.wav", 0.8, 9, 0.0, 1),
+}
+
+
+class Sound:
+    def __init__(self, name, source, volume, priority, interval, limit):
+        self.name = name
+        self.source = source  # pyglet StaticSource
+        self.volume = volume
+        self.priority = priority
+        self.interval = interval
+        self.limit = limit
+        self.last = -1.0  # когда играл последний раз
+
+
+class Voice:
+    def __init__(self, player):
+        self.player = player
+        self.sound = None  # что играет (или играло последним)
+        self.started = 0.0
+        self.ends = 0.0  # до этого времени голос занят
+
+    def busy(self, now):
+        return now < self.ends
+
+
+class SoundBank:
+    def __init__(self, sounds=SOUNDS, voices=VOICES):
+        self.specs = sounds
+        self.voice_count = voices
+        self.sounds = {}  # имя -> Sound; звуки, которые не загрузились, просто отсутствуют
+        self.voices = []
+        self.enabled = True  # False — аудио недоступно, play() ничего не делает
+
+        # счётчики для профилирования
+        self.played = 0
+        self.stolen = 0  # сыграно ценой чужого голоса
+        self.dropped = 0  # не сыграно: предел звука или все голоса важнее
+
+    def load(self):
+        """Загружает банк и создаёт голоса; повторный вызов ничего не делает."""
+        if self.voices or not self.enabled:
+            return self
+        from arcade.resources import resolve
+        from pyglet import media
+
+        for name, (path, volume, priority, interval, limit) in self.specs.items():
+            try:
+                source = media.load(str(resolve(path)), streaming=False)
+            except Exception as exc:
+                log.warning("sfx: cannot load %s (%s): %s", name, path, exc)
+                continue
+            self.sounds[name] = Sound(name, source, volume, priority, interval, limit)
+        self.voices = [Voice(media.Player()) for _ in range(self.voice_count)]
+        return self
+
+    def play(self, name, volume=1.0):
+        """Играет звук name, если позволяют пределы и голоса; True — играет."""
+        sound = self.sounds.get(name)
+        if sound is None or not self.enabled:
+            return False
+        now = time.perf_counter()
+        if now - sound.last < sound.interval:
+            self.dropped += 1
+            return False
+
+        voice = self.pick_voice(sound, now)
+        if voice is None:
+            self.dropped += 1
+            return False
+        if voice.busy(now):
+            self.stolen += 1
+
+        try:
+            self.start(voice, sound, volume)
+        except Exception as exc:  # нет аудиоустройства — дальше без звука
+            log.warning("sfx: playback failed, sound effects disabled: %s", exc)
+            self.enabled = False
+            return False
+        voice.sound = sound
+        voice.started = now
+        voice.ends = now + (sound.source.duration or 0.0)
+        sound.last = now
+        self.played += 1
+        return True
+
+    def pick_voice(self, sound, now):
+        """Свободный голос, иначе чей забрать; None — звук не играет."""
+        same = [v for v in self.voices if v.sound is sound and v.busy(now)]
+        if len(same) >= sound.limit:
+            return min(same, key=lambda v: v.started)
+        victim = None
+        for voice in self.voices:
+            if not voice.busy(now):
+                return voice
+            if voice.sound.priority > sound.priority:
+                continue
+            # сначала менее важный, среди равных — самый старый
+            if victim is None or (voice.sound.priority, voice.started) < (victim.sound.priority, victim.started):
+                victim = voice
+        return victim
+
+    def start(self, voice, sound, volume):
+        player = voice.player
+        playing = player.source is not None
+        player.queue(sound.source)
+        if playing:
+            # голос ещё звучит — переключаем на новый звук, плеер тот же
+            player.next_source()
+        player.volume = sound.volume * volume
+        player.play()
+
+    def stop_all(self):
+        for voice in self.voices:
+            if voice.player.source is not None:
+                voice.player.pause()
+                voice.player.next_source()
+            voice.ends = 0.0
@@ -0,0 +1,1204 @@
+"""Ядро игры без окна: карта, игрок, враги, пули, AI, победа/смерть, сохранение.
+
+Модуль не импортирует arcade и не грузит текстуры — его можно гонять
+на сервере без GL-контекста быстрее реального времени.
+GameWindow (main.py) только рисует состояние и передаёт ввод.
+"""
+import math
+import random
+import threading
+import time
+
+import numpy as np
+
+from save import new_run, save_game
+from los import line_clear, raycast
+from sweep import segment_circle, segment_box
+from spatial import SpatialHash
+from occupancy import OccupancyGrid
+import levelgen
+from pvs import VisibilityTable
+from flowfield import FieldCache, FlowField
+from scheduler import AIScheduler
+from perception import Perception
+from pool import SpritePool, OVERFLOW_STEAL
+from particles import ParticleSystem
+from clock import FixedStepClock, FIXED_STEP
+from profiler import NULL_PROFILER
+
+TILE = 48
+
+PLAYER_SPEED = 350  # Быстрое плавное движение
+BULLET_SPEED = 1000  # Очень быстрые пули
+ENEMY_SPEED = 180
+MELEE_RANGE = 44
+MELEE_COOLDOWN = 0.3
+PLAYER_HITBOX = 40  # примерно визуальный размер
+ENEMY_HITBOX = 34
+ENEMY_CELL = TILE * 2  # ячейка пространственного хеша врагов
+BULLET_SIZE = 4
+
+FIRE_RATE_PISTOL = 0.15
+FIRE_RATE_SHOTGUN = 0.8
+SHOTGUN_PELLETS = 7
+SHOTGUN_SPREAD_DEG = 28
+
+# Большие карты: базовая карта — один экран 1080p, всё остальное масштабируется по площади
+BASE_CELLS = 40 * 22
+CHUNK_TILES = 16  # сторона куска мира в тайлах (отрисовка и активная зона AI)
+CHUNK = TILE * CHUNK_TILES
+FLOW_RADIUS = 24  # поле потоков считается не дальше стольких клеток пути от игрока (полдиагонали 1080p)
+
+# Пул пуль и частицы
+BULLET_POOL_SIZE = 128
+POOL_OVERFLOW = OVERFLOW_STEAL
+PARTICLE_CAPACITY = 16384
+
+# Gameplay settings
+ONE_HIT_PLAYER = True
+ONE_HIT_ENEMY = True
+
+# Мебель: имя картинки в assets/ -> размер картинки в пикселях
+DECOR_SCALE = 0.6
+FLOOR_WINDOW = 3  # клеток вокруг мебели, в которых ищется обход (splits_floor)
+DECOR_SIZES = {
+    "chair1": (60, 108),
+    "chair2": (63, 109),
+    "flower1": (130, 171),
+    "flower2": (119, 231),
+    "lamp1": (57, 148),
+    "lamp2": (47, 88),
+    "musor1": (104, 169),
+    "musor2": (74, 102),
+    "sofa": (314, 171),
+    "table1": (112, 113),
+    "table2": (104, 112),
+    "table3": (129, 102),
+    "table4": (115, 105),
+}
+
+
+# ---------------- Utilities
+
+def normalize(vx, vy):
+    dist = math.hypot(vx, vy)
+    if dist == 0:
+        return 0.0, 0.0
+    return vx / dist, vy / dist
+
+
+def boxes_overlap(a, b):
+    """Пересечение двух прямоугольников с центром и размерами (center_x, center_y, width, height)."""
+    return abs(a.center_x - b.center_x) * 2 < a.width + b.width and \
+        abs(a.center_y - b.center_y) * 2 < a.height + b.height
+
+
+def make_stream(seed, name, generation):
+    """Поток случайных чисел: зависит только от seed, имени и номера генерации уровня."""
+    return random.Random(f"{seed}:{name}:{generation}")
+
+
+# ---------------- Entities
+
+class Entity:
+    """Положение, размер и угол — как у спрайта, но без текстуры."""
+
+    def __init__(self, x, y, width, height):
+        self.center_x = x
+        self.center_y = y
+        self.width = width
+        self.height = height
+        self.angle = 0
+        self.alive = True
+
+
+class Decor(Entity):
+    def __init__(self, name, x, y, scale=DECOR_SCALE):
+        w, h = DECOR_SIZES[name]
+        super().__init__(x, y, w * scale, h * scale)
+        self.name = name
+        self.scale = scale
+
+
+class Bullet(Entity):
+    def __init__(self, dx=0, dy=0):
+        super().__init__(0, 0, BULLET_SIZE * 2, BULLET_SIZE * 2)
+        self.pool = None
+        self.weapon = 'pistol'  # чем выпущена — для истории убийств
+        self.reset(dx, dy, 0)
+
+    def reset(self, dx, dy, now):
+        """Переинициализация при выдаче из пула."""
+        self.vx = dx * BULLET_SPEED
+        self.vy = dy * BULLET_SPEED
+        self.lifetime = 1.0  # 1 секунда жизни
+        self.spawn_time = now
+
+    def kill(self):
+        if self.pool:
+            self.pool.release(self)
+
+    def expired(self, now):
+        return now - self.spawn_time > self.lifetime
+
+    def update(self, delta_time, now):
+        if self.expired(now):
+            self.kill()
+            return False
+
+        self.center_x += self.vx * delta_time
+        self.center_y += self.vy * delta_time
+        return True
+
+
+class Player(Entity):
+    def __init__(self, x, y):
+        super().__init__(x, y, PLAYER_HITBOX, PLAYER_HITBOX)
+        self.speed = PLAYER_SPEED
+        self.last_fire = -math.inf
+        self.last_melee = -math.inf
+        self.weapon = 'pistol'
+        self.ammo = {'pistol': 24, 'shotgun': 8}
+        self.max_ammo = {'pistol': 24, 'shotgun': 8}
+        self.reloading = False
+        self.reload_timer = 0
+        self.reload_time = {'pistol': 1.5, 'shotgun': 2.1}
+        self.health = 100
+
+
+class Enemy(Entity):
+    def __init__(self, x, y, game):
+        super().__init__(x, y, ENEMY_HITBOX, ENEMY_HITBOX)
+        self.game = game
+        self.state = 'patrol'
+        self.patrol_target = None
+        self.vision_radius = 550  # было 350
+        self.attack_radius = 60  # было 60
+
+        rng = game.ai_rng
+        self.activation_delay = rng.uniform(0.6, 1.2)
+        self.spawn_time = game.time
+
+        self.vx = 0
+        self.vy = 0
+        self.attack_cooldown = 1.0
+        self.speed = ENEMY_SPEED
+        self.chase_speed_mult = 1.35
+        self.last_state_change = 0
+        self.last_seen_time = 0
+        self.last_seen_pos = None
+        self.memory_time = 12.5
+
+        # --- ПАТРУЛЬ ---
+        self.patrol_points = []
+        self.patrol_index = 0
+        self.patrol_wait_timer = 0
+        self.patrol_wait_time = rng.uniform(0.3, 1.1)
+
+        # застревание, удар, оглушение и очередь планировщика — в массивах
+        # game.perception (perception.py), slot — номер врага в них
+        self.slot = None
+
+        # --- ПОИСК ---
+        self.search_timer = 0
+        self.search_duration = rng.uniform(1.0, 2.0)
+
+    def pick_patrol_points(self, count=4, radius=260):
+        """Генерит точки патруля вокруг текущей позиции, чтобы не было хождения в стену."""
+        self.patrol_points.clear()
+        tries = 0
+        rng = self.game.ai_rng
+
+        while len(self.patrol_points) < count and tries < 200:
+            tries += 1
+            px = self.center_x + rng.uniform(-radius, radius)
+            py = self.center_y + rng.uniform(-radius, radius)
+
+            if not self.game.rect_hits_walls(px, py, self.width, self.height):
+                self.patrol_points.append((px, py))
+
+        if not self.patrol_points:
+            self.patrol_points = [(self.center_x, self.center_y)]
+        self.patrol_index = 0
+
+    def move_towards(self, tx, ty, speed, delta_time):
+        """Двигает врага к точке с коллизиями."""
+        dx = tx - self.center_x
+        dy = ty - self.center_y
+        dist = math.hypot(dx, dy)
+        if dist == 0:
+            return True
+
+        nx = dx / dist
+        ny = dy / dist
+
+        self.vx = nx * speed
+        self.vy = ny * speed
+        self.game.move_entity(self, self.vx * delta_time, self.vy * delta_time)
+        self.game.enemy_index.move(self)
+        self.angle = math.degrees(math.atan2(-dy, dx)) + 90
+
+        return dist < 14
+
+    def coast(self, delta_time):
+        """Шаг без обдумывания: идёт дальше с той скоростью, что выбрал в прошлый раз."""
+        if self.vx or self.vy:
+            self.game.move_entity(self, self.vx * delta_time, self.vy * delta_time)
+            self.game.enemy_index.move(self)
+
+    def follow_flow(self, tx, ty, speed, delta_time, field=None):
+        """Идёт к цели по полю потоков вместо упора в стену; по умолчанию — к игроку."""
+        field = field or self.game.flow_field
+        step = field.next_step(self.center_x, self.center_y)
+        if step is None:
+            # уже в клетке цели (или дальше радиуса поля) — дальше напрямую
+            return self.move_towards(tx, ty, speed, delta_time)
+        self.move_towards(step[0], step[1], speed, delta_time)
+        return False
+
+    def kill_actor(self):
+        self.alive = False
+        self.game.enemy_index.remove(self)
+        self.game.perception.remove(self)
+
+    def update_ai(self, player, delta_time, elapsed, dist, can_see, stuck_time, can_attack):
+        """Решение врага по готовому восприятию (Perception.sense).
+
+        delta_time — шаг движения, elapsed — время с прошлого обдумывания
+        (для таймеров): дальние враги думают не каждый шаг (см. scheduler.py).
+        dist, can_see (в радиусе зрения и на линии видимости), stuck_time
+        и can_attack посчитаны пачкой на всех думающих врагов.
+        """
+        now = self.game.time
+        self.vx = self.vy = 0  # стоит, если в этот раз никуда не пошёл
+
+        # ---------------- ЕСЛИ ВИДИТ ИГРОКА ----------------
+        if can_see:
+            self.state = "chase"
+            self.last_seen_time = now
+            self.last_seen_pos = (player.center_x, player.center_y)
+
+            chase_speed = self.speed * self.chase_speed_mult
+
+            # идём к игроку
+            if dist > self.attack_radius:
+                if stuck_time > 0.25:
+                    # упёрся в угол — обходим по полю потоков
+                    self.follow_flow(player.center_x, player.center_y, chase_speed, delta_time)
+                else:
+                    self.move_towards(player.center_x, player.center_y, chase_speed, delta_time)
+
+            # атака
+            if can_attack:
+                self.game.perception.attacked(self, now)
+                return "attack"
+
+            return None
+
+        # ---------------- ЕСЛИ ПОТЕРЯЛ, НО ПОМНИТ ----------------
+        if self.last_seen_pos and (now - self.last_seen_time) < self.memory_time:
+            self.state = "search"
+
+            tx, ty = self.last_seen_pos
+            near = math.hypot(tx - self.center_x, ty - self.center_y) < TILE
+            if near or line_clear(self.game.grid, self.center_x, self.center_y, tx, ty, TILE):
+                arrived = self.move_towards(tx, ty, self.speed * 1.15, delta_time)
+            else:
+                # точка за стеной — по полю к ней самой, а не к игроку
+                field = self.game.search_fields.get(tx, ty)
+                if field is None:
+                    arrived = self.move_towards(tx, ty, self.speed * 1.15, delta_time)
+                else:
+                    arrived = self.follow_flow(tx, ty, self.speed * 1.15, delta_time, field)
+
+            # дошёл до последней позиции — начинает "искать"
+            if arrived:
+                self.search_timer += elapsed
+
+                # типа "сканит" местность: крутится на месте
+                self.angle += 180 * elapsed
+
+                if self.search_timer >= self.search_duration:
+                    # не нашёл — забывает
+                    self.last_seen_pos = None
+                    self.search_timer = 0
+
+            return None
+
+        # ---------------- ПАТРУЛЬ ----------------
+        if self.state != "patrol":
+            self.state = "patrol"
+            self.patrol_wait_timer = 0
+
+        # если нет точек патруля — создаём
+        if not self.patrol_points:
+            self.pick_patrol_points(count=4, radius=280)
+
+        # ожидание на точке
+        if self.patrol_wait_timer > 0:
+            self.patrol_wait_timer -= elapsed
+            return None
+
+        tx, ty = self.patrol_points[self.patrol_index]
+        arrived = self.move_towards(tx, ty, self.speed * 0.75, delta_time)
+        if stuck_time > 0.7:
+            self.patrol_index = (self.patrol_index + 1) % len(self.patrol_points)
+            self.patrol_wait_timer = 0.0
+
+            # если совсем в тупике — генерим новые точки
+            if stuck_time > 1.4:
+                self.pick_patrol_points(count=4, radius=320)
+
+            self.game.perception.stuck_time[self.slot] = 0.0
+            return None
+
+        if arrived:
+            # стоим на точке чуть-чуть, потом следующая
+            self.patrol_wait_timer = self.patrol_wait_time
+            self.patrol_wait_time = self.game.ai_rng.uniform(0.3, 1.1)
+
+            self.patrol_index += 1
+            if self.patrol_index >= len(self.patrol_points):
+                self.patrol_index = 0
+
+        return None
+
+
+# ---------------- Level plan
+
+class LevelPlan:
+    """Всё про уровень, что не требует живой симуляции: карта, сетки, точки спавна, мебель.
+
+    План зависит только от seed, номера генерации, номера уровня и размеров
+    карты, поэтому его можно посчитать в фоновом потоке (build_async), пока
+    идёт отсчёт после зачистки, — setup() потом только создаёт объекты.
+    Результат не зависит от того, в каком потоке план строился.
+    """
+
+    def __init__(self, seed, generation, level, map_w, map_h):
+        self.seed = seed
+        self.generation = generation
+        self.level = level
+        self.map_w = map_w
+        self.map_h = map_h
+
+        self.ready = False
+        self.build_time = 0.0
+        self._thread = None
+
+    def matches(self, seed, generation, level, map_w, map_h):
+        return (self.seed, self.generation, self.level, self.map_w, self.map_h) == \
+            (seed, generation, level, map_w, map_h)
+
+    # --- построение ---
+    def build(self):
+        start = time.perf_counter()
+        self.map_rng = make_stream(self.seed, "map", self.generation)
+        self.spawn_rng = make_stream(self.seed, "spawn", self.generation)
+
+        # на большой карте блоков, врагов и мебели больше — плотность как на одном экране
+        scale = max(1.0, self.map_w * self.map_h / BASE_CELLS)
+        params = levelgen.LevelParams(blocks=round(levelgen.DEFAULT_PARAMS.blocks * scale),
+                                      passages=round(levelgen.DEFAULT_PARAMS.passages * scale))
+
+        # --- карта и всё, что из неё следует ---
+        self.layout = levelgen.generate(self.map_rng.getrandbits(64), self.map_w, self.map_h, params)
+        self.grid = self.layout.to_lists()
+        self.occupancy = OccupancyGrid.from_tiles(self.layout.grid, TILE)
+        # таблица видимости пока пустая (запросы через raycast), строится после setup()
+        self.visibility = VisibilityTable(self.grid, TILE)
+        self.flow_field = FlowField(self.grid, TILE, radius=FLOW_RADIUS)
+        self.search_fields = FieldCache(self.grid, TILE, radius=FLOW_RADIUS)
+
+        self.player_pos = self.pick_player()
+        self.enemy_cells = self.pick_enemies(round((4 + self.level) * scale))
+        self.decor = self.place_decorations(count=round(8 * scale))
+        # мебель не двигается — индекс на весь уровень, пули спрашивают только ячейки у своего пути
+        self.decor_index = SpatialHash(ENEMY_CELL)
+        for d in self.decor:
+            self.decor_index.insert(d)
+        self.decor_reach = max((math.hypot(d.width, d.height) / 2 for d in self.decor), default=0.0)
+
+        self.build_time = time.perf_counter() - start
+        self.ready = True
+        return self
+
+    def build_async(self):
+        self._thread = threading.Thread(target=self.build, name="level-plan", daemon=True)
+        self._thread.start()
+
+    def wait(self):
+        """Дожидается фонового построения. True, если план готов."""
+        if self._thread is not None:
+            self._thread.join()
+        return self.ready
+
+    # --- спавн ---
+    def pick_player(self):
+        """Ближайшая к центру клетка для спавна: сначала по «кольцу», потом по расстоянию."""
+        ys, xs = np.nonzero(self.layout.spawnable)
+        if not len(xs):
+            # fallback если карта плохая
+            return self.map_w * TILE // 2, self.map_h * TILE // 2
+        dx = xs - self.map_w // 2
+        dy = ys - self.map_h // 2
+        best = np.lexsort((dx * dx + dy * dy, np.maximum(abs(dx), abs(dy))))[0]
+        return int(xs[best]) * TILE + TILE / 2, int(ys[best]) * TILE + TILE / 2
+
+    def pick_enemies(self, count):
+        """Клетки врагов.
+
+        Кандидаты — клетки для спавна дальше 200 px от игрока, в случайном порядке;
+        сначала берутся клетки вне поля зрения игрока, остальные — если тех не хватило.
+        Одна клетка на врага: хитбокс меньше тайла, так что враги не пересекаются.
+        """
+        ys, xs = np.nonzero(self.layout.spawnable)
+        px, py = self.player_pos
+        far = np.hypot(xs * TILE + TILE / 2 - px, ys * TILE + TILE / 2 - py) > 200
+        candidates = list(zip(xs[far].tolist(), ys[far].tolist()))
+
+        player_cell = self.visibility.cell_at(px, py)
+        rng = self.spawn_rng
+        chosen = []
+        seen = []
+        for i in range(len(candidates)):
+            if len(chosen) == count:
+                break
+            # ленивое перемешивание: тасуем только то, что успели просмотреть
+            j = rng.randrange(i, len(candidates))
+            candidates[i], candidates[j] = candidates[j], candidates[i]
+            cell = candidates[i]
+            if self.visibility.can_see_tiles(player_cell, cell):
+                seen.append(cell)
+            else:
+                chosen.append(cell)
+        return chosen + seen[:count - len(chosen)]
+
+    def place_decorations(self, count=10):
+        """Случайные декорации без пересечений со стенами, мебелью, игроком и врагами.
+
+        Мебель не должна разрезать пол: клетки, которых касается предмет,
+        считаются занятыми, и предмет, после которого свободные клетки
+        распадаются (splits_floor), не ставится. Клетки игрока и врагов
+        мебель не задевает совсем.
+        """
+        player = Entity(*self.player_pos, PLAYER_HITBOX, PLAYER_HITBOX)
+        # клетки игрока и будущих врагов мебель не задевает
+        spawns = {(int(self.player_pos[0] // TILE), int(self.player_pos[1] // TILE))}
+        spawns.update(self.enemy_cells)
+        covered = set()  # клетки, которых касается поставленная мебель
+        # будущие враги — в своём хеше: на больших картах их сотни, а проверок — count * 20
+        enemies = SpatialHash(ENEMY_CELL)
+        for x, y in self.enemy_cells:
+            enemies.insert(Entity(x * TILE + TILE / 2, y * TILE + TILE / 2, ENEMY_HITBOX, ENEMY_HITBOX))
+        occupancy = self.occupancy
+        rng = self.spawn_rng
+        names = list(DECOR_SIZES)
+
+        decor = []
+        tries = 0
+        max_tries = count * 20  # чтобы не застрять в бесконечном цикле
+        while len(decor) < count and tries < max_tries:
+            tries += 1
+
+            x = rng.randint(1, self.map_w - 2) * TILE + TILE / 2
+            y = rng.randint(1, self.map_h - 2) * TILE + TILE / 2
+
+            item = Decor(rng.choice(names), x, y)
+
+            left = x - item.width / 2
+            bottom = y - item.height / 2
+            right = x + item.width / 2
+            top = y + item.height / 2
+
+            # стены и уже поставленная мебель — по сетке занятости
+            pad = ENEMY_HITBOX / 2
+            collision = occupancy.rect_blocked(left, bottom, right, top) or \
+                boxes_overlap(item, player) or \
+                any(boxes_overlap(item, e) for e in enemies.query_rect(left - pad, bottom - pad,
+                                                                     right + pad, top + pad))
+            if collision:
+                continue
+            cells = self.tiles_under(left, bottom, right, top)
+            if not spawns.isdisjoint(cells) or self.splits_floor(cells, covered):
+                continue
+            decor.append(item)
+            occupancy.fill_rect(left, bottom, right, top)
+            covered.update(cells)
+        return decor
+
+    def tiles_under(self, left, bottom, right, top):
+        """Клетки, которые прямоугольник накрывает хотя бы частично."""
+        x0, x1 = int(left // TILE), int(math.ceil(right / TILE)) - 1
+        y0, y1 = int(bottom // TILE), int(math.ceil(top / TILE)) - 1
+        return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+    def splits_floor(self, cells, covered):
+        """Разрежут ли новые занятые клетки cells свободный пол.
+
+        Карта после levelgen связна, и если соседи занятых клеток связаны
+        между собой в окне вокруг них, любой путь через эти клетки можно
+        обойти — связность сохраняется. Проверка только в окне: обход через
+        всю карту не ищется, такой предмет просто не ставится.
+        """
+        grid = self.grid
+        cells = set(cells)
+
+        def open_cell(x, y):
+            return 0 <= x < self.map_w and 0 <= y < self.map_h and grid[y][x] != 1 and \
+                (x, y) not in cells and (x, y) not in covered
+
+        ring = {(x + dx, y + dy) for x, y in cells
+                for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                if open_cell(x + dx, y + dy)}
+        if len(ring) < 2:
+            return False
+        xs = [x for x, _ in cells]
+        ys = [y for _, y in cells]
+        x0, x1 = min(xs) - FLOOR_WINDOW, max(xs) + FLOOR_WINDOW
+        y0, y1 = min(ys) - FLOOR_WINDOW, max(ys) + FLOOR_WINDOW
+
+        start = ring.pop()
+        reached = {start}
+        queue = [start]
+        while queue and ring:
+            x, y = queue.pop()
+            for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if cell not in reached and x0 <= cell[0] <= x1 and y0 <= cell[1] <= y1 and open_cell(*cell):
+                    reached.add(cell)
+                    queue.append(cell)
+                    ring.discard(cell)
+        return bool(ring)
+
+
+# ---------------- Game
+
+class Simulation:
+    """Состояние и логика одного забега.
+
+    Ввод задаётся полями move_x/move_y (-1..1), aim_x/aim_y (точка прицела в мире)
+    и вызовами shoot()/melee(). События для отрисовки и звука копятся в events:
+    ("shot", weapon), ("corpse", enemy), ("hit", "wall" | "decor"),
+    ("melee", сколько убито) и ("death", None) — смерть игрока.
+
+    С autosave (его включает только окно игры) прогресс сохраняется, а забег
+    пишется в историю (save.RunHistory): выстрелы, убийства, смерть, итог
+    уровня. По умолчанию выключен — бенчмарки и прогоны без окна в базу
+    игрока не пишут.
+
+    Логика идёт фиксированными шагами step(); update() раскладывает на них время кадра.
+    Случайность — только из потоков, выведенных из seed, поэтому одинаковые seed
+    и ввод дают одинаковый забег (для этого PVS строится синхронно: async_pvs=False).
+    """
+
+    def __init__(self, map_w, map_h, level=1, total_kills=0, autosave=False, seed=None, async_pvs=True):
+        self.map_w = map_w
+        self.map_h = map_h
+        self.world_width = map_w * TILE
+        self.world_height = map_h * TILE
+        self.autosave = autosave
+        self.history = None  # save.RunHistory; только с autosave
+
+        self.level = level
+        self.total_kills = total_kills
+
+        self.generation = 0  # растёт при каждой генерации уровня
+        self.clock = FixedStepClock()
+        self.time = 0.0  # время симуляции в секундах, растёт только в step()
+        self.steps = 0
+
+        # --- случайность ---
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.async_pvs = async_pvs
+        self.reseed()
+        if autosave:
+            self.history = new_run(seed, map_w, map_h)
+
+        self.plan = None  # LevelPlan текущего уровня
+        self.next_plan = None  # план следующего уровня, считается в фоне во время отсчёта
+        self.grid = []
+        self.layout = None  # levelgen.Layout: сетка NumPy и маски для спавна
+        self.occupancy = None  # стены + мебель для движения
+        self.visibility = None
+        self.flow_field = None
+        self.search_fields = None  # поля к местам, где игрока видели последний раз
+        self.player: Player = None
+        self.enemies = []
+        self.enemy_index = SpatialHash(ENEMY_CELL)
+        self.perception = Perception()  # позиции и таймеры врагов массивами
+        self.decor = []
+        self.decor_index = SpatialHash(ENEMY_CELL)  # статичный, строится в плане уровня
+        self.decor_reach = 0.0  # полудиагональ самой большой мебели — запас запроса
+        self.particles = ParticleSystem(PARTICLE_CAPACITY, seed=self.stream("particles").getrandbits(64))
+        self.bullet_pool = SpritePool(Bullet, None, BULLET_POOL_SIZE, POOL_OVERFLOW)
+        self.events = []
+
+        # ввод
+        self.move_x = 0
+        self.move_y = 0
+        self.aim_x = 0
+        self.aim_y = 0
+
+        self.message = ''
+        self.paused = False
+        self.god_mode = False  # враги не убивают игрока (бенчмарки, отладка)
+        # зона вокруг игрока (ширина, высота в пикселях), где враги думают и ходят;
+        # None — вся карта. Окно ставит сюда размер экрана
+        self.active_size = None
+        self.active_enemies = 0
+        # кто из врагов думает на шаге; бюджет времени окно ставит само (по часам — не детерминирован)
+        self.ai_scheduler = AIScheduler()
+        self.profiler = NULL_PROFILER
+        self.level_cleared = False
+        self.level_cleared_time = 0
+        self.last_step_time = 0
+
+    def stream(self, name):
+        """Отдельный поток случайных чисел для текущей генерации уровня."""
+        return make_stream(self.seed, name, self.generation)
+
+    def reseed(self):
+        self.map_rng = self.stream("map")
+        self.spawn_rng = self.stream("spawn")
+        self.ai_rng = self.stream("ai")
+        self.fire_rng = self.stream("fire")
+
+    @property
+    def bullets(self):
+        return self.bullet_pool.active.values()
+
+    # ---------------- Карта и коллизии
+
+    def rect_hits_walls(self, x, y, w, h):
+        """Пересекает ли прямоугольник (центр, размеры) стены сетки."""
+        x0 = math.floor((x - w / 2) / TILE)
+        x1 = math.ceil((x + w / 2) / TILE) - 1
+        y0 = math.floor((y - h / 2) / TILE)
+        y1 = math.ceil((y + h / 2) / TILE) - 1
+        grid = self.grid
+        for ty in range(y0, y1 + 1):
+            if not 0 <= ty < self.map_h:
+                return True
+            row = grid[ty]
+            for tx in range(x0, x1 + 1):
+                if not 0 <= tx < self.map_w or row[tx] == 1:
+                    return True
+        return False
+
+    def add_enemy(self, enemy):
+        self.enemies.append(enemy)
+        self.enemy_index.insert(enemy)
+        self.perception.add(enemy, self.steps)
+
+    def active_bounds(self):
+        """Прямоугольник активных кусков: active_size вокруг игрока плюс кусок запаса, None — вся карта."""
+        if self.active_size is None:
+            return None
+        w, h = self.active_size
+        x = self.player.center_x
+        y = self.player.center_y
+        return ((math.floor((x - w / 2) / CHUNK) - 1) * CHUNK,
+                (math.floor((y - h / 2) / CHUNK) - 1) * CHUNK,
+                (math.floor((x + w / 2) / CHUNK) + 2) * CHUNK,
+                (math.floor((y + h / 2) / CHUNK) + 2) * CHUNK)
+
+    def move_entity(self, entity, dx, dy):
+        """Сдвиг с раздельной проверкой по X и Y — скольжение вдоль стен и мебели.
+
+        Упёршись, объект встаёт вплотную к препятствию.
+        """
+        occ = self.occupancy
+        half_w = entity.width / 2
+        half_h = entity.height / 2
+        x = entity.center_x
+        y = entity.center_y
+
+        if dx:
+            x += occ.sweep_x(x - half_w, y - half_h, x + half_w, y + half_h, dx)
+        if dy:
+            y += occ.sweep_y(x - half_w, y - half_h, x + half_w, y + half_h, dy)
+
+        entity.center_x = x
+        entity.center_y = y
+
+    # ---------------- Уровень
+
+    def plan_level(self):
+        """План для текущих level и generation: готовый из фона или посчитанный сейчас."""
+        key = (self.seed, self.generation, self.level, self.map_w, self.map_h)
+        plan = self.next_plan
+        self.next_plan = None
+        if plan is not None and plan.matches(*key) and plan.wait():
+            return plan
+        return LevelPlan(*key).build()
+
+    def prefetch_next_level(self):
+        """Начинает считать следующий уровень в фоне (вызывается при зачистке)."""
+        self.next_plan = LevelPlan(self.seed, self.generation, self.level + 1, self.map_w, self.map_h)
+        self.next_plan.build_async()
+
+    def setup(self):
+        plan = self.plan_level()
+
+        # --- очистка ---
+        self.enemies = []
+        self.enemy_index.clear()
+        self.perception.clear()
+        self.bullet_pool.clear()
+        self.particles.clear()
+        self.events.clear()
+        self.level_cleared = False
+        self.reseed()
+        # map и spawn уже израсходованы планом — продолжаем те же потоки
+        self.map_rng = plan.map_rng
+        self.spawn_rng = plan.spawn_rng
+        self.clock.reset()
+
+        # --- карта ---
+        self.plan = plan
+        self.layout = plan.layout
+        self.grid = plan.grid
+        self.occupancy = plan.occupancy
+        if self.visibility:
+            self.visibility.cancel()
+        self.visibility = plan.visibility
+        self.flow_field = plan.flow_field
+        self.search_fields = plan.search_fields
+
+        # --- игрок, враги, декор ---
+        self.player = Player(*plan.player_pos)
+        for x, y in plan.enemy_cells:
+            self.add_enemy(Enemy(x * TILE + TILE / 2, y * TILE + TILE / 2, self))
+        self.decor = list(plan.decor)
+        self.decor_index = plan.decor_index
+        self.decor_reach = plan.decor_reach
+
+        # строим таблицу после спавна: фоновый поток не отбирает GIL у остального setup
+        if self.async_pvs:
+            self.visibility.build_async()
+        else:
+            self.visibility.build()
+
+        # --- текст уровня ---
+        self.message = f"LEVEL {self.level} - KILL ALL ENEMIES"
+        self.last_step_time = self.time
+        self.generation += 1
+        if self.history:
+            self.history.start_level(self.level, self.time)
+
+    # ---------------- Действия игрока
+
+    def shoot(self):
+        if not self.player or not self.player.alive or self.paused or self.player.reloading:
+            return
+
+        # --- вычисляем направление прямо перед выстрелом ---
+        dx = self.aim_x - self.player.center_x
+        dy = self.aim_y - self.player.center_y
+
+        current_time = self.time
+        weapon = self.player.weapon
+
+        if self.player.ammo[weapon] <= 0:
+            self.player.reloading = True
+            self.player.reload_timer = current_time
+            return
+
+        rate = FIRE_RATE_PISTOL if weapon == 'pistol' else FIRE_RATE_SHOTGUN
+        if current_time - self.player.last_fire < rate:
+            return
+
+        self.player.last_fire = current_time
+
+        if dx == 0 and dy == 0:
+            return
+
+        nx, ny = normalize(dx, dy)
+
+        if weapon == 'pistol':
+            self.fire_bullet(nx, ny, weapon)
+            self.player.ammo['pistol'] -= 1
+
+            # Вспышка
+            rng = self.particles.rng
+            speed = rng.uniform(180, 300, 3)
+            self.particles.emit(3,
+                                self.player.center_x + nx * 25,
+                                self.player.center_y + ny * 25,
+                                nx * speed + rng.uniform(-60, 60, 3),
+                                ny * speed + rng.uniform(-60, 60, 3),
+                                2, (255, 255, 200),
+                                life=rng.uniform(0.08, 0.17, 3))
+
+        else:  # shotgun
+            spread = SHOTGUN_SPREAD_DEG / 2
+            for i in range(SHOTGUN_PELLETS):
+                angle = math.atan2(ny, nx) + math.radians(self.fire_rng.uniform(-spread, spread))
+                self.fire_bullet(math.cos(angle), math.sin(angle), weapon)
+
+            self.player.ammo['shotgun'] -= 1
+
+            # Большая вспышка
+            rng = self.particles.rng
+            speed = rng.uniform(240, 420, 8)
+            self.particles.emit(8,
+                                self.player.center_x + nx * 25,
+                                self.player.center_y + ny * 25,
+                                nx * speed + rng.uniform(-120, 120, 8),
+                                ny * speed + rng.uniform(-120, 120, 8),
+                                3, (255, 220, 100),
+                                life=rng.uniform(0.13, 0.25, 8))
+
+        self.events.append(("shot", weapon))
+        self.record("shot", weapon, self.player)
+
+    def fire_bullet(self, nx, ny, weapon='pistol'):
+        b = self.bullet_pool.acquire()
+        if b:
+            b.reset(nx, ny, self.time)
+            b.weapon = weapon
+            b.center_x = self.player.center_x + nx * 30
+            b.center_y = self.player.center_y + ny * 30
+
+    def melee(self):
+        if not self.player or not self.player.alive or self.paused:
+            return
+
+        current_time = self.time
+        if current_time - self.player.last_melee < MELEE_COOLDOWN:
+            return
+
+        self.player.last_melee = current_time
+        angle_rad = math.radians(self.player.angle)
+        fx = math.cos(angle_rad)
+        fy = math.sin(angle_rad)
+
+        to_kill = []
+        for enemy in self.enemy_index.query_radius(self.player.center_x, self.player.center_y, MELEE_RANGE):
+            dx = enemy.center_x - self.player.center_x
+            dy = enemy.center_y - self.player.center_y
+            proj = dx * fx + dy * fy
+            dist = math.hypot(dx, dy)
+            if dist <= MELEE_RANGE and proj > 0:
+                to_kill.append(enemy)
+
+        for e in to_kill:
+            spawn_blood(self.particles, e.center_x, e.center_y)
+            self.record("kill", "melee", e)
+            e.kill_actor()
+        self.enemies = [e for e in self.enemies if e.alive]
+
+        if to_kill:
+            self.message = f'MELEE KILL - {len(to_kill)} ENEMIES'
+            self.events.append(("melee", len(to_kill)))
+
+    def switch_weapon(self, weapon):
+        if not self.player.reloading:
+            self.player.weapon = weapon
+
+    def restart(self):
+        self.level = 1
+        if self.history:
+            # рестарт — новый забег
+            self.history.end_level("restart", self.time)
+            self.history = new_run(self.seed, self.map_w, self.map_h)
+        self.setup()
+
+    def checksum(self):
+        """Отпечаток состояния — сравнивать прогоны с одним seed."""
+        state = [self.steps, self.level, self.total_kills, len(self.enemies),
+                 round(self.player.center_x, 3), round(self.player.center_y, 3)]
+        for e in self.enemies:
+            state += [round(e.center_x, 3), round(e.center_y, 3)]
+        return hash(tuple(state))
+
+    def save(self):
+        if self.autosave:
+            save_game(self.level, self.total_kills)
+
+    def record(self, kind, weapon=None, where=None):
+        """Событие в историю забега; в базу уйдёт в конце уровня."""
+        if self.history:
+            x, y = (where.center_x, where.center_y) if where else (0.0, 0.0)
+            self.history.event(kind, self.time, weapon, x, y)
+
+    def finish(self, outcome="quit"):
+        """Выход из забега: дописывает текущий уровень в историю."""
+        if self.history:
+            self.history.end_level(outcome, self.time)
+
+    def kill_enemy(self, enemy, weapon=None):
+        self.total_kills += 1
+        self.events.append(("corpse", enemy))
+        self.record("kill", weapon, enemy)
+        enemy.kill_actor()
+
+    def kill_player(self):
+        self.player.alive = False
+        self.message = 'YOU DIED - PRESS R TO RESTART'
+        self.events.append(("death", None))
+        self.record("death", None, self.player)
+        self.finish("died")
+
+    # ---------------- Основной апдейт
+
+    def cast_segment(self, x1, y1, x2, y2, radius=0):
+        """Первое препятствие на отрезке: стена, враг или мебель.
+
+        Возвращает (t, kind, obj), где t — доля пути до касания (0..1),
+        kind — "wall"/"enemy"/"decor", или None, если путь свободен.
+        """
+        length = math.hypot(x2 - x1, y2 - y1)
+        best = None
+
+        # стены: DDA по сетке, обходятся только клетки на пути
+        # (частый случай для пули — весь отрезок в одной свободной клетке — без обхода)
+        cx1, cy1 = int(x1 // TILE), int(y1 // TILE)
+        one_free_cell = cx1 == int(x2 // TILE) and cy1 == int(y2 // TILE) and \
+            0 <= cx1 < self.map_w and 0 <= cy1 < self.map_h and self.grid[cy1][cx1] != 1
+        if not one_free_cell:
+            cell, dist = raycast(self.grid, x1, y1, x2, y2, TILE)
+            if cell is not None:
+                best = (dist / length if length else 0.0, "wall", cell)
+
+        limit = best[0] if best else 1.0
+
+        for enemy in self.enemy_index.query_segment(x1, y1, x2, y2, radius + ENEMY_HITBOX / 2):
+            r = enemy.width / 2 + radius
+            t = segment_circle(x1, y1, x2, y2, enemy.center_x, enemy.center_y, r)
+            if t is not None and t <= limit:
+                best = (t, "enemy", enemy)
+                limit = t
+
+        for d in self.decor_index.query_segment(x1, y1, x2, y2, radius + self.decor_reach):
+            half_w = d.width / 2 + radius
+            half_h = d.height / 2 + radius
+            t = segment_box(x1, y1, x2, y2, d.center_x - half_w, d.center_y - half_h,
+                            d.center_x + half_w, d.center_y + half_h)
+            if t is not None and t < limit:
+                best = (t, "decor", d)
+                limit = t
+
+        return best
+
+    def update_bullets(self, delta_time):
+        """Двигает пули отрезками за шаг — сквозь стену или врага не проскочить."""
+        radius = BULLET_SIZE
+        for bullet in list(self.bullets):
+            if bullet.expired(self.time):
+                bullet.kill()
+                continue
+
+            x1, y1 = bullet.center_x, bullet.center_y
+            x2 = x1 + bullet.vx * delta_time
+            y2 = y1 + bullet.vy * delta_time
+            hit = self.cast_segment(x1, y1, x2, y2, radius)
+            if hit is None:
+                bullet.center_x, bullet.center_y = x2, y2
+                continue
+
+            t, kind, obj = hit
+            # точка попадания
+            hx = x1 + (x2 - x1) * t
+            hy = y1 + (y2 - y1) * t
+            bullet.center_x, bullet.center_y = hx, hy
+            bullet.kill()
+
+            if kind != "enemy":
+                self.events.append(("hit", kind))
+            if kind == "wall":
+                rng = self.particles.rng
+                self.particles.emit(2, hx, hy,
+                                    rng.uniform(-120, 120, 2),
+                                    rng.uniform(-120, 120, 2),
+                                    1, (200, 200, 200),
+                                    life=rng.uniform(0.08, 0.17, 2))
+            elif kind == "enemy":
+                spawn_blood(self.particles, hx, hy)
+                self.kill_enemy(obj, bullet.weapon)
+                self.enemies = [e for e in self.enemies if e.alive]
+
+    def advance_bullets(self, delta_time):
+        """Полёт пуль без проверки попаданий (экран смерти)."""
+        for bullet in list(self.bullets):
+            bullet.update(delta_time, self.time)
+
+    def update(self, frame_time):
+        """Продвигает игру на время кадра целым числом фиксированных шагов.
+
+        На паузе часы стоят: пули не стареют, таймеры врагов не идут.
+        """
+        if self.paused:
+            self.clock.reset()
+            return 0
+        steps = self.clock.advance(frame_time)
+        self.ai_scheduler.begin_frame()
+        for _ in range(steps):
+            self.step(self.clock.step)
+            if self.paused:
+                break
+        return steps
+
+    def step(self, delta_time=FIXED_STEP):
+        """Один шаг логики."""
+        self.steps += 1
+        self.time = self.steps * delta_time
+
+        if not self.player or not self.player.alive:
+            self.particles.update(delta_time)
+            self.advance_bullets(delta_time)
+            if len(self.enemies) == 0:
+                self.level += 1
+                self.setup()
+            return
+
+        current_time = self.time
+        prof = self.profiler
+
+        # --- Пули ---
+        with prof.section("update.bullets"):
+            self.update_bullets(delta_time)
+        with prof.section("update.particles"):
+            self.particles.update(delta_time)
+
+        # --- Перезарядка оружия ---
+        with prof.section("update.reload"):
+            if self.player.reloading:
+                w = self.player.weapon
+                if current_time - self.player.reload_timer > self.player.reload_time[w]:
+                    self.player.ammo[w] = self.player.max_ammo[w]
+                    self.player.reloading = False
+
+        # --- AI врагов ---
+        with prof.section("update.flowfield"):
+            self.flow_field.update(self.player.center_x, self.player.center_y)
+        with prof.section("update.ai"):
+            scheduler = self.ai_scheduler
+            perception = self.perception
+            player = self.player
+            px, py = player.center_x, player.center_y
+            perception.gather()
+            for batch, move_time, elapsed in scheduler.batches(perception, self.steps, delta_time,
+                                                              px, py, self.active_bounds()):
+                for enemy, *sense in perception.sense(batch, px, py, current_time, elapsed, move_time,
+                                                      self.visibility):
+                    action = enemy.update_ai(player, *sense)
+                    if action == 'attack' and not self.god_mode:
+                        if ONE_HIT_PLAYER:
+                            self.kill_player()
+                            return
+                        else:
+                            self.player.health -= 20
+                            if self.player.health <= 0:
+                                self.kill_player()
+                                return
+            self.active_enemies = scheduler.awake
+            for name, count in scheduler.thinks.items():
+                prof.count("think." + name, count)
+            prof.count("deferred", scheduler.deferred)
+
+        # --- Движение игрока ---
+        with prof.section("update.player"):
+            move_x, move_y = self.move_x, self.move_y
+
+            if move_x != 0 or move_y != 0:
+                # нормализация диагонали
+                if move_x != 0 and move_y != 0:
+                    move_x *= 0.7071
+                    move_y *= 0.7071
+
+                self.move_entity(self.player,
+                                 move_x * self.player.speed * delta_time,
+                                 move_y * self.player.speed * delta_time)
+
+                # частицы шагов
+                if current_time - self.last_step_time > 0.05:
+                    rng = self.particles.rng
+                    self.particles.emit(2,
+                                        self.player.center_x + rng.uniform(-5, 5, 2),
+                                        self.player.center_y + rng.uniform(-5, 5, 2),
+                                        0, 0, 1, (100, 100, 100),
+                                        life=rng.uniform(0.25, 0.42, 2))
+                    self.last_step_time = current_time
+
+            # --- Вращение к прицелу ---
+            dx = self.aim_x - self.player.center_x
+            dy = self.aim_y - self.player.center_y
+            if dx != 0 or dy != 0:
+                self.player.angle = math.degrees(math.atan2(-dy, dx)) + 90
+
+        # --- Победа на уровне ---
+        with prof.section("update.level"):
+            if len(self.enemies) == 0:
+                if not self.level_cleared:
+                    self.level_cleared = True
+                    self.level_cleared_time = current_time
+                    self.message = f'LEVEL {self.level} CLEARED! GET READY...'
+                    self.prefetch_next_level()
+                    rng = self.particles.rng
+                    color = np.column_stack((rng.integers(200, 256, 20),
+                                             rng.integers(200, 256, 20),
+                                             np.full(20, 50)))
+                    self.particles.emit(20, self.player.center_x, self.player.center_y,
+                                        rng.uniform(-600, 600, 20),
+                                        rng.uniform(-600, 600, 20),
+                                        rng.integers(2, 5, 20), color,
+                                        life=rng.uniform(0.33, 0.67, 20))
+
+                elif current_time - self.level_cleared_time > 1.5:
+                    self.level_cleared = False
+                    # время уровня — до последнего убийства, без отсчёта
+                    if self.history:
+                        self.history.end_level("cleared", self.level_cleared_time)
+                    self.level += 1
+                    # Сохраняем прогресс
+                    self.save()
+                    self.setup()
+
+
+def spawn_blood(particles, x, y, count=12):
+    """Брызги крови: скорость в пикселях в секунду, жизнь в секундах."""
+    rng = particles.rng
+    angle = rng.uniform(0, math.pi * 2, count)
+    speed = rng.uniform(120, 360, count)
+    color = np.column_stack((rng.integers(180, 221, count),
+                             np.full(count, 20),
+                             np.full(count, 20)))
+    particles.emit(count,
+                   x + rng.uniform(-5, 5, count),
+                   y + rng.uniform(-5, 5, count),
+                   np.cos(angle) * speed,
+                   np.sin(angle) * speed,
+                   rng.integers(2, 5, count), color,
+                   life=rng.uniform(0.25, 0.5, count))
+
+
+def run_headless(seconds=60.0, map_w=40, map_h=22, level=1, seed=0):
+    """Прогон уровней без окна: игрок стоит и стреляет в ближайшего врага.
+
+    Возвращает саму симуляцию — для бенчмарков и soak-тестов.
+    """
+    sim = Simulation(map_w, map_h, level=level, autosave=False, seed=seed, async_pvs=False)
+    sim.setup()
+    for _ in range(int(seconds / FIXED_STEP)):
+        if sim.player.alive and sim.enemies:
+            target = min(sim.enemies, key=lambda e: math.hypot(e.center_x - sim.player.center_x,
+                                                               e.center_y - sim.player.center_y))
+            sim.aim_x, sim.aim_y = target.center_x, target.center_y
+            sim.shoot()
+        elif not sim.player.alive:
+            sim.restart()
+        sim.step()
+    return sim
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    result = run_headless()
+    elapsed = time.perf_counter() - start
+    print(f"simulated {result.time:.1f}s in {elapsed:.2f}s "
+          f"({result.time / elapsed:.1f}x real time), level {result.level}, kills {result.total_kills}")
+    same = run_headless().checksum() == result.checksum()
+    print("deterministic:", same)
@@ -0,0 +1,104 @@
+"""Пространственный хеш (равномерная сетка) для движущихся объектов: враги и т.п.
+
+Индекс хранит центры объектов. Размеры учитывает вызывающий — расширяет
+запрос на полуразмер объекта. Объекты внутри ячейки лежат в порядке
+добавления, поэтому результаты запросов детерминированы.
+"""
+import math
+
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.buckets = {}  # (cx, cy) -> [объекты]
+        self.where = {}  # id(объекта) -> (cx, cy)
+
+    def __len__(self):
+        return len(self.where)
+
+    def key(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, obj):
+        k = self.key(obj.center_x, obj.center_y)
+        self.where[id(obj)] = k
+        self.buckets.setdefault(k, []).append(obj)
+
+    def remove(self, obj):
+        k = self.where.pop(id(obj), None)
+        if k is None:
+            return
+        bucket = self.buckets[k]
+        bucket.remove(obj)
+        if not bucket:
+            del self.buckets[k]
+
+    def move(self, obj):
+        """Вызывать после сдвига объекта: перекладывает, только если сменилась ячейка."""
+        k = self.key(obj.center_x, obj.center_y)
+        old = self.where.get(id(obj))
+        if old == k:
+            return
+        if old is not None:
+            bucket = self.buckets[old]
+            bucket.remove(obj)
+            if not bucket:
+                del self.buckets[old]
+        self.where[id(obj)] = k
+        self.buckets.setdefault(k, []).append(obj)
+
+    def clear(self):
+        self.buckets.clear()
+        self.where.clear()
+
+    # --- запросы ---
+    def query_rect(self, left, bottom, right, top):
+        """Объекты, центры которых лежат в прямоугольнике."""
+        buckets = self.buckets
+        if not buckets:
+            return []
+        size = self.cell_size
+        x0 = int(left // size)
+        x1 = int(right // size) + 1
+        result = []
+        for cy in range(int(bottom // size), int(top // size) + 1):
+            for cx in range(x0, x1):
+                bucket = buckets.get((cx, cy))
+                if bucket:
+                    for obj in bucket:
+                        if left <= obj.center_x <= right and bottom <= obj.center_y <= top:
+                            result.append(obj)
+        return result
+
+    def query_radius(self, x, y, radius):
+        """Объекты, центры которых не дальше radius от точки."""
+        r2 = radius * radius
+        return [obj for obj in self.query_rect(x - radius, y - radius, x + radius, y + radius)
+                if (obj.center_x - x) ** 2 + (obj.center_y - y) ** 2 <= r2]
+
+    def query_segment(self, x1, y1, x2, y2, pad):
+        """Кандидаты вдоль отрезка: центры не дальше pad от рамки каждого куска отрезка.
+
+        Длинный отрезок режется на куски по размеру ячейки, чтобы не брать
+        всю диагональную рамку.
+        """
+        if not self.buckets:
+            return []
+        length = math.hypot(x2 - x1, y2 - y1)
+        pieces = max(1, int(length // self.cell_size))
+        if pieces == 1:
+            return self.query_rect(min(x1, x2) - pad, min(y1, y2) - pad,
+                                   max(x1, x2) + pad, max(y1, y2) + pad)
+        seen = set()
+        result = []
+        for i in range(pieces):
+            ax = x1 + (x2 - x1) * i / pieces
+            ay = y1 + (y2 - y1) * i / pieces
+            bx = x1 + (x2 - x1) * (i + 1) / pieces
+            by = y1 + (y2 - y1) * (i + 1) / pieces
+            for obj in self.query_rect(min(ax, bx) - pad, min(ay, by) - pad,
+                                       max(ax, bx) + pad, max(ay, by) + pad):
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    result.append(obj)
+        return result
@@ -0,0 +1,41 @@
+"""Замеры запуска: сколько прошло от старта до первого кадра меню.
+
+Импортируется первой строкой menu.py, поэтому START — почти начало
+работы Python (распаковку onefile-exe загрузчиком PyInstaller отсюда
+не видно). mark() ставит отметку этапа, first_frame() — последнюю, и
+пишет отчёт в лог и строкой в startup.log рядом с игрой: одна строка на
+запуск, удобно сравнивать сборки. Какие модули сколько импортируются,
+покажет python -X importtime menu.py.
+"""
+import logging
+import time
+
+from resources import data_path
+
+log = logging.getLogger(__name__)
+
+START = time.perf_counter()
+LOG_NAME = "startup.log"
+
+marks = []  # (этап, секунд от START)
+reported = False
+
+
+def mark(name):
+    marks.append((name, time.perf_counter() - START))
+
+
+def first_frame():
+    """Отметка первого кадра и отчёт; повторные вызовы ничего не делают."""
+    global reported
+    if reported:
+        return
+    reported = True
+    mark("first_frame")
+    line = time.strftime("%Y-%m-%d %H:%M:%S ") + " ".join(f"{name}={t * 1000:.0f}ms" for name, t in marks)
+    log.info("startup: %s", line)
+    try:
+        with open(data_path(LOG_NAME), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError:
+        log.warning("startup: cannot write %s", LOG_NAME)
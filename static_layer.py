@@ -0,0 +1,227 @@
+"""Статичный слой уровня: спрайты один раз рисуются в текстуру, потом выводится одним квадом.
+
+Трупы и кровь «впечатываются» в ту же текстуру в момент появления,
+поэтому стоимость кадра не зависит от числа убийств.
+
+Большой мир режется на куски (ChunkedLayer): у каждого куска своя
+текстура, запекается он при первом попадании в кадр, а далёкие от
+камеры куски выгружаются.
+"""
+import zlib
+from collections import OrderedDict
+
+import arcade
+from arcade.gl.geometry import quad_2d
+
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_vert;
+in vec2 in_uv;
+out vec2 v_uv;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_vert, 0.0, 1.0);
+    v_uv = in_uv;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+uniform sampler2D layer;
+
+in vec2 v_uv;
+out vec4 f_color;
+
+void main() {
+    f_color = texture(layer, v_uv);
+}
+"""
+
+
+_programs = {}  # контекст -> шейдер вывода слоя (общий для всех слоёв)
+
+
+def _program(ctx):
+    program = _programs.get(ctx)
+    if program is None:
+        program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+        program["layer"] = 0
+        _programs[ctx] = program
+    return program
+
+
+class StaticLayer:
+    def __init__(self, width, height, x=0, y=0):
+        ctx = arcade.get_window().ctx
+        self.ctx = ctx
+        self.width = int(width)
+        self.height = int(height)
+
+        self.texture = ctx.texture((self.width, self.height), components=4)
+        self.fbo = ctx.framebuffer(color_attachments=[self.texture])
+        # камера 1:1 — пиксели текстуры совпадают с координатами мира, начиная с (x, y)
+        self.camera = arcade.camera.Camera2D(render_target=self.fbo)
+        self.program = _program(ctx)
+        self.place(x, y)
+
+        # отложенные штампы: рисуются в текстуру одной пачкой перед выводом
+        self.pending = arcade.SpriteList()
+
+    def place(self, x, y):
+        """Ставит слой в точку мира (x, y) — левый нижний угол текстуры."""
+        self.x = x
+        self.y = y
+        self.camera.position = (x + self.width / 2, y + self.height / 2)
+        self.geometry = quad_2d(size=(self.width, self.height), pos=(x + self.width / 2, y + self.height / 2))
+
+    def bake(self, *sprite_lists):
+        """Перерисовывает слой с нуля из переданных списков (по порядку)."""
+        self.pending.clear()
+        with self.camera.activate():
+            self.fbo.clear(color=(0, 0, 0, 0))
+            for sprite_list in sprite_lists:
+                sprite_list.draw()
+
+    def restore(self, pixels):
+        """Возвращает в слой пиксели, снятые snapshot()."""
+        self.pending.clear()
+        self.texture.write(pixels)
+
+    def snapshot(self):
+        """Пиксели слоя вместе со штампами (чтение из видеопамяти — не каждый кадр)."""
+        self.flush()
+        return self.texture.read()
+
+    def stamp(self, sprite):
+        """Впечатывает спрайт (труп, пятно крови) в слой."""
+        self.pending.append(sprite)
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.camera.activate():
+            self.pending.draw()
+        self.pending.clear()
+
+    def draw(self):
+        self.flush()
+        self.ctx.enable(self.ctx.BLEND)
+        self.texture.use(0)
+        self.geometry.render(self.program)
+
+
+class ChunkedLayer:
+    """Слой мира из квадратных кусков по size пикселей.
+
+    paint(left, bottom, right, top) возвращает списки спрайтов для куска —
+    кусок запекается лениво, когда попадает в prepare()/draw(). Держим
+    не больше max_chunks текстур; лишние (давно не видимые)
+    переиспользуются. Спрайты штампов после впечатывания не хранятся:
+    у выгружаемого куска со штампами пиксели сжимаются в память и при
+    возврате пишутся обратно, так что память не растёт с числом трупов.
+    """
+
+    def __init__(self, world_width, world_height, size, paint, max_chunks=36):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.size = size
+        self.paint = paint
+        self.max_chunks = max_chunks
+
+        self.chunks = OrderedDict()  # (cx, cy) -> StaticLayer, от давно виденных к недавним
+        self.stamps = {}  # (cx, cy) -> [спрайт] для кусков, которых сейчас нет в видеопамяти
+        self.stamped = set()  # куски, в которые что-то впечатано
+        self.saved = {}  # (cx, cy) -> сжатые пиксели выгруженного куска со штампами
+        self.spare = []  # текстуры выгруженных кусков
+        self.drawn = 0  # кусков выведено в последнем draw()
+
+    def keys(self, left, bottom, right, top):
+        """Куски, пересекающие прямоугольник (в пределах мира)."""
+        size = self.size
+        x0 = max(int(left // size), 0)
+        y0 = max(int(bottom // size), 0)
+        x1 = min(int(right // size), int((self.world_width - 1) // size))
+        y1 = min(int(top // size), int((self.world_height - 1) // size))
+        return [(cx, cy) for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)]
+
+    def bake_chunk(self, key):
+        size = self.size
+        x = key[0] * size
+        y = key[1] * size
+        if self.spare:
+            layer = self.spare.pop()
+            layer.place(x, y)
+        else:
+            layer = StaticLayer(size, size, x, y)
+        pixels = self.saved.pop(key, None)
+        if pixels is not None:
+            layer.restore(zlib.decompress(pixels))
+        else:
+            layer.bake(*self.paint(x, y, x + size, y + size))
+        for sprite in self.stamps.pop(key, ()):
+            layer.stamp(sprite)
+        self.chunks[key] = layer
+        return layer
+
+    def prepare(self, left, bottom, right, top, budget=None):
+        """Запекает ещё не готовые куски прямоугольника (не больше budget). Возвращает число запечённых."""
+        baked = 0
+        for key in self.keys(left, bottom, right, top):
+            if key in self.chunks:
+                continue
+            if budget is not None and baked >= budget:
+                break
+            self.bake_chunk(key)
+            baked += 1
+        return baked
+
+    def stamp(self, sprite):
+        """Впечатывает спрайт во все куски, которые он может задеть."""
+        r = max(sprite.width, sprite.height) * 0.75  # с запасом на поворот
+        for key in self.keys(sprite.center_x - r, sprite.center_y - r, sprite.center_x + r, sprite.center_y + r):
+            self.stamped.add(key)
+            layer = self.chunks.get(key)
+            if layer is not None:
+                layer.stamp(sprite)
+            else:
+                self.stamps.setdefault(key, []).append(sprite)
+
+    def adopt(self, other):
+        """Забирает текстуры другого слоя (прошлого уровня) под свои куски."""
+        if other.size == self.size:
+            self.spare += other.spare + list(other.chunks.values())
+        other.spare = []
+        other.chunks.clear()
+
+    def pending(self):
+        return sum(len(layer.pending) for layer in self.chunks.values())
+
+    def draw(self, left, bottom, right, top):
+        """Выводит куски, видимые в прямоугольнике; недостающие запекает сразу."""
+        keys = self.keys(left, bottom, right, top)
+        for key in keys:
+            layer = self.chunks.get(key)
+            if layer is None:
+                layer = self.bake_chunk(key)
+            else:
+                self.chunks.move_to_end(key)
+            layer.draw()
+        self.drawn = len(keys)
+
+        # выгружаем давно не видимые куски, текстуры оставляем для новых
+        visible = set(keys)
+        while len(self.chunks) > self.max_chunks:
+            key = next(iter(self.chunks))
+            if key in visible:
+                break
+            layer = self.chunks.pop(key)
+            if key in self.stamped:
+                self.saved[key] = zlib.compress(layer.snapshot(), 1)
+            self.spare.append(layer)
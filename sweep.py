@@ -0,0 +1,52 @@
+"""Пересечение отрезка с фигурами — для быстрых объектов, которые за шаг пролетают больше своего размера.
+
+Все функции возвращают параметр t вдоль отрезка (0..1) для первой точки
+касания или None, если пересечения нет.
+"""
+import math
+
+
+def segment_circle(x1, y1, x2, y2, cx, cy, r):
+    """Отрезок против круга с центром (cx, cy) и радиусом r."""
+    dx = x2 - x1
+    dy = y2 - y1
+    fx = x1 - cx
+    fy = y1 - cy
+
+    c = fx * fx + fy * fy - r * r
+    if c <= 0:
+        return 0.0  # начало уже внутри круга
+
+    a = dx * dx + dy * dy
+    if a == 0:
+        return None
+    b = fx * dx + fy * dy
+    if b >= 0:
+        return None  # летим от круга
+    disc = b * b - a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / a
+    return t if t <= 1 else None
+
+
+def segment_box(x1, y1, x2, y2, left, bottom, right, top):
+    """Отрезок против прямоугольника со сторонами по осям (slab-метод)."""
+    t_enter = 0.0
+    t_exit = 1.0
+    for start, delta, lo, hi in ((x1, x2 - x1, left, right), (y1, y2 - y1, bottom, top)):
+        if delta == 0:
+            if start < lo or start > hi:
+                return None
+            continue
+        t0 = (lo - start) / delta
+        t1 = (hi - start) / delta
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t0 > t_enter:
+            t_enter = t0
+        if t1 < t_exit:
+            t_exit = t1
+        if t_enter > t_exit:
+            return None
+    return t_enter
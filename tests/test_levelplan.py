@@ -0,0 +1,35 @@
+from simulation import LevelPlan, TILE
+
+
+def floor_after_decor(plan):
+    """Свободные клетки, которых не касается мебель."""
+    covered = set()
+    for d in plan.decor:
+        covered.update(plan.tiles_under(d.center_x - d.width / 2, d.center_y - d.height / 2,
+                                        d.center_x + d.width / 2, d.center_y + d.height / 2))
+    free = {(x, y) for y, row in enumerate(plan.grid) for x, value in enumerate(row) if value != 1}
+    return free - covered
+
+
+def connected(cells):
+    start = next(iter(cells))
+    reached = {start}
+    queue = [start]
+    while queue:
+        x, y = queue.pop()
+        for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if cell in cells and cell not in reached:
+                reached.add(cell)
+                queue.append(cell)
+    return reached == cells
+
+
+def test_decor_keeps_floor_connected():
+    for size in ((40, 22), (80, 60)):
+        for seed in range(40):
+            plan = LevelPlan(seed, 0, 1, *size).build()
+            floor = floor_after_decor(plan)
+            assert connected(floor), (size, seed)
+            player = (int(plan.player_pos[0] // TILE), int(plan.player_pos[1] // TILE))
+            assert player in floor, (size, seed)
+            assert set(plan.enemy_cells) <= floor, (size, seed)
@@ -0,0 +1,60 @@
+import random
+
+import levelgen
+from los import line_clear, raycast
+from pvs import VisibilityTable
+
+TILE = 48
+SEEDS = (0, 1, 2)
+
+
+def free_cells(grid):
+    return [(x, y) for y, row in enumerate(grid) for x, value in enumerate(row) if value != 1]
+
+
+def centre(cell):
+    return cell[0] * TILE + TILE / 2, cell[1] * TILE + TILE / 2
+
+
+def test_corner_between_walls_blocks_both_ways():
+    grid = [
+        [0, 1, 0],
+        [1, 0, 0],
+        [0, 0, 0],
+    ]
+    assert raycast(grid, *centre((0, 0)), *centre((1, 1)), TILE)[0] is not None
+    assert raycast(grid, *centre((1, 1)), *centre((0, 0)), TILE)[0] is not None
+    assert not line_clear(grid, *centre((2, 2)), *centre((0, 0)), TILE)
+
+
+def test_line_clear_symmetric_between_centres():
+    for seed in SEEDS:
+        grid = levelgen.generate(seed, 24, 14).to_lists()
+        cells = free_cells(grid)
+        for a in cells:
+            for b in cells:
+                assert line_clear(grid, *centre(a), *centre(b), TILE) == \
+                    line_clear(grid, *centre(b), *centre(a), TILE), (seed, a, b)
+
+
+def test_line_clear_symmetric_between_points():
+    rng = random.Random(0)
+    for seed in SEEDS:
+        grid = levelgen.generate(seed, 40, 22).to_lists()
+        w, h = len(grid[0]) * TILE, len(grid) * TILE
+        for _ in range(5000):
+            a = (rng.uniform(0, w), rng.uniform(0, h))
+            b = (rng.uniform(0, w), rng.uniform(0, h))
+            assert line_clear(grid, *a, *b, TILE) == line_clear(grid, *b, *a, TILE), (seed, a, b)
+
+
+def test_can_see_symmetric():
+    rng = random.Random(1)
+    for seed in SEEDS:
+        grid = levelgen.generate(seed, 40, 22).to_lists()
+        table = VisibilityTable(grid, TILE)
+        cells = free_cells(grid)
+        for _ in range(5000):
+            a = centre(rng.choice(cells))
+            b = centre(rng.choice(cells))
+            assert table.can_see(*a, *b) == table.can_see(*b, *a), (seed, a, b)
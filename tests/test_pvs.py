@@ -0,0 +1,24 @@
+import levelgen
+from pvs import VisibilityTable
+
+TILE = 48
+
+
+def test_table_matches_raycasts_for_every_ordered_pair():
+    for seed in (0, 1, 2):
+        grid = levelgen.generate(seed, 24, 14).to_lists()
+        table = VisibilityTable(grid, TILE)
+        table.build()
+        assert table.ready
+        for a in table.cells:
+            for b in table.cells:
+                assert table.can_see_tiles(a, b) == table._centers_clear(a, b), (seed, a, b)
+
+
+def test_answers_do_not_change_when_table_is_ready():
+    grid = levelgen.generate(3, 40, 22).to_lists()
+    table = VisibilityTable(grid, TILE)
+    before = [table.visible_cells(cell) for cell in table.cells[::7]]
+    table.build()
+    after = [table.visible_cells(cell) for cell in table.cells[::7]]
+    assert before == after
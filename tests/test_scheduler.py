@@ -0,0 +1,29 @@
+import math
+
+from clock import FIXED_STEP
+from scheduler import TIERS
+from simulation import ENEMY_SPEED, TILE, Simulation
+
+
+def test_waking_enemy_does_not_jump():
+    """Враг, вышедший из активной зоны и вернувшийся, за шаг проходит не больше speed * period * dt."""
+    sim = Simulation(200, 200, autosave=False, seed=3, async_pvs=False)
+    sim.setup()
+    sim.god_mode = True
+    sim.active_size = (1920, 1080)
+    # игрок прыгает между двумя далёкими клетками: враги у каждой то спят, то просыпаются
+    cells = sim.plan.layout.spawn_cells()
+    far = [min(cells, key=lambda c: math.hypot(c[0] - x, c[1] - y)) for x, y in ((40, 40), (160, 160))]
+    spots = [(x * TILE + TILE / 2, y * TILE + TILE / 2) for x, y in far]
+
+    max_speed = ENEMY_SPEED * max(e.chase_speed_mult for e in sim.enemies)
+    limit = max_speed * max(period for _, _, period, _ in TIERS) * FIXED_STEP + 1e-6
+    worst = 0.0
+    for i in range(1200):
+        if i % 200 == 0:
+            sim.player.center_x, sim.player.center_y = spots[i // 200 % 2]
+        before = {e: (e.center_x, e.center_y) for e in sim.enemies}
+        sim.step()
+        for e, (x, y) in before.items():
+            worst = max(worst, math.hypot(e.center_x - x, e.center_y - y))
+    assert worst <= limit, (worst, limit)
@@ -0,0 +1,50 @@
+"""Реестр текстур: все картинки из assets/ грузятся один раз и делятся между спрайтами.
+
+Раньше каждый спрайт создавался из пути к файлу — на каждый экземпляр
+повторялись поиск текстуры и расчёт хитбокса. Теперь спрайты получают
+готовый Texture из реестра, а сами картинки заранее упакованы в атлас
+окна, так что SpriteList при добавлении ничего не загружает в GPU.
+"""
+import os
+
+import arcade
+from arcade.hitbox import algo_bounding_box
+
+from resources import resource_path
+
+ASSET_DIR = "assets"
+
+# плоские картинки: пол, стены, кровь — хватает прямоугольного хитбокса
+BOX_HIT_BOX = {"wall", "floor", "bloods", "bloods2"}
+
+_textures = {}  # имя файла без расширения -> Texture
+_atlas = None
+
+
+def load_all():
+    """Грузит все PNG из assets/ (один раз) и пакует их в атлас окна."""
+    global _atlas
+    if not _textures:
+        folder = resource_path(ASSET_DIR)
+        for filename in sorted(os.listdir(folder)):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() != ".png":
+                continue
+            algorithm = algo_bounding_box if name in BOX_HIT_BOX else None
+            # хитбокс считается здесь, один раз на картинку
+            _textures[name] = arcade.load_texture(os.path.join(folder, filename),
+                                                  hit_box_algorithm=algorithm)
+
+    atlas = arcade.get_window().ctx.default_atlas
+    if atlas is not _atlas:
+        for texture in _textures.values():
+            atlas.add(texture)
+        _atlas = atlas
+    return _textures
+
+
+def get(name):
+    """Общий Texture по имени файла без расширения: get("wall")."""
+    if not _textures:
+        load_all()
+    return _textures[name]